@@ -1,19 +1,38 @@
-from scholarly import scholarly
-from scidownl import scihub_download
+import io
 import os
+import re
+import shutil
+import tempfile
+import time
 import PyPDF2
 import json
+import hashlib
+import threading
+import multiprocessing
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
 from pydantic import BaseModel
-from typing import List, Optional
+from typing import Any, Callable, Dict, List, Optional, Tuple, Union
 
-from openai import OpenAI
 from dotenv import load_dotenv
 
+from backend.vector.clients import get_openai_client
+from backend.vector.openai_gateway import BACKGROUND, get_openai_gateway, is_retryable
+
 # Load environment variables
 load_dotenv()
 
-tmp_dir = './paperTmp/'
+WORKSPACE_MEMORY_LIMIT = int(os.getenv('WORKSPACE_MEMORY_LIMIT', str(32 * 2**20)))  # 메모리에 두는 PDF 최대 크기 (바이트)
+DOWNLOAD_WORKERS = int(os.getenv('PAPER_DOWNLOAD_WORKERS', '4'))  # 동시에 받는 논문 수
+DOWNLOAD_TIMEOUT = float(os.getenv('PAPER_DOWNLOAD_TIMEOUT', '60'))  # 논문 하나당 최대 대기 시간 (초)
+PDF_WORKERS = int(os.getenv('PDF_WORKERS', str(os.cpu_count() or 1)))  # PDF 텍스트 추출 프로세스 수
+PDF_PAGE_BUDGET = int(os.getenv('PDF_PAGE_BUDGET', '15'))  # 논문 하나에서 읽는 최대 페이지 수
+PDF_TOKEN_BUDGET = int(os.getenv('PDF_TOKEN_BUDGET', '6000'))  # 모델에 보내는 본문 최대 토큰 수 (대략)
+CHARS_PER_TOKEN = 4  # 영문 기준 토큰당 글자 수 (토큰 예산을 글자 수로 환산)
+FRONT_MATTER_CHARS = 1500  # 첫 제목 앞부분(제목/저자/저널/DOI)에서 보낼 글자 수
 APIKEY = os.getenv('OPENAI_API_KEY')  # 환경 변수에서 API 키 로드
+ANALYSIS_MODEL = "gpt-4o-mini"
+ANALYSIS_TIMEOUT = float(os.getenv('ANALYSIS_TIMEOUT', '120'))  # 분석 요청 하나의 제한 시간 (초)
 PROMPT = '''
 Please refer to the following paper and summarize what topics are covered and what the purpose is. In particular, focus on the detailed explanation of the experiment and organize the following in the JSON format about what equipment and reagents were used for the experiment so that the researchers can refer to when participating in an experiment similar to or related to the study.
     title:
@@ -81,24 +100,120 @@ functions = [
 ]
 
 
-def read_pdf(file_path):
-    '''Read PDF and return text'''
-    with open(file_path, 'rb') as file:
+# 분석 캐시 버전 (프롬프트/함수 스키마/모델이 바뀌면 예전 결과를 쓰지 않음)
+ANALYSIS_VERSION = hashlib.sha256(
+    f"{ANALYSIS_MODEL}\n{PROMPT}\n{json.dumps(functions, sort_keys=True)}".encode('utf-8')).hexdigest()[:16]
+
+
+# 논문 섹션 제목 (줄 맨 앞에 번호와 함께 오고, 뒤에 줄바꿈이나 구두점이 오는 경우만)
+_SECTIONS = {
+    'abstract': r'abstract|summary',
+    'introduction': r'introduction|background',
+    'methods': r'(?:materials?\s+and\s+methods|methods\s+and\s+materials|(?:online\s+|star\s*)?methods|'
+               r'experimental\s+(?:procedures|section)|experimental|method\s+details)',
+    'results': r'results(?:\s+and\s+discussion)?',
+    'discussion': r'discussion|conclusions?',
+    'references': r'references|bibliography|acknowledge?ments?|supplementary\s+(?:information|materials?)',
+}
+_HEADING = re.compile(
+    r'^[ \t]*(?:\d+(?:\.\d+)*\.?|[IVX]+\.)?[ \t]*(?:' +
+    '|'.join(f'(?P<{name}>{pattern})' for name, pattern in _SECTIONS.items()) +
+    r')[ \t]*(?:[:.\u2014\u2013-][ \t]*|$)',
+    re.IGNORECASE | re.MULTILINE,
+)
+
+
+def find_sections(text):
+    """섹션 제목 목록 [(종류, 시작 위치)]"""
+    return [(match.lastgroup, match.start()) for match in _HEADING.finditer(text)]
+
+
+def _methods_complete(text):
+    """방법 섹션과 그 뒤의 다른 섹션 제목까지 읽었는지 (그 뒤 페이지는 읽을 필요 없음)"""
+    kinds = [kind for kind, _ in find_sections(text)]
+    return 'methods' in kinds and any(kind != 'methods' for kind in kinds[kinds.index('methods') + 1:])
+
+
+def read_pdf(source, max_pages=PDF_PAGE_BUDGET, stop_after_methods=True):
+    '''Read PDF and return text
+
+    source는 파일 경로 또는 PDF 바이트. 한 페이지씩 추출해 max_pages까지만 읽고,
+    방법 섹션이 끝나면 그 뒤 페이지는 읽지 않는다.
+    '''
+    pages = []
+    with (io.BytesIO(source) if isinstance(source, (bytes, bytearray)) else open(source, 'rb')) as file:
         reader = PyPDF2.PdfReader(file)
-        text = ""
-        for page in reader.pages:
-            text += page.extract_text()
-    return text
+        for page in reader.pages[:max_pages]:
+            pages.append(page.extract_text() or '')
+            if stop_after_methods and _methods_complete('\n'.join(pages)):
+                break
+    return '\n'.join(pages)
+
+
+def select_sections(text, max_chars=PDF_TOKEN_BUDGET * CHARS_PER_TOKEN):
+    """분석에 필요한 부분만 골라 max_chars 안으로 자름
+
+    첫 제목 앞부분(제목/저자/저널/DOI), 초록, 재료 및 방법만 보낸다.
+    방법 섹션을 찾지 못하면 앞에서부터 max_chars까지 보낸다.
+    """
+    sections = find_sections(text)
+    if not any(kind == 'methods' for kind, _ in sections):
+        return text[:max_chars]
+
+    parts = [text[:min(sections[0][1], FRONT_MATTER_CHARS)]]
+    for (kind, start), (_, end) in zip(sections, sections[1:] + [(None, len(text))]):
+        if kind in ('abstract', 'methods'):
+            parts.append(text[start:end])
+    return '\n'.join(part.strip() for part in parts)[:max_chars]
+
+
+def extract_paper_text(source):
+    """PDF(경로 또는 바이트)에서 분석에 보낼 본문 추출 (프로세스 풀에서 실행)"""
+    return select_sections(read_pdf(source))
+
+
+_pdf_pool = None
+# 이 프로세스에는 OpenAI/sqlite 클라이언트와 게이트웨이 스레드가 살아 있으므로 fork 대신 새 인터프리터로 시작
+_PDF_CONTEXT = multiprocessing.get_context('spawn')
+
+
+def extract_texts(sources: List[Union[bytes, str]]) -> List[Optional[str]]:
+    """여러 PDF(경로 또는 바이트)를 프로세스 풀에서 동시에 추출 (GIL/이벤트 루프를 잡지 않도록)
+
+    읽을 수 없는 PDF는 그 자리만 None으로 돌려주고 나머지는 그대로 추출한다.
+    """
+    global _pdf_pool
+    if not sources:
+        return []
+    if _pdf_pool is None:
+        _pdf_pool = ProcessPoolExecutor(max_workers=PDF_WORKERS, mp_context=_PDF_CONTEXT)
+    futures = [_pdf_pool.submit(extract_paper_text, source) for source in sources]
+    texts = []
+    for future in futures:
+        try:
+            texts.append(future.result())
+        except BrokenProcessPool as e:
+            # 작업 프로세스가 죽으면 풀 전체를 못 쓰게 되므로 다음 호출 때 새로 만듦
+            _pdf_pool = None
+            print(f"PDF 텍스트 추출 실패: {e}")
+            texts.append(None)
+        except Exception as e:
+            print(f"PDF 텍스트 추출 실패: {e}")
+            texts.append(None)
+    return texts
 
 def openai_api(text):
     if not APIKEY:
         raise ValueError("OpenAI API key not found. Please set OPENAI_API_KEY in .env file")
         
-    client = OpenAI(api_key=APIKEY)
+    # 프로세스 전역 클라이언트(연결 풀 공유)를 게이트웨이로 호출: 한도에 맞춰 보내고 429는 기다렸다 재시도
+    client = get_openai_client().with_options(timeout=ANALYSIS_TIMEOUT)
     
     try:
-      response = client.chat.completions.create(
-          model="gpt-4o-mini",
+      response = get_openai_gateway().chat(
+          client,
+          BACKGROUND,
+          model=ANALYSIS_MODEL,
           messages=[
               {"role": "system", "content": "You are a helpful research paper analyzer."},
               {"role": "user", "content": f"{PROMPT}\n\n Content:\n{text}"}
@@ -113,54 +228,224 @@ def openai_api(text):
             print("-------------------------------------------------------------------------------------")
             return result
     except Exception as e:
+        if is_retryable(e):
+            # 재시도를 다 써도 한도 초과/서버 오류면 논문을 버리지 않고 작업을 실패시켜 작업 큐가 다시 실행하게 함
+            raise
         print(f"Error during analysis: {str(e)}")
         return None
 
-def analyze_author(id, prompt=PROMPT, out=tmp_dir, max_download=2):
-    """논문을 다운로드하고 요약합니다."""
-    search_query = scholarly.search_author_id(id)
-    author = scholarly.fill(search_query)
-    summaries = []
-    
-    for pub in author['publications']:
-        title = pub['bib']['title']
-        
-        # 현재 PDF 파일 개수 확인
-        pdf_count = len([f for f in os.listdir(out) if f.endswith('.pdf')])
-        if pdf_count >= max_download:  # PDF가 5개 이상이면 중단
-            print(f"PDF 파일이 {pdf_count}개 다운로드되었습니다. 다운로드를 중단합니다.")
-            break
-            
-        # 논문 다운로드
-        scihub_download(title, paper_type='title', out=out)
-        
-    # 다운로드된 PDF 파일 찾기
-    pdf_files = [f for f in os.listdir(out) if f.endswith('.pdf')]
-    for pdf_file in pdf_files:
-        pdf_path = os.path.join(out, pdf_file)       
-        # PDF 읽기
-        text = read_pdf(pdf_path)
-        # 요약하기
-        summary = openai_api(text)
-        
-        # 요약 결과를 리스트에 추가
-        summaries.append(summary)
-        
-        # print(f"분석: {summary}")
+class Workspace:
+    """프로필 작업 하나의 PDF 보관소
 
-    
-    # 분석이 완료된 후 paperTmp 디렉토리 비우기
-    for file in os.listdir(out):
-        file_path = os.path.join(out, file)
+    PDF는 메모리(BytesIO)에 두고, memory_limit보다 큰 파일만 작업 전용 임시 디렉터리에 쓴다.
+    작업마다 따로 만들므로 동시에 실행되는 작업끼리 파일을 세거나 지우지 않는다.
+    """
+
+    def __init__(self, parent: Optional[str] = None, memory_limit: int = WORKSPACE_MEMORY_LIMIT):
+        self.parent = parent  # 임시 디렉터리를 만들 위치 (None이면 시스템 임시 디렉터리)
+        self.memory_limit = memory_limit
+        self._files: Dict[Any, Union[io.BytesIO, str]] = {}
+        self._dir = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __len__(self):
+        return len(self._files)
+
+    def put(self, name, data: bytes):
+        """PDF 저장 (memory_limit보다 크면 임시 디렉터리로)"""
+        if len(data) <= self.memory_limit:
+            self._files[name] = io.BytesIO(data)
+            return
+        if self._dir is None:
+            if self.parent:
+                os.makedirs(self.parent, exist_ok=True)
+            self._dir = tempfile.mkdtemp(prefix='profile-job-', dir=self.parent)
+        path = os.path.join(self._dir, f'{len(self._files):03d}.pdf')
+        with open(path, 'wb') as f:
+            f.write(data)
+        self._files[name] = path
+
+    def source(self, name) -> Union[bytes, str]:
+        """read_pdf에 넘길 값 (메모리에 있으면 바이트, 아니면 경로)"""
+        entry = self._files[name]
+        return entry.getvalue() if isinstance(entry, io.BytesIO) else entry
+
+    @property
+    def spilled(self) -> int:
+        """임시 디렉터리에 쓴 파일 수"""
+        return sum(isinstance(entry, str) for entry in self._files.values())
+
+    def close(self):
+        self._files.clear()
+        if self._dir is not None:
+            shutil.rmtree(self._dir, ignore_errors=True)
+            self._dir = None
+
+
+def scihub_downloader(title) -> Optional[bytes]:
+    """Sci-Hub에서 제목으로 논문을 받아 PDF 바이트로 반환 (없으면 None)
+
+    scidownl은 파일로만 저장하므로 이 다운로드 전용 임시 디렉터리에 받은 뒤 바로 지운다.
+    """
+    from scidownl import scihub_download  # 다운로드할 때만 필요 (다른 downloader를 쓰면 불필요)
+    with tempfile.TemporaryDirectory(prefix='scihub-') as tmp:
+        path = os.path.join(tmp, 'paper.pdf')
+        scihub_download(title, paper_type='title', out=path)
+        if not os.path.isfile(path):
+            return None
+        with open(path, 'rb') as f:
+            return f.read()
+
+
+def download_papers(titles: List[str], workspace: Workspace, max_download=2,
+                    downloader: Callable[[str], Optional[bytes]] = scihub_downloader,
+                    workers=DOWNLOAD_WORKERS, timeout=DOWNLOAD_TIMEOUT) -> List[Tuple[int, Union[bytes, str]]]:
+    """논문들을 동시에 최대 workers개씩 받아 workspace에 넣고 [(titles 순번, PDF 바이트 또는 경로)]를 제목 순서대로 반환
+
+    - Sci-Hub에 없는 논문이 많으므로 성공 수와 관계없이 항상 workers개를 동시에 시도
+    - downloader는 PDF 바이트(없으면 None)를 돌려주고, 성공 수는 메모리에서 셈 (디렉터리 스캔 없음)
+    - 앞쪽 제목 max_download개가 성공하면 남은 논문은 시작하지 않음 (먼저 끝난 뒤쪽 논문이 아직 받고 있는
+      앞쪽 논문의 자리를 빼앗지 않도록, 성공한 것 중 앞쪽 max_download개보다 앞선 다운로드는 끝까지 기다림)
+    - 다운로드마다 시작할 때 스레드를 새로 띄우고 그때부터 timeout을 잼. 시간을 넘기면 실패로 치고
+      새 스레드로 다음 논문을 시작 (실행 중인 스레드는 멈출 수 없으므로 끝날 때까지 두고 결과는 버림)
+    """
+    pending = iter(enumerate(titles))
+    in_flight = {}  # future -> (순번, 마감 시각)
+    downloaded = []  # 성공한 순번
+
+    def run(future: Future, title: str):
         try:
-            if os.path.isfile(file_path):
-                os.unlink(file_path)
-            print(f"임시 파일 삭제 완료: {file}")
+            future.set_result(downloader(title))
         except Exception as e:
-            print(f"파일 삭제 중 오류 발생: {e}")
-    
+            future.set_exception(e)
+
+    def start_next():
+        for i, title in pending:
+            future = Future()
+            future.set_running_or_notify_cancel()
+            in_flight[future] = (i, time.monotonic() + timeout)
+            threading.Thread(target=run, args=(future, title), name=f'paper-download-{i}', daemon=True).start()
+            return
+
+    def enough() -> bool:
+        if len(downloaded) < max_download:
+            return False
+        last = sorted(downloaded)[max_download - 1]
+        return all(i > last for i, _ in in_flight.values())
+
+    for _ in range(workers):
+        start_next()
+    while in_flight and not enough():
+        next_deadline = min(deadline for _, deadline in in_flight.values())
+        done, _ = wait(in_flight, timeout=max(0.0, next_deadline - time.monotonic()), return_when=FIRST_COMPLETED)
+        now = time.monotonic()
+        for future in list(in_flight):
+            i, deadline = in_flight[future]
+            if future in done:
+                del in_flight[future]
+                try:
+                    data = future.result()
+                except Exception as e:
+                    data = None
+                    print(f"논문 다운로드 실패: {titles[i]} ({e})")
+                if data:
+                    workspace.put(i, data)
+                    downloaded.append(i)
+            elif now >= deadline:
+                del in_flight[future]
+                print(f"논문 다운로드 시간 초과: {titles[i]}")
+            else:
+                continue
+            if len(downloaded) < max_download:
+                start_next()
+
+    if len(downloaded) >= max_download:
+        print(f"PDF 파일이 {len(downloaded)}개 다운로드되었습니다. 다운로드를 중단합니다.")
+    return [(i, workspace.source(i)) for i in sorted(downloaded)][:max_download]
+
+
+def analyze_publications(publications: List[Dict[str, Any]], workspace: Workspace, max_download=2,
+                         downloader=scihub_downloader, cache=None, stats: Optional[Dict[str, int]] = None):
+    """Scholar 논문 목록({'title', 'pub_url'})에서 max_download편을 분석 (PDF는 workspace에)
+
+    cache(backend.service.analysis_cache.AnalysisCache)가 있으면
+    - 다운로드 전에 DOI(pub_url에 있으면)/제목으로 찾아 적중한 논문은 받지 않고
+    - PDF 추출 후 본문 해시로 찾아 적중하면 모델을 부르지 않으며
+    - 새로 분석한 결과는 저장한다.
+    stats가 있으면 이번 실행의 적중/호출 수를 기록한다.
+    """
+    stats = stats if stats is not None else {}
+    stats.update({'doi_hits': 0, 'title_hits': 0, 'text_hits': 0, 'model_calls': 0})
+    summaries = []
+
+    # 캐시에 있는 논문은 다운로드하지 않음
+    to_download = []
+    for pub in publications:
+        if len(summaries) >= max_download:
+            break
+        cached, kind = (None, None)
+        if cache is not None:
+            cached, kind = cache.lookup(ANALYSIS_VERSION, doi=pub.get('pub_url'), title=pub['title'])
+        if cached is not None:
+            stats[f'{kind}_hits'] += 1
+            summaries.append(cached)
+        else:
+            to_download.append(pub)
+
+    remaining = max_download - len(summaries)
+    if remaining > 0 and to_download:
+        # 논문 다운로드 (동시에 여러 편, 필요한 수만큼 성공하면 중단)
+        downloaded = download_papers([pub['title'] for pub in to_download], workspace,
+                                     max_download=remaining, downloader=downloader)
+
+        # PDF 읽기 (프로세스 풀에서 초록/방법 섹션만)
+        texts = extract_texts([source for _, source in downloaded])
+        for (i, _), text in zip(downloaded, texts):
+            if text is None:
+                continue  # 읽을 수 없는 PDF
+            summary, kind = (None, None)
+            if cache is not None:
+                summary, kind = cache.lookup(ANALYSIS_VERSION, text=text)
+            if summary is not None:
+                stats[f'{kind}_hits'] += 1
+            else:
+                # 요약하기
+                summary = openai_api(text)
+                stats['model_calls'] += 1
+                if summary and cache is not None:
+                    cache.store(summary, ANALYSIS_VERSION, ANALYSIS_MODEL, text=text, title=to_download[i]['title'])
+
+            # 요약 결과를 리스트에 추가
+            summaries.append(summary)
+
+    hits = stats['doi_hits'] + stats['title_hits'] + stats['text_hits']
+    if hits + stats['model_calls']:
+        print(f"분석 캐시: 적중 {hits}편 (DOI {stats['doi_hits']}, 제목 {stats['title_hits']}, 본문 {stats['text_hits']}), "
+              f"모델 호출 {stats['model_calls']}편, 적중률 {hits / (hits + stats['model_calls']):.0%}")
     return summaries
 
+
+def analyze_author(id, prompt=PROMPT, out=None, max_download=2, downloader=scihub_downloader,
+                   cache=None, stats=None):
+    """논문을 다운로드하고 요약합니다.
+
+    작업마다 별도 Workspace를 쓰므로 여러 저자를 동시에 분석할 수 있다 (out은 큰 PDF를 쓸 임시 디렉터리 위치).
+    """
+    from scholarly import scholarly
+    search_query = scholarly.search_author_id(id)
+    author = scholarly.fill(search_query)
+
+    publications = [{'title': pub['bib']['title'], 'pub_url': pub.get('pub_url')} for pub in author['publications']]
+    # 분석이 끝나면 (실패해도) 작업 공간 정리
+    with Workspace(parent=out) as workspace:
+        return analyze_publications(publications, workspace, max_download=max_download,
+                                    downloader=downloader, cache=cache, stats=stats)
+
 # example
 if __name__ == '__main__':
     analyze_author('JAOIX4wAAAAJ')
\ No newline at end of file
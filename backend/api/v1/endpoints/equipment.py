@@ -0,0 +1,62 @@
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Dict, Any, Literal, Optional
+import asyncio
+from ....db.session import get_db
+from ....crud.paper import get_users_by_terms
+from ....service.equipment_index import get_equipment_index, get_term_dictionary
+from ....service.researcher_directory import get_researcher_directory
+
+router = APIRouter()
+
+@router.get("/researchers/by-terms")
+async def researchers_by_terms(equipment: Optional[List[str]] = Query(None, description="사용 장비 (여러 개면 모두)"),
+                               reagent: Optional[List[str]] = Query(None, description="사용 시약 (여러 개면 모두)"),
+                               limit: int = Query(20, ge=1, le=200, description="반환할 연구자 수"),
+                               source: Literal["memory", "db"] = Query("memory", description="색인 (프로세스 내 색인 / Postgres GIN 색인)"),
+                               db: AsyncSession = Depends(get_db)) -> List[Dict[str, Any]]:
+    """
+    주어진 장비와 시약을 모두 사용한 연구자를 찾습니다.
+    장비/시약 이름은 동의어 사전으로 정규화하므로 한/영 표기나 띄어쓰기가 달라도 같은 것으로 봅니다.
+
+    Args:
+        equipment, reagent: 장비/시약 이름
+        limit: 반환할 결과 수
+        source: memory(JSON 데이터로 만든 프로세스 내 색인), db(papers 테이블)
+
+    Returns:
+        해당 장비/시약을 쓴 논문 수 합이 많은 순서의 연구자 목록 (match_score, matched_terms 포함)
+    """
+    if not equipment and not reagent:
+        raise HTTPException(status_code=400, detail="equipment or reagent is required")
+    try:
+        dictionary = get_term_dictionary()
+        if source == "db":
+            equipment_variants = [dictionary.variants("equipments", term) for term in equipment or []]
+            reagent_variants = [dictionary.variants("reagents", term) for term in reagent or []]
+            names = [variants[0] for variants in equipment_variants + reagent_variants]
+            rows = await get_users_by_terms(db, equipment_variants, reagent_variants, limit)
+            matches = [{"user_id": row[0], "score": row[1], "counts": dict(zip(names, row[2:]))} for row in rows]
+        else:
+            index = await asyncio.get_running_loop().run_in_executor(None, get_equipment_index)
+            matches = index.users_with(equipment, reagent, limit)
+        print(f"🔬 장비/시약 검색 ({source}): {equipment or []} {reagent or []} -> {len(matches)}명")
+
+        users = await get_researcher_directory().get_many_async([m["user_id"] for m in matches], db)
+        results = []
+        for match in matches:
+            if match["user_id"] in users:
+                results.append({**users[match["user_id"]], "match_score": match["score"], "matched_terms": match["counts"]})
+            else:
+                print(f"⚠️ 사용자 정보를 찾을 수 없음: {match['user_id']}")
+        return results
+    except Exception as e:
+        print(f"❌ 오류 발생: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.get("/researchers/terms")
+async def list_terms() -> Dict[str, List[Dict[str, Any]]]:
+    """색인에 있는 장비/시약 대표 이름과 사용 연구자 수"""
+    index = await asyncio.get_running_loop().run_in_executor(None, get_equipment_index)
+    return {field: [{"term": term, "users": count} for term, count in index.terms(field)]
+            for field in ("equipments", "reagents")}
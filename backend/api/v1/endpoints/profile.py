@@ -1,8 +1,9 @@
-from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.ext.asyncio import AsyncSession
 from ....db.session import get_db
-from ....schemas.profile import ProfileCreateRequest, ProfileCreateResponse
-from ....service.profile_service import process_profile_creation_background
+from ....schemas.profile import ProfileCreateRequest, ProfileCreateResponse, ProfileJobStatus
+from ....service.job_queue import get_job_queue
+from ....service.profile_service import PROFILE_JOB
 from ....crud.user import get_user
 
 router = APIRouter()
@@ -10,28 +11,36 @@ router = APIRouter()
 @router.post("/create-profile", response_model=ProfileCreateResponse)
 async def create_profile(
     profile_request: ProfileCreateRequest, 
-    background_tasks: BackgroundTasks, 
     db: AsyncSession = Depends(get_db)
 ):
     """
     Create user profile by processing Google Scholar data.
-    This is an asynchronous endpoint that starts the processing in the background.
+    The request is queued and processed by a separate worker (python -m backend.worker);
+    poll GET /create-profile/{job_id} for progress.
     """
     # Check if user exists
     user = await get_user(db, profile_request.user_id)
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
     
-    # Start the background task
-    background_tasks.add_task(
-        process_profile_creation_background,
-        profile_request.user_id,
-        profile_request.max_papers,
-        db
+    # Queue the job (the web process only writes one row)
+    job_id = get_job_queue().enqueue(
+        PROFILE_JOB,
+        {"user_id": profile_request.user_id, "max_papers": profile_request.max_papers},
+        key=profile_request.user_id  # one running job per user (profile vector updates read-modify-write)
     )
     
     return {
-        "message": f"Profile creation initiated for user {profile_request.user_id}. Processing {profile_request.max_papers} papers from Google Scholar.",
-        "status": "processing",
-        "paper_count": 0
-    }
\ No newline at end of file
+        "message": f"Profile creation queued for user {profile_request.user_id}. Processing {profile_request.max_papers} papers from Google Scholar.",
+        "status": "queued",
+        "paper_count": 0,
+        "job_id": job_id
+    }
+
+@router.get("/create-profile/{job_id}", response_model=ProfileJobStatus)
+async def get_profile_job(job_id: str):
+    """Status, current stage and result of a profile creation job"""
+    job = get_job_queue().get(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return {"job_id": job["id"], **{key: job[key] for key in ProfileJobStatus.model_fields if key != "job_id"}}
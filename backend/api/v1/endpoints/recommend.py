@@ -1,82 +1,118 @@
 from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from ....db.session import get_db
-from ....service.recommender import Recommender
+from ....service.recommender import get_recommender
+from ....service.sharded_recommender import get_sharded_recommender
+from ....service.researcher_directory import get_researcher_directory
+from ....service.lexical_search import search_hybrid_async, search_hybrid_batch_async, search_lexical
 import os
 from dotenv import load_dotenv
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Literal, Optional
 from ....schemas.user import UserRequest
+from ....schemas.recommendation import BatchRecommendationRequest, BatchSearchRequest
 import sys
 import os
 import json
-
-# 벡터 모듈 경로 추가
-sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../../..')))
-from vector.emb_search import get_recommendations as vector_search
+import asyncio
+from ....vector.emb_search import build_filter, get_recommendations_async as vector_search, get_recommendations_batch_async as vector_search_batch
+from ....vector.emb_search import get_profile_recommendations_async as profile_search, get_profile_recommendations_batch_async as profile_search_batch, get_similar_profiles_async
 
 router = APIRouter()
 
-# 추천 시스템 인스턴스 생성
-recommender = Recommender()
+# 추천 시스템 인스턴스 생성 (RECOMMENDER_SHARDS > 0이면 샤드 프로세스에 나눠서 검색)
+RECOMMENDER_SHARDS = int(os.getenv("RECOMMENDER_SHARDS", "0"))
+recommender = get_sharded_recommender(RECOMMENDER_SHARDS) if RECOMMENDER_SHARDS > 0 else get_recommender()
+
+# /search 결과에 붙일 연구자 정보 (요청마다 JSON을 읽지 않도록 프로세스 전역으로 보관)
+researcher_directory = get_researcher_directory()
+
+def _profile_filter(year_from, year_to, journal, equipment, reagent, user_id):
+    """mode=profile용 필터 (프로필 벡터에는 논문 메타데이터가 없어 user_id만 쓸 수 있음)"""
+    if any(value is not None for value in (year_from, year_to, journal, equipment, reagent)):
+        raise HTTPException(status_code=400, detail="mode=profile supports only the user_id filter")
+    return build_filter(user_ids=user_id)
 
 @router.post("/recommendations")
-async def get_recommendations(request: UserRequest) -> List[Dict[str, Any]]:
+async def get_recommendations(request: UserRequest,
+                              method: Literal["tfidf", "profile"] = Query("tfidf", description="유사도 기준 (TF-IDF 사용자 벡터 / 논문 임베딩 프로필 벡터)")) -> List[Dict[str, Any]]:
     try:
-        recommendations = recommender.get_recommendations(request.user_id)
+        if method == "profile":
+            # 프로필 벡터 인덱스에서 바로 비슷한 사용자를 찾음
+            similar = await get_similar_profiles_async(request.user_id)
+            users = await researcher_directory.get_many_async(user_id for user_id, _ in similar)
+            return [{"user_id": user_id, "similarity_score": score, "papers": users[user_id].get("papers", [])}
+                    for user_id, score in similar if user_id in users]
+        # 샤드 질의(파이프 왕복)와 행렬 곱은 블로킹이므로 이벤트 루프 밖에서 실행
+        recommendations = await asyncio.get_running_loop().run_in_executor(
+            None, recommender.get_recommendations, request.user_id)
         return recommendations
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@router.post("/recommendations/batch")
+async def get_recommendations_batch(request: BatchRecommendationRequest) -> StreamingResponse:
+    """
+    여러 사용자의 추천을 한 번에 계산해 사용자별 한 줄씩 NDJSON으로 스트리밍합니다.
+
+    Args:
+        request: user_ids (목록 또는 "all")와 사용자별 추천 수
+    """
+    user_ids = None if request.user_ids == "all" else request.user_ids
+
+    # 동기 제너레이터라 StreamingResponse가 스레드풀에서 돌리고, 샤드 질의는 ShardedRecommender가 직렬화
+    def lines():
+        for result in recommender.recommend_batch(user_ids, request.n_recommendations):
+            yield json.dumps(result, ensure_ascii=False) + "\n"
+
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
+
 @router.get("/search")
-async def search_papers(query: str = Query(..., description="검색어"), top_k: int = Query(5, description="반환할 결과 수")) -> List[Dict[str, Any]]:
+async def search_papers(query: str = Query(..., description="검색어"), top_k: int = Query(5, description="반환할 결과 수"), aggregation: Literal["max", "mean", "sum"] = Query("max", description="사용자 점수 집계 방식 (논문 점수의 max/mean/sum)"),
+                        mode: Literal["dense", "hybrid", "lexical", "profile"] = Query("dense", description="검색 방식 (벡터 / 벡터+BM25 / BM25만 / 프로필 벡터)"),
+                        year_from: Optional[int] = Query(None, description="이 연도 이후 논문만"), year_to: Optional[int] = Query(None, description="이 연도 이전 논문만"),
+                        journal: Optional[List[str]] = Query(None, description="저널 (여러 개면 그중 하나)"), equipment: Optional[List[str]] = Query(None, description="사용 장비 (여러 개면 모두)"),
+                        reagent: Optional[List[str]] = Query(None, description="사용 시약 (여러 개면 모두)"), user_id: Optional[List[str]] = Query(None, description="대상 사용자 (여러 개면 그중 하나)"),
+                        db: AsyncSession = Depends(get_db)) -> List[Dict[str, Any]]:
     """
     유사한 연구를 하는 연구자를 검색합니다.
     
     Args:
         query: 검색어
-        top_k: 반환할 결과 수
+        top_k: 반환할 결과 수 (서로 다른 연구자 수)
+        aggregation: 연구자 점수 집계 방식
+        mode: dense(벡터), hybrid(벡터와 BM25를 RRF로 결합), lexical(BM25만, 네트워크 호출 없음),
+              profile(연구자별 프로필 벡터 인덱스를 바로 검색, user_id 필터만 가능)
+        year_from, year_to, journal, equipment, reagent, user_id: 논문 메타데이터 필터 (벡터 검색에 함께 전달)
         
     Returns:
         검색된 연구자 목록
     """
+    if mode == "profile":
+        profile_filter = _profile_filter(year_from, year_to, journal, equipment, reagent, user_id)
     try:
         print(f"\n🔍 검색 쿼리: {query}")
         
         # 벡터 검색 수행
-        user_ids = vector_search(query, top_k=top_k)
+        search_filter = build_filter(year_from, year_to, journal, equipment, reagent, user_id)
+        if mode == "profile":
+            user_ids = await profile_search(query, top_k=top_k, filter=profile_filter)
+        elif mode == "lexical":
+            user_ids = await asyncio.get_running_loop().run_in_executor(
+                None, search_lexical, query, top_k, aggregation, search_filter)
+        elif mode == "hybrid":
+            user_ids = await search_hybrid_async(query, top_k=top_k, aggregation=aggregation, filter=search_filter)
+        else:
+            user_ids = await vector_search(query, top_k=top_k, aggregation=aggregation, filter=search_filter)
         print(f"✨ 벡터 검색 결과 user_ids: {user_ids}")
         
-        # 사용자 정보 가져오기
+        # 사용자 정보 가져오기 (프로세스 전역 디렉터리에서 한 번에 조회)
+        users = await researcher_directory.get_many_async(user_ids, db)
         results = []
-        
-        # 사용자 데이터 로드
-        current_dir = os.path.dirname(os.path.abspath(__file__))
-        data_path = os.path.join(current_dir, '../../../data/bio_research_nested.json')
-        print(f"📂 데이터 파일 경로: {data_path}")
-        
-        with open(data_path, 'r', encoding='utf-8') as f:
-            users_data = json.load(f)
-        
-        # 사용자 ID를 키로 하는 딕셔너리 생성
-        users_dict = {user['user_id']: user for user in users_data}
-        print(f"📚 로드된 전체 사용자 수: {len(users_dict)}")
-        
-        # 검색 결과 생성
         for user_id in user_ids:
-            print(f"\n👤 처리 중인 user_id: {user_id}")
-            if user_id in users_dict:
-                user = users_dict[user_id]
-                print(f"✅ 사용자 정보 찾음: {user.get('user_id')}")
-                
-                # 결과에 사용자 정보 추가
-                results.append({
-                    "user_id": user_id,
-                    "name": f"연구자 {user_id}",
-                    "affiliation": "대학/연구소",
-                    "google_scholar_id": user.get('google_scholar_id', ''),
-                    "linkedin": user.get('linkedin', ''),
-                    "papers": user.get('papers', [])[:3]  # 최근 논문 3개만 포함
-                })
+            if user_id in users:
+                results.append(users[user_id])
             else:
                 print(f"⚠️ 사용자 정보를 찾을 수 없음: {user_id}")
         
@@ -94,6 +130,56 @@ async def search_papers(query: str = Query(..., description="검색어"), top_k:
             print("-------------------")
         
         return results
+    except asyncio.TimeoutError:
+        print("⏱️ 검색 시간 초과")
+        raise HTTPException(status_code=504, detail="Search timed out")
+    except Exception as e:
+        print(f"❌ 오류 발생: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.post("/search/batch")
+async def search_papers_batch(request: BatchSearchRequest, db: AsyncSession = Depends(get_db)) -> List[Dict[str, Any]]:
+    """
+    여러 검색어를 한 번에 검색합니다.
+    임베딩 API 호출 한 번, 다중 벡터 질의 한 번, 연구자 정보 조회 한 번으로 처리합니다.
+    
+    Args:
+        request: 검색어 목록과 /search와 같은 옵션/필터
+        
+    Returns:
+        검색어별 {"query", "results"} 목록 (results는 /search 응답과 같은 형식)
+    """
+    if request.mode == "profile":
+        profile_filter = _profile_filter(request.year_from, request.year_to, request.journal,
+                                         request.equipment, request.reagent, request.user_id)
+    try:
+        print(f"\n🔍 배치 검색 쿼리 {len(request.queries)}개")
+        search_filter = build_filter(request.year_from, request.year_to, request.journal,
+                                     request.equipment, request.reagent, request.user_id)
+        if request.mode == "profile":
+            user_id_lists = await profile_search_batch(request.queries, top_k=request.top_k, filter=profile_filter)
+        elif request.mode == "lexical":
+            user_id_lists = await asyncio.get_running_loop().run_in_executor(
+                None, lambda: [search_lexical(q, request.top_k, request.aggregation, search_filter)
+                               for q in request.queries])
+        elif request.mode == "hybrid":
+            user_id_lists = await search_hybrid_batch_async(request.queries, top_k=request.top_k,
+                                                            aggregation=request.aggregation, filter=search_filter)
+        else:
+            user_id_lists = await vector_search_batch(request.queries, top_k=request.top_k,
+                                                      aggregation=request.aggregation, filter=search_filter)
+
+        # 모든 검색어의 결과에 나온 사용자를 한 번에 조회
+        all_user_ids = list(dict.fromkeys(user_id for user_ids in user_id_lists for user_id in user_ids))
+        users = await researcher_directory.get_many_async(all_user_ids, db)
+
+        return [
+            {"query": query, "results": [users[user_id] for user_id in user_ids if user_id in users]}
+            for query, user_ids in zip(request.queries, user_id_lists)
+        ]
+    except asyncio.TimeoutError:
+        print("⏱️ 배치 검색 시간 초과")
+        raise HTTPException(status_code=504, detail="Search timed out")
     except Exception as e:
         print(f"❌ 오류 발생: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
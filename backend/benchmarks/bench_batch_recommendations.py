@@ -0,0 +1,67 @@
+"""배치 추천 처리량 벤치마크
+
+사용자마다 전체 행렬과 cosine_similarity + argsort를 하던 기존 요청별 방식과
+Recommender.recommend_batch(이웃 테이블 조회 / 블록 행렬 곱)의 처리량을 비교합니다.
+기존 방식은 --sample 명을 측정해 전체 사용자 수로 환산합니다.
+
+실행: python -m backend.benchmarks.bench_batch_recommendations --users 10000
+"""
+import argparse
+import contextlib
+import io
+import os
+import tempfile
+import time
+
+import numpy as np
+from sklearn.metrics.pairwise import cosine_similarity
+
+from backend.benchmarks.bench_recommender_memory import make_corpus
+from backend.service.recommender import Recommender
+
+
+def per_request(recommender, row, n):
+    """기존 get_recommendations의 계산 (요청마다 전체 유사도 + 전체 정렬) + 같은 응답 생성"""
+    similarities = cosine_similarity(recommender.user_vectors[row], recommender.user_vectors).flatten()
+    indices = np.argsort(similarities)[::-1][1:n + 1]
+    return recommender._format(recommender._state, indices, similarities[indices])
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--users', type=int, default=10_000)
+    parser.add_argument('--sample', type=int, default=500)
+    parser.add_argument('--n', type=int, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        data_path = os.path.join(tmp, 'users.json')
+        with open(data_path, 'w', encoding='utf-8') as f:
+            f.write(make_corpus(args.users, 3))
+        with contextlib.redirect_stdout(io.StringIO()):
+            recommender = Recommender(data_path=data_path, snapshot_dir=os.path.join(tmp, 'snapshots'))
+
+        start = time.perf_counter()
+        for row in range(args.sample):
+            per_request(recommender, row, args.n)
+        loop = (time.perf_counter() - start) / args.sample * args.users
+
+        start = time.perf_counter()
+        for _ in recommender.recommend_batch(None, args.n):
+            pass
+        table = time.perf_counter() - start
+
+        n_blocked = recommender.neighbor_ids.shape[1] + 1
+        start = time.perf_counter()
+        for _ in recommender.recommend_batch(None, n_blocked):
+            pass
+        blocked = time.perf_counter() - start
+
+    print(f"users={args.users}")
+    print(f"per-request loop (n={args.n}, extrapolated) : {loop:8.2f} s ({args.users / loop:10.0f} users/s)")
+    print(f"recommend_batch, neighbor table (n={args.n})  : {table:8.2f} s ({args.users / table:10.0f} users/s)")
+    print(f"recommend_batch, blocked product (n={n_blocked}) : {blocked:8.2f} s ({args.users / blocked:10.0f} users/s)")
+
+
+if __name__ == '__main__':
+    main()
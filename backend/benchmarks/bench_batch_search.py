@@ -0,0 +1,72 @@
+"""POST /search/batch 지연 시간 벤치마크 (로컬 대역 사용)
+
+검색어 N개를 /search 경로(get_recommendations_async)로 하나씩 차례로 처리할 때와
+배치 경로(get_recommendations_batch_async: 임베딩 호출 한 번 + 다중 벡터 질의)로
+한 번에 처리할 때의 전체 지연 시간을 비교합니다. 임베딩 API와 원격 벡터 DB는
+bench_search_concurrency의 지연 시간 대역을 사용합니다.
+
+실행: python -m backend.benchmarks.bench_batch_search --queries 4 8 16
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import os
+import tempfile
+import time
+from types import SimpleNamespace
+
+import numpy as np
+
+from backend.benchmarks.bench_search_concurrency import StandInEmbeddings, StandInRemoteStore
+from backend.vector.embedding_cache import EmbeddingCache
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--queries', type=int, nargs='+', default=[4, 8, 16])
+    parser.add_argument('--embedding-latency', type=float, default=0.15)
+    parser.add_argument('--query-latency', type=float, default=0.05)
+    parser.add_argument('--vectors', type=int, default=10_000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ['VECTOR_STORE_BACKEND'] = 'local'
+        os.environ['LOCAL_VECTOR_STORE_DIR'] = tmp
+        with contextlib.redirect_stdout(io.StringIO()):
+            from backend.vector import emb_search
+
+        local = emb_search.get_index()
+        vectors = np.random.default_rng(1).normal(size=(args.vectors, local.dim)).astype(np.float32)
+        local.upsert([{'id': str(i), 'values': v, 'metadata': {'user_id': f"u{i % 500}"}}
+                      for i, v in enumerate(vectors)])
+        remote = StandInRemoteStore(local, args.query_latency)
+        async_client = SimpleNamespace(embeddings=StandInEmbeddings(args.embedding_latency, local.dim, True))
+        emb_search.get_index = lambda: remote
+        emb_search.get_async_openai_client = lambda: async_client
+        emb_search.embedding_cache = EmbeddingCache(path=None, max_entries=0)  # 매 요청 임베딩 호출
+
+        async def sequential(queries):
+            return [await emb_search.get_recommendations_async(q) for q in queries]
+
+        async def batch(queries):
+            return await emb_search.get_recommendations_batch_async(queries)
+
+        print(f"embedding latency {args.embedding_latency * 1000:.0f} ms, "
+              f"vector query latency {args.query_latency * 1000:.0f} ms, vectors={args.vectors}")
+        print(f"{'queries':>7} | {'sequential /search':>18} | {'/search/batch':>13} | {'speedup':>7}")
+        for n in args.queries:
+            queries = [f"query {i}" for i in range(n)]
+            with contextlib.redirect_stdout(io.StringIO()):
+                start = time.perf_counter()
+                asyncio.run(sequential(queries))
+                sequential_time = time.perf_counter() - start
+                start = time.perf_counter()
+                asyncio.run(batch(queries))
+                batch_time = time.perf_counter() - start
+            print(f"{n:>7} | {sequential_time * 1000:>15.0f} ms | {batch_time * 1000:>10.0f} ms | "
+                  f"{sequential_time / batch_time:>6.1f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,51 @@
+"""BM25 색인 크기/검색 지연 시간 벤치마크
+
+합성 사용자 데이터(bench_recommender_memory.make_corpus)로 Bm25Index를 만들고,
+varint로 압축한 posting 크기를 (문서 번호, 빈도)를 int32 두 개로 둘 때와 비교한 뒤
+BM25만 쓰는 사용자 검색(lexical 모드)의 질의당 지연 시간을 측정합니다.
+
+실행: python -m backend.benchmarks.bench_lexical_search --users 20000
+"""
+import argparse
+import json
+import time
+
+from backend.benchmarks.bench_recommender_memory import make_corpus
+from backend.service.user_store import UserStore
+from backend.vector.bm25 import Bm25Index, decode_varints
+
+QUERIES = ["PCR", "원심분리기", "세포 경로", "트립신 항체", "조절 메커니즘 규명", "유세포분석기 사이토카인"]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--users', type=int, default=20_000)
+    parser.add_argument('--papers', type=int, default=3)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    store = UserStore.from_records(json.loads(make_corpus(args.users, args.papers)))
+    start = time.perf_counter()
+    index = Bm25Index.from_store(store)
+    build = time.perf_counter() - start
+
+    pairs = sum(len(decode_varints(bytes(p))) for p in index._postings.values()) // 2
+    compressed = index.posting_bytes()
+    print(f"users={args.users} papers={len(index)} terms={len(index._postings)} build {build:.1f} s")
+    print(f"postings: {pairs} (doc, tf) pairs, {compressed / 2**20:.1f} MiB varint vs "
+          f"{pairs * 8 / 2**20:.1f} MiB as int32 pairs ({pairs * 8 / compressed:.1f}x)")
+
+    start = time.perf_counter()
+    index.add_papers("new-user", store.papers(0))
+    print(f"incremental add of {store.paper_count(0)} papers: {(time.perf_counter() - start) * 1000:.2f} ms")
+
+    print(f"{'query':>16} | {'ms/query':>8}")
+    for query in QUERIES:
+        start = time.perf_counter()
+        for _ in range(args.repeat):
+            index.search_users(query, top_k=10)
+        print(f"{query:>16} | {(time.perf_counter() - start) / args.repeat * 1000:>8.2f}")
+
+
+if __name__ == '__main__':
+    main()
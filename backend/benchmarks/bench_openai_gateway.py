@@ -0,0 +1,143 @@
+"""OpenAI 게이트웨이 벤치마크 (한도를 흉내 내는 로컬 대역 사용)
+
+초당 요청 수/토큰 수 한도를 넘으면 429를 돌려주는 OpenAI 대역에 백그라운드 논문 분석 요청을
+여러 스레드로 보내면서, 그 사이에 검색어 임베딩(interactive) 요청을 일정한 간격으로 보냅니다.
+- direct: 각자 바로 호출 (openai 클라이언트 기본값처럼 0.5초부터 2배씩 2번 재시도 후 포기)
+- gateway: OpenAIGateway를 거쳐 호출 (토큰 버킷, 우선순위, 지터 백오프; 한도 상태는 메모리에 두는 path=None)
+- one-lane: gateway와 같지만 검색 임베딩도 BACKGROUND로 보냄 (우선순위 효과 비교용)
+전체 시간, 처리량, 429 수, 포기한(잃어버린) 요청 수, 검색 임베딩 지연 시간을 비교합니다.
+
+실행: python -m backend.benchmarks.bench_openai_gateway --requests 120 --threads 16
+"""
+import argparse
+import contextlib
+import io
+import random
+import statistics
+import threading
+import time
+
+import httpx
+import openai
+
+from backend.vector.openai_gateway import BACKGROUND, INTERACTIVE, OpenAIGateway
+
+
+class StandInProvider:
+    """초 단위 구간마다 요청 수/토큰 수를 세어 한도를 넘으면 429를 내는 OpenAI 대역"""
+
+    def __init__(self, requests_per_second: int, tokens_per_second: int, latency: float):
+        self.rps = requests_per_second
+        self.tps = tokens_per_second
+        self.latency = latency
+        self.rate_limited = 0
+        self._window = None
+        self._requests = 0
+        self._tokens = 0
+        self._lock = threading.Lock()
+
+    def call(self, tokens: int):
+        with self._lock:
+            window = int(time.monotonic())
+            if window != self._window:
+                self._window, self._requests, self._tokens = window, 0, 0
+            if self._requests + 1 > self.rps or self._tokens + tokens > self.tps:
+                self.rate_limited += 1
+                response = httpx.Response(429, request=httpx.Request("POST", "https://api.openai.com/v1/chat"))
+                raise openai.RateLimitError("rate limited", response=response, body=None)
+            self._requests += 1
+            self._tokens += tokens
+        time.sleep(self.latency)
+        return tokens
+
+
+def direct_call(provider: StandInProvider, tokens: int, priority: int, max_retries: int = 2):
+    for attempt in range(max_retries + 1):
+        try:
+            return provider.call(tokens)
+        except openai.RateLimitError:
+            if attempt == max_retries:
+                raise
+            time.sleep(min(0.5 * 2 ** attempt, 8) * random.uniform(0.75, 1.0))
+
+
+def run(call, n_requests: int, threads: int, tokens: int, search_interval: float):
+    """(전체 시간, 완료 수, 포기 수, 검색 임베딩 지연 시간 목록)"""
+    pending = list(range(n_requests))
+    done, lost, latencies = [], [], []
+    lock = threading.Lock()
+    finished = threading.Event()
+
+    def background():
+        while True:
+            with lock:
+                if not pending:
+                    return
+                pending.pop()
+            try:
+                call(tokens, BACKGROUND)
+                done.append(1)
+            except openai.RateLimitError:
+                lost.append(1)
+
+    def searches():
+        while not finished.is_set():
+            start = time.perf_counter()
+            try:
+                call(10, INTERACTIVE)
+                latencies.append(time.perf_counter() - start)
+            except openai.RateLimitError:
+                latencies.append(float('inf'))
+            finished.wait(search_interval)
+
+    start = time.perf_counter()
+    workers = [threading.Thread(target=background) for _ in range(threads)]
+    search = threading.Thread(target=searches)
+    for thread in workers + [search]:
+        thread.start()
+    for thread in workers:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    finished.set()
+    search.join()
+    return elapsed, len(done), len(lost), latencies
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--requests', type=int, default=120, help='백그라운드 분석 요청 수')
+    parser.add_argument('--threads', type=int, default=16)
+    parser.add_argument('--tokens', type=int, default=1500, help='분석 요청 하나의 토큰 수')
+    parser.add_argument('--rps', type=int, default=20, help='대역의 초당 요청 한도')
+    parser.add_argument('--tps', type=int, default=20_000, help='대역의 초당 토큰 한도')
+    parser.add_argument('--latency', type=float, default=0.2)
+    parser.add_argument('--search-interval', type=float, default=0.2)
+    args = parser.parse_args()
+
+    limit = min(args.rps, args.tps / args.tokens)
+    print(f"provider limit {args.rps} req/s, {args.tps} tokens/s (= {limit:.1f} analyses/s), "
+          f"{args.requests} analyses x {args.tokens} tokens, {args.threads} threads")
+    print(f"{'mode':>8} | {'time':>6} | {'done/s':>6} | {'429s':>5} | {'lost':>4} | "
+          f"{'search p50':>10} | {'search p95':>10}")
+    for mode in ('direct', 'gateway', 'one-lane'):
+        provider = StandInProvider(args.rps, args.tps, args.latency)
+        if mode == 'direct':
+            def call(tokens, priority):
+                return direct_call(provider, tokens, priority)
+        else:
+            gateway = OpenAIGateway(limit=(args.rps * 60, args.tps * 60), path=None, retry_delay=0.5)
+
+            def call(tokens, priority, lanes=(mode == 'gateway')):
+                return gateway.request(lambda: provider.call(tokens), 'm', tokens,
+                                       priority if lanes else BACKGROUND)
+        with contextlib.redirect_stdout(io.StringIO()):
+            elapsed, done, lost, latencies = run(call, args.requests, args.threads, args.tokens,
+                                                 args.search_interval)
+        latencies.sort()
+        p95 = latencies[int(len(latencies) * 0.95)]
+        print(f"{mode:>8} | {elapsed:5.1f}s | {done / elapsed:6.1f} | {provider.rate_limited:5d} | {lost:4d} | "
+              f"{statistics.median(latencies) * 1000:8.0f}ms | {p95 * 1000:8.0f}ms")
+
+
+if __name__ == '__main__':
+    main()
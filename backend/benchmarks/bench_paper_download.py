@@ -0,0 +1,90 @@
+"""analyze.download_papers 동시 다운로드 벤치마크
+
+로컬 HTTP 서버를 Sci-Hub 대신 띄워 (요청마다 지연, 일부 논문은 404) 프로필 하나에 필요한
+논문 5편/20편을 받는 데 걸리는 시간을 동시 다운로드 수(workers)별로 측정합니다.
+workers=1이 기존의 한 편씩 받는 방식과 같습니다.
+
+실행: python -m backend.benchmarks.bench_paper_download --latency 0.4 --missing 0.3 --workers 1 4 8
+"""
+import argparse
+import random
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from analyze import Workspace, download_papers
+
+
+def start_server(latency: float, missing: float, seed: int = 0):
+    """제목을 받아 latency(±50%) 뒤에 PDF를 돌려주는 서버 (missing 비율의 제목은 404)"""
+    rng = random.Random(seed)
+    absent = set()
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            title = urllib.parse.unquote(self.path[1:])
+            time.sleep(latency * rng.uniform(0.5, 1.5))
+            if title in absent:
+                self.send_response(404)
+                self.end_headers()
+                return
+            body = b'%PDF-1.4\n' + b'0' * 200_000
+            self.send_response(200)
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    def mark_missing(titles):
+        absent.update(t for t in titles if rng.random() < missing)
+
+    return server, mark_missing
+
+
+def http_downloader(base_url: str, timeout: float):
+    def download(title):
+        try:
+            with urllib.request.urlopen(f"{base_url}/{urllib.parse.quote(title)}", timeout=timeout) as response:
+                return response.read()
+        except urllib.error.HTTPError:
+            return None
+    return download
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--publications', type=int, default=60, help='저자의 논문 수')
+    parser.add_argument('--papers', type=int, nargs='+', default=[5, 20], help='받을 논문 수 (max_download)')
+    parser.add_argument('--latency', type=float, default=0.4, help='다운로드 하나의 평균 지연 (초)')
+    parser.add_argument('--missing', type=float, default=0.3, help='서버에 없는 논문 비율')
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 4, 8])
+    args = parser.parse_args()
+
+    server, mark_missing = start_server(args.latency, args.missing)
+    base_url = f"http://127.0.0.1:{server.server_address[1]}"
+    titles = [f"publication {i}" for i in range(args.publications)]
+    mark_missing(titles)
+    downloader = http_downloader(base_url, timeout=10 * args.latency)
+
+    print(f"{'papers':>6} | {'workers':>7} | {'got':>3} | {'wall s':>7}")
+    for papers in args.papers:
+        for workers in args.workers:
+            with Workspace() as workspace:
+                start = time.perf_counter()
+                paths = download_papers(titles, workspace, max_download=papers, downloader=downloader,
+                                        workers=workers, timeout=10 * args.latency)
+                elapsed = time.perf_counter() - start
+            print(f"{papers:>6} | {workers:>7} | {len(paths):>3} | {elapsed:>7.2f}")
+    server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,114 @@
+"""analyze PDF 텍스트 추출 벤치마크
+
+섹션 구성이 일반적인 합성 논문 PDF(제목/초록, 서론, 재료 및 방법, 결과, 고찰, 참고문헌)를
+만들어, 기존 방식(모든 페이지를 한 프로세스에서 추출해 통째로 전송)과 새 방식(프로세스 풀,
+방법 섹션 이후 페이지 생략, 초록/방법만 토큰 예산 안에서 전송)의 추출 시간과 모델에 보내는
+글자 수를 비교합니다.
+
+실행: python -m backend.benchmarks.bench_pdf_extraction --papers 8 --pages 20
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+
+import PyPDF2
+
+import analyze
+
+WORDS = ("cell protein expression buffer sample incubated antibody analysis signal membrane "
+         "culture medium concentration samples measured using described previously tissue").split()
+
+
+def _escape(line: str) -> str:
+    return line.replace('\\', '\\\\').replace('(', '\\(').replace(')', '\\)')
+
+
+def write_pdf(path: str, pages):
+    """페이지별 줄 목록으로 텍스트 PDF 작성 (Helvetica, 외부 라이브러리 없음)"""
+    objects = [b"<< /Type /Catalog /Pages 2 0 R >>", None,
+               b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"]
+    kids = []
+    for lines in pages:
+        stream = ("BT /F1 9 Tf 40 800 Td 11 TL " +
+                  " ".join(f"({_escape(line)}) Tj T*" for line in lines) + " ET").encode('latin-1')
+        objects.append(b"<< /Length %d >>\nstream\n" % len(stream) + stream + b"\nendstream")
+        objects.append(b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] "
+                       b"/Resources << /Font << /F1 3 0 R >> >> /Contents %d 0 R >>" % len(objects))
+        kids.append(len(objects))
+    objects[1] = b"<< /Type /Pages /Kids [%s] /Count %d >>" % (
+        b" ".join(b"%d 0 R" % k for k in kids), len(kids))
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, 1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n" % number + body + b"\nendobj\n"
+    xref = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    out += b"".join(b"%010d 00000 n \n" % offset for offset in offsets)
+    out += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref)
+    with open(path, 'wb') as f:
+        f.write(out)
+
+
+def synthetic_paper(n_pages: int, seed: int):
+    """섹션 비율이 일반적인 논문 (재료 및 방법은 전체의 20~35% 지점)"""
+    rng = random.Random(seed)
+    headings = {0: "Abstract", max(1, n_pages // 10): "1. Introduction", n_pages // 5: "2. Materials and Methods",
+                n_pages * 7 // 20: "3. Results", n_pages * 3 // 4: "4. Discussion", n_pages * 9 // 10: "References"}
+    pages = []
+    for p in range(n_pages):
+        lines = []
+        if p == 0:
+            lines += [f"Synthetic study {seed} of membrane signalling", "A. Author, B. Author",
+                      "Journal of Synthetic Biology (2024)", f"doi:10.1000/synthetic.{seed}"]
+        if p in headings:
+            lines.append(headings[p])
+        lines += [" ".join(rng.choice(WORDS) for _ in range(14)) for _ in range(68 - len(lines))]
+        pages.append(lines)
+    return pages
+
+
+def read_all(file_path):
+    """기존 read_pdf (모든 페이지를 이어 붙임)"""
+    with open(file_path, 'rb') as file:
+        reader = PyPDF2.PdfReader(file)
+        text = ""
+        for page in reader.pages:
+            text += page.extract_text()
+    return text
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--papers', type=int, default=8)
+    parser.add_argument('--pages', type=int, default=20)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        paths = []
+        for i in range(args.papers):
+            paths.append(os.path.join(tmp, f"{i:03d}.pdf"))
+            write_pdf(paths[-1], synthetic_paper(args.pages, i))
+
+        start = time.perf_counter()
+        before = [read_all(path) for path in paths]
+        serial = time.perf_counter() - start
+
+        analyze.extract_texts(paths[:1])  # 프로세스 풀 시작 비용은 제외
+        start = time.perf_counter()
+        after = analyze.extract_texts(paths)
+        pooled = time.perf_counter() - start
+
+    print(f"papers={args.papers} pages={args.pages} pdf_workers={analyze.PDF_WORKERS} cpus={os.cpu_count()}")
+    print(f"{'':>22} | {'wall s':>7} | {'chars/paper':>11} | {'~tokens/paper':>13}")
+    for name, elapsed, texts in (("all pages, serial", serial, before), ("budgeted, process pool", pooled, after)):
+        chars = sum(map(len, texts)) / len(texts)
+        print(f"{name:>22} | {elapsed:>7.2f} | {chars:>11.0f} | {chars / analyze.CHARS_PER_TOKEN:>13.0f}")
+    print(f"sections kept: {[kind for kind, _ in analyze.find_sections(after[0])]}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,90 @@
+"""Recommender 사용자 데이터 메모리 벤치마크
+
+기존 방식(json.load 결과인 list-of-dicts를 그대로 보관)과 UserStore(열 단위 저장소)의
+상주 메모리와 user_id 조회 시간을 비교합니다.
+
+실행: python -m backend.benchmarks.bench_recommender_memory --users 100000
+"""
+import argparse
+import gc
+import json
+import random
+import time
+import tracemalloc
+
+from backend.service.user_store import UserStore
+
+JOURNALS = ["Nature", "Cell", "Neuroscience Research", "Biochemical Journal", "Immunity"]
+EQUIPMENTS = ["형광현미경", "오실로스코프", "원심분리기", "PCR머신", "유세포분석기", "마이크로매니퓰레이터"]
+REAGENTS = ["FBS", "트립신", "항체", "프라이머", "사이토카인", "DNA 벡터"]
+NAMES = ["조생명", "장백신", "박세포", "이신경", "홍길동", "윤분자"]
+
+
+def make_corpus(n_users: int, papers_per_user: int, seed: int = 0) -> str:
+    """bio_research_nested.json과 같은 형식의 합성 데이터(JSON 문자열) 생성"""
+    rng = random.Random(seed)
+    users = []
+    for u in range(n_users):
+        papers = []
+        for p in range(papers_per_user):
+            papers.append({
+                "title": f"연구 제목 {u}-{p}",
+                "abstract": f"세포 경로 및 조절 메커니즘 규명 {u}-{p}",
+                "year": rng.randint(2015, 2025),
+                "journal": rng.choice(JOURNALS),
+                "doi": f"10.{rng.randint(1000, 9999)}/abc.{u}.{p}" if rng.random() < 0.5 else None,
+                "authors": rng.sample(NAMES, 3),
+                "equipments": rng.sample(EQUIPMENTS, 3),
+                "reagents": rng.sample(REAGENTS, 3),
+                "vector_embedding_id": None,
+            })
+        users.append({"user_id": f"user{u}", "papers": papers})
+    return json.dumps(users, ensure_ascii=False)
+
+
+def measure(build):
+    """build()가 만든 객체가 상주하는 메모리(bytes)와 객체를 반환"""
+    gc.collect()
+    tracemalloc.start()
+    obj = build()
+    gc.collect()
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return current, obj
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--users", type=int, default=100_000)
+    parser.add_argument("--papers", type=int, default=3)
+    parser.add_argument("--lookups", type=int, default=200)
+    args = parser.parse_args()
+
+    raw = make_corpus(args.users, args.papers)
+    print(f"users={args.users} papers/user={args.papers} json={len(raw) / 2**20:.1f} MiB")
+
+    list_bytes, users = measure(lambda: json.loads(raw))
+    store_bytes, store = measure(lambda: UserStore.from_records(json.loads(raw)))
+
+    print(f"list-of-dicts : {list_bytes / 2**20:8.1f} MiB ({list_bytes / args.users:7.0f} B/user)")
+    print(f"UserStore     : {store_bytes / 2**20:8.1f} MiB ({store_bytes / args.users:7.0f} B/user)")
+    print(f"reduction     : {1 - store_bytes / list_bytes:.0%}")
+
+    targets = [f"user{random.randrange(args.users)}" for _ in range(args.lookups)]
+
+    start = time.perf_counter()
+    for target in targets:
+        next(i for i, user in enumerate(users) if user["user_id"] == target)
+    linear = (time.perf_counter() - start) / args.lookups
+
+    start = time.perf_counter()
+    for target in targets:
+        store.row_of(target)
+    indexed = (time.perf_counter() - start) / args.lookups
+
+    print(f"lookup linear : {linear * 1e6:10.1f} us")
+    print(f"lookup dict   : {indexed * 1e6:10.3f} us")
+
+
+if __name__ == "__main__":
+    main()
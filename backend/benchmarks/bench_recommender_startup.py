@@ -0,0 +1,48 @@
+"""Recommender 기동 시간 벤치마크
+
+스냅샷이 없을 때(JSON 파싱 + TF-IDF 학습 + 이웃 테이블 계산 + 저장)와
+스냅샷이 있을 때(메모리 매핑 복원)의 Recommender() 생성 시간을 비교합니다.
+
+실행: python -m backend.benchmarks.bench_recommender_startup --users 20000
+"""
+import argparse
+import os
+import tempfile
+import time
+
+from backend.benchmarks.bench_recommender_memory import make_corpus
+from backend.service.recommender import Recommender
+
+
+def timed_start(data_path: str, snapshot_dir: str) -> float:
+    start = time.perf_counter()
+    recommender = Recommender(data_path=data_path, snapshot_dir=snapshot_dir)
+    elapsed = time.perf_counter() - start
+    assert recommender.user_vectors is not None
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--users", type=int, default=20_000)
+    parser.add_argument("--papers", type=int, default=3)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        data_path = os.path.join(tmp, "users.json")
+        with open(data_path, "w", encoding="utf-8") as f:
+            f.write(make_corpus(args.users, args.papers))
+        snapshot_dir = os.path.join(tmp, "snapshots")
+
+        cold = timed_start(data_path, snapshot_dir)
+        warm = min(timed_start(data_path, snapshot_dir) for _ in range(args.repeat))
+
+    print(f"users={args.users} papers/user={args.papers}")
+    print(f"without snapshot (fit + save) : {cold:8.2f} s")
+    print(f"with snapshot (mmap restore)  : {warm:8.2f} s")
+    print(f"speedup                       : {cold / warm:8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""워커 수에 따른 Recommender 메모리 벤치마크
+
+W개의 프로세스가 동시에 같은 스냅샷으로 Recommender를 띄웠을 때 전체 PSS(공유 페이지를
+프로세스 수로 나눠 센 메모리)를 측정합니다. 비교용 private 모드는 각 워커가 배열과 사용자
+저장소를 자기 메모리로 복사하며, 스냅샷 공유 이전처럼 워커마다 데이터를 따로 갖는 경우입니다.
+Linux의 /proc/self/smaps_rollup이 필요합니다.
+
+실행: python -m backend.benchmarks.bench_recommender_workers --users 50000
+"""
+import argparse
+import multiprocessing as mp
+import os
+import tempfile
+
+import numpy as np
+
+from backend.benchmarks.bench_recommender_memory import make_corpus
+from backend.service.recommender import Recommender
+
+
+def _memory_kib() -> dict:
+    values = {}
+    with open('/proc/self/smaps_rollup') as f:
+        for line in f:
+            parts = line.split()
+            if parts[0] in ('Rss:', 'Pss:'):
+                values[parts[0][:-1]] = int(parts[1])
+    return values
+
+
+def _worker(data_path, snapshot_dir, private, barrier, results):
+    import contextlib
+    with contextlib.redirect_stdout(open(os.devnull, 'w')):
+        recommender = Recommender(data_path=data_path, snapshot_dir=snapshot_dir)
+    if private:
+        state = recommender._state
+        vectors = state.user_vectors
+        recommender._state = state._replace(
+            store=state.store.to_mutable(),
+            user_vectors=vectors.__class__(
+                (np.array(vectors.data), np.array(vectors.indices), np.array(vectors.indptr)), shape=vectors.shape),
+            neighbor_ids=np.array(state.neighbor_ids),
+            neighbor_scores=np.array(state.neighbor_scores),
+            active=np.array(state.active),
+            df=np.array(state.df),
+        )
+
+    # 모든 페이지를 실제로 읽어 상주시킴
+    checksum = float(recommender.user_vectors.data.sum()) + float(recommender.neighbor_scores.sum())
+    for row in range(len(recommender.store)):
+        recommender.store.papers(row)
+
+    barrier.wait()
+    results.put((_memory_kib(), checksum))
+    barrier.wait()
+
+
+def run(workers, data_path, snapshot_dir, private):
+    ctx = mp.get_context('spawn')
+    barrier = ctx.Barrier(workers)
+    results = ctx.Queue()
+    procs = [ctx.Process(target=_worker, args=(data_path, snapshot_dir, private, barrier, results))
+             for _ in range(workers)]
+    for proc in procs:
+        proc.start()
+    memory = [results.get()[0] for _ in procs]
+    for proc in procs:
+        proc.join()
+    return sum(m['Pss'] for m in memory) / 1024, sum(m['Rss'] for m in memory) / 1024
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--users', type=int, default=50_000)
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4, 8])
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        data_path = os.path.join(tmp, 'users.json')
+        with open(data_path, 'w', encoding='utf-8') as f:
+            f.write(make_corpus(args.users, 3))
+        snapshot_dir = os.path.join(tmp, 'snapshots')
+        Recommender(data_path=data_path, snapshot_dir=snapshot_dir)  # 스냅샷 생성
+
+        print(f"users={args.users}")
+        print(f"{'workers':>7} | {'shared PSS MiB':>14} | {'private PSS MiB':>15}")
+        for workers in args.workers:
+            shared, _ = run(workers, data_path, snapshot_dir, private=False)
+            private, _ = run(workers, data_path, snapshot_dir, private=True)
+            print(f"{workers:>7} | {shared:>14.1f} | {private:>15.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,112 @@
+"""동시 /search 요청 처리량 벤치마크 (로컬 대역 사용)
+
+OpenAI 임베딩과 원격 벡터 검색을 지연 시간만 흉내 내는 대역으로 바꾼 뒤,
+기존 동기 경로(get_recommendations)와 비동기 경로(get_recommendations_async)를
+한 이벤트 루프에서 동시에 실행해 전체 소요 시간을 비교합니다.
+동기 경로는 이벤트 루프를 막으므로 요청이 직렬로 처리됩니다.
+
+실행: python -m backend.benchmarks.bench_search_concurrency --concurrency 1 8 32
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import os
+import tempfile
+import time
+from types import SimpleNamespace
+
+import numpy as np
+
+from backend.vector.embedding_cache import EmbeddingCache
+
+
+class StandInEmbeddings:
+    """OpenAI embeddings.create 대역 (지연 시간 후 고정 난수 벡터 반환)"""
+
+    def __init__(self, latency: float, dim: int, is_async: bool):
+        self.latency = latency
+        self.vector = np.random.default_rng(0).normal(size=dim).tolist()
+        if is_async:
+            self.create = self._create_async
+
+    def _response(self, input):
+        texts = input if isinstance(input, list) else [input]
+        return SimpleNamespace(data=[SimpleNamespace(index=i, embedding=self.vector) for i in range(len(texts))])
+
+    def create(self, model, input):
+        time.sleep(self.latency)
+        return self._response(input)
+
+    async def _create_async(self, model, input):
+        await asyncio.sleep(self.latency)
+        return self._response(input)
+
+
+class StandInRemoteStore:
+    """원격 벡터 DB 대역 (네트워크 지연 후 로컬 저장소에 질의)"""
+
+    def __init__(self, store, latency: float):
+        self.store = store
+        self.latency = latency
+
+    def query(self, **kwargs):
+        time.sleep(self.latency)
+        return self.store.query(**kwargs)
+
+    def query_many(self, vectors, **kwargs):
+        # Pinecone 어댑터는 질의들을 연결 풀에서 동시에 보내므로 왕복 한 번으로 근사
+        time.sleep(self.latency)
+        return self.store.query_many(vectors, **kwargs)
+
+
+async def run(handler, concurrency: int) -> float:
+    start = time.perf_counter()
+    await asyncio.gather(*(handler(f"query {i}") for i in range(concurrency)))
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--concurrency', type=int, nargs='+', default=[1, 8, 32])
+    parser.add_argument('--embedding-latency', type=float, default=0.15)
+    parser.add_argument('--query-latency', type=float, default=0.05)
+    parser.add_argument('--vectors', type=int, default=10_000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ['VECTOR_STORE_BACKEND'] = 'local'
+        os.environ['LOCAL_VECTOR_STORE_DIR'] = tmp
+        with contextlib.redirect_stdout(io.StringIO()):
+            from backend.vector import emb_search
+
+        local = emb_search.get_index()
+        vectors = np.random.default_rng(1).normal(size=(args.vectors, local.dim)).astype(np.float32)
+        local.upsert([{'id': str(i), 'values': v, 'metadata': {'user_id': f"u{i % 500}"}}
+                      for i, v in enumerate(vectors)])
+        remote = StandInRemoteStore(local, args.query_latency)
+        client = SimpleNamespace(embeddings=StandInEmbeddings(args.embedding_latency, local.dim, False))
+        async_client = SimpleNamespace(embeddings=StandInEmbeddings(args.embedding_latency, local.dim, True))
+        emb_search.get_index = lambda: remote
+        emb_search.get_openai_client = lambda: client
+        emb_search.get_async_openai_client = lambda: async_client
+        emb_search.embedding_cache = EmbeddingCache(path=None, max_entries=0)  # 매 요청 임베딩 호출
+
+        async def sync_handler(query):
+            return emb_search.get_recommendations(query)
+
+        async def async_handler(query):
+            return await emb_search.get_recommendations_async(query)
+
+        print(f"embedding latency {args.embedding_latency * 1000:.0f} ms, "
+              f"vector query latency {args.query_latency * 1000:.0f} ms, vectors={args.vectors}")
+        print(f"{'concurrent':>10} | {'sync path':>10} | {'async path':>10} | {'speedup':>7}")
+        for concurrency in args.concurrency:
+            with contextlib.redirect_stdout(io.StringIO()):
+                sync_time = asyncio.run(run(sync_handler, concurrency))
+                async_time = asyncio.run(run(async_handler, concurrency))
+            print(f"{concurrency:>10} | {sync_time:>8.2f} s | {async_time:>8.2f} s | {sync_time / async_time:>6.1f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,74 @@
+"""샤드 수에 따른 ShardedRecommender 처리량 벤치마크
+
+합성 희소 사용자 행렬(기본 2,000,000명 x 100차원, 행당 약 18개 항)을 스냅샷 형식으로
+저장한 뒤, 샤드 수를 바꿔 가며 초당 질의 수를 측정합니다. 샤드는 별도 프로세스로 실행되므로
+샤드 수만큼 CPU 코어가 있어야 처리량이 선형에 가깝게 늘어납니다.
+
+실행: python -m backend.benchmarks.bench_sharded_recommender --users 2000000 --shards 1 2 4 8
+"""
+import argparse
+import json
+import os
+import tempfile
+import time
+
+import numpy as np
+
+from backend.service.recommender_snapshot import MANIFEST, SNAPSHOT_VERSION
+from backend.service.sharded_recommender import ShardedRecommender
+
+
+def write_synthetic_snapshot(directory: str, n_users: int, n_features: int, nnz_per_row: int, seed: int = 0):
+    """ShardedRecommender가 읽는 CSR 버퍼와 manifest만 가진 합성 스냅샷 생성"""
+    rng = np.random.default_rng(seed)
+    counts = rng.integers(1, 2 * nnz_per_row, size=n_users)
+    indptr = np.zeros(n_users + 1, dtype=np.int64)
+    np.cumsum(counts, out=indptr[1:])
+    indices = rng.integers(0, n_features, size=indptr[-1], dtype=np.int32)
+    data = rng.random(indptr[-1], dtype=np.float32)
+
+    # 행 단위 L2 정규화 (TF-IDF 출력과 같은 조건)
+    norms = np.sqrt(np.add.reduceat(data ** 2, indptr[:-1]))
+    data /= np.repeat(norms, counts)
+
+    os.makedirs(directory, exist_ok=True)
+    np.save(os.path.join(directory, 'data.npy'), data)
+    np.save(os.path.join(directory, 'indices.npy'), indices)
+    np.save(os.path.join(directory, 'indptr.npy'), indptr)
+    np.save(os.path.join(directory, 'active.npy'), np.ones(n_users, dtype=bool))
+    with open(os.path.join(directory, MANIFEST), 'w', encoding='utf-8') as f:
+        json.dump({'version': SNAPSHOT_VERSION, 'shape': [n_users, n_features]}, f)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--users', type=int, default=2_000_000)
+    parser.add_argument('--features', type=int, default=100)
+    parser.add_argument('--nnz', type=int, default=18)
+    parser.add_argument('--shards', type=int, nargs='+', default=[1, 2, 4, 8])
+    parser.add_argument('--queries', type=int, default=256)
+    parser.add_argument('--batch', type=int, default=16)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        start = time.perf_counter()
+        write_synthetic_snapshot(tmp, args.users, args.features, args.nnz)
+        print(f"users={args.users} features={args.features} "
+              f"corpus built in {time.perf_counter() - start:.1f} s, cpus={os.cpu_count()}")
+
+        rows = np.random.default_rng(1).integers(0, args.users, size=args.queries)
+        baseline = None
+        print(f"{'shards':>6} | {'queries/s':>10} | {'speedup':>7}")
+        for n_shards in args.shards:
+            with ShardedRecommender(tmp, n_shards=n_shards) as sharded:
+                sharded.query_rows(rows[:args.batch])  # 워밍업 (페이지 캐시 적재)
+                start = time.perf_counter()
+                for i in range(0, len(rows), args.batch):
+                    sharded.query_rows(rows[i:i + args.batch], n=10)
+                throughput = len(rows) / (time.perf_counter() - start)
+            baseline = baseline or throughput
+            print(f"{n_shards:>6} | {throughput:>10.1f} | {throughput / baseline:>6.2f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,19 @@
+import fcntl
+import os
+from contextlib import contextmanager
+
+
+@contextmanager
+def file_lock(path: str):
+    """path 파일로 거는 프로세스 간 배타적 잠금 (flock이라 같은 프로세스의 다른 스레드끼리도 배타적)
+
+    세대 디렉터리 + CURRENT 포인터로 저장하는 저장소들이 "최신 세대 읽기 -> 변경 적용 -> 새 세대 쓰기"를
+    한 번에 하도록 감싸는 데 쓴다.
+    """
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, 'a') as f:
+        fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
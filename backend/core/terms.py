@@ -0,0 +1,20 @@
+import unicodedata
+from typing import Any, Dict, Iterable, List
+
+_SEPARATORS = dict.fromkeys(map(ord, ' \t-_·./'), None)
+
+
+def term_key(term: str) -> str:
+    """표기 차이를 무시한 비교용 키 (NFC 정규화, 대소문자/공백/하이픈 무시)"""
+    return unicodedata.normalize('NFC', term).casefold().translate(_SEPARATORS)
+
+
+def term_keys(terms: Iterable[str]) -> List[str]:
+    """이름 목록의 비교용 키 (중복 제거, 순서 유지) - papers.equipment_keys/reagent_keys에 저장"""
+    return list(dict.fromkeys(key for key in map(term_key, terms) if key))
+
+
+def paper_key(paper: Dict[str, Any]) -> str:
+    """같은 논문을 알아보는 키 (DOI가 있으면 소문자 DOI, 없으면 제목의 term_key)"""
+    doi = (paper.get('doi') or '').strip().lower()
+    return f"doi:{doi}" if doi else f"title:{term_key(paper.get('title') or '')}"
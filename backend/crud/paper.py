@@ -1,16 +1,65 @@
 from sqlalchemy.orm import Session
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import and_, func, or_, select, String
+from sqlalchemy.dialects.postgresql import array
+from ..core.terms import term_keys
 from ..models.paper import Paper
 from ..schemas.paper import PaperCreate
 from datetime import datetime
+from typing import List
 
-async def create_paper(db: AsyncSession, paper: PaperCreate):
+def _paper_row(paper: PaperCreate) -> Paper:
     # Convert model dict and add current timestamp for created_at
     paper_dict = paper.dict()
     paper_dict['created_at'] = datetime.now()
-    
-    db_paper = Paper(**paper_dict)
+    paper_dict['equipment_keys'] = term_keys(paper_dict['equipments'])
+    paper_dict['reagent_keys'] = term_keys(paper_dict['reagents'])
+    return Paper(**paper_dict)
+
+async def create_paper(db: AsyncSession, paper: PaperCreate):
+    db_paper = _paper_row(paper)
     db.add(db_paper)
     await db.commit()
     await db.refresh(db_paper)
-    return db_paper
\ No newline at end of file
+    return db_paper
+
+async def add_papers(db: AsyncSession, papers: List[PaperCreate]):
+    """논문들을 세션에 추가만 함 (커밋은 호출하는 쪽에서 한 번에, 실패하면 rollback으로 모두 취소)"""
+    db_papers = [_paper_row(paper) for paper in papers]
+    db.add_all(db_papers)
+    await db.flush()
+    return db_papers
+
+async def get_papers_by_user(db: AsyncSession, user_id: str):
+    result = await db.execute(select(Paper).where(Paper.user_id == user_id))
+    return result.scalars().all()
+
+def users_by_terms_query(equipment_variants: List[List[str]], reagent_variants: List[List[str]], limit: int = 20):
+    """장비/시약 조건(조건마다 같은 뜻의 표기 목록)을 모두 만족하는 사용자와 조건별 논문 수 쿼리
+
+    표기들을 term_key로 바꿔 저장된 equipment_keys/reagent_keys와 비교하므로 대소문자/띄어쓰기/하이픈
+    차이는 무시된다 (메모리 색인과 같은 기준). 배열 겹침(&&) 조건이라 키 배열의 GIN 색인을 사용한다.
+    """
+    conditions = [Paper.equipment_keys.op('&&')(array(term_keys(variants), type_=String))
+                  for variants in equipment_variants]
+    conditions += [Paper.reagent_keys.op('&&')(array(term_keys(variants), type_=String))
+                   for variants in reagent_variants]
+    counts = [func.count().filter(condition) for condition in conditions]
+    score = sum(counts[1:], counts[0])
+    return (
+        select(Paper.user_id, score.label('score'), *counts)
+        .where(or_(*conditions))
+        .group_by(Paper.user_id)
+        .having(and_(*[count > 0 for count in counts]))
+        .order_by(score.desc(), Paper.user_id)
+        .limit(limit)
+    )
+
+
+async def get_users_by_terms(db: AsyncSession, equipment_variants: List[List[str]],
+                             reagent_variants: List[List[str]], limit: int = 20):
+    """users_by_terms_query 결과 [(user_id, score, 조건별 논문 수...)]"""
+    if not equipment_variants and not reagent_variants:
+        return []
+    result = await db.execute(users_by_terms_query(equipment_variants, reagent_variants, limit))
+    return result.all()
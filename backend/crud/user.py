@@ -3,8 +3,10 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from ..models.user import User
 from ..schemas.user import UserCreate, UserUpdate
 from sqlalchemy.future import select
+from sqlalchemy.orm import selectinload
 from datetime import datetime
 import uuid
+from typing import List
 
 async def get_user(db: AsyncSession, user_id: str):
     """사용자가 지정한 user_id로 사용자 조회"""
@@ -13,6 +15,15 @@ async def get_user(db: AsyncSession, user_id: str):
     )
     return result.scalar_one_or_none()
 
+async def get_users_by_user_ids(db: AsyncSession, user_ids: List[str]):
+    """user_id 목록의 사용자와 논문을 한 번에 조회 (IN 쿼리 + selectinload)"""
+    if not user_ids:
+        return []
+    result = await db.execute(
+        select(User).where(User.user_id.in_(user_ids)).options(selectinload(User.papers))
+    )
+    return result.scalars().all()
+
 async def get_user_by_id(db: AsyncSession, id: uuid.UUID):
     """시스템 내부 UUID로 사용자 조회"""
     result = await db.execute(
@@ -0,0 +1,30 @@
+"""add_gin_indexes_on_paper_terms
+
+Revision ID: 5b2f8c1d9e47
+Revises: 77e1907f4eb9
+Create Date: 2026-10-18 09:12:31.482016
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5b2f8c1d9e47'
+down_revision: Union[str, None] = '77e1907f4eb9'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index('ix_papers_equipments_gin', 'papers', ['equipments'], unique=False, postgresql_using='gin')
+    op.create_index('ix_papers_reagents_gin', 'papers', ['reagents'], unique=False, postgresql_using='gin')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_papers_reagents_gin', table_name='papers', postgresql_using='gin')
+    op.drop_index('ix_papers_equipments_gin', table_name='papers', postgresql_using='gin')
@@ -0,0 +1,59 @@
+"""add_term_keys_to_papers
+
+Revision ID: c3a7e91f2b60
+Revises: 5b2f8c1d9e47
+Create Date: 2026-10-18 15:40:07.219354
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+from backend.core.terms import term_keys
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c3a7e91f2b60'
+down_revision: Union[str, None] = '5b2f8c1d9e47'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+BATCH_SIZE = 1000
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('papers', sa.Column('equipment_keys', postgresql.ARRAY(sa.String()), server_default='{}', nullable=False))
+    op.add_column('papers', sa.Column('reagent_keys', postgresql.ARRAY(sa.String()), server_default='{}', nullable=False))
+
+    # 앱과 같은 term_key로 기존 논문의 키를 채움 (SQL로 흉내 내면 casefold 등이 어긋날 수 있음)
+    bind = op.get_bind()
+    papers = sa.table('papers', sa.column('id', postgresql.UUID()),
+                      sa.column('equipments', postgresql.ARRAY(sa.String())),
+                      sa.column('reagents', postgresql.ARRAY(sa.String())),
+                      sa.column('equipment_keys', postgresql.ARRAY(sa.String())),
+                      sa.column('reagent_keys', postgresql.ARRAY(sa.String())))
+    rows = bind.execute(sa.select(papers.c.id, papers.c.equipments, papers.c.reagents)).all()
+    update = (papers.update().where(papers.c.id == sa.bindparam('paper_id'))
+              .values(equipment_keys=sa.bindparam('equipment_keys'), reagent_keys=sa.bindparam('reagent_keys')))
+    for start in range(0, len(rows), BATCH_SIZE):
+        bind.execute(update, [{'paper_id': id, 'equipment_keys': term_keys(equipments or []),
+                               'reagent_keys': term_keys(reagents or [])}
+                              for id, equipments, reagents in rows[start:start + BATCH_SIZE]])
+
+    op.drop_index('ix_papers_reagents_gin', table_name='papers', postgresql_using='gin')
+    op.drop_index('ix_papers_equipments_gin', table_name='papers', postgresql_using='gin')
+    op.create_index('ix_papers_equipment_keys_gin', 'papers', ['equipment_keys'], unique=False, postgresql_using='gin')
+    op.create_index('ix_papers_reagent_keys_gin', 'papers', ['reagent_keys'], unique=False, postgresql_using='gin')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_papers_reagent_keys_gin', table_name='papers', postgresql_using='gin')
+    op.drop_index('ix_papers_equipment_keys_gin', table_name='papers', postgresql_using='gin')
+    op.create_index('ix_papers_equipments_gin', 'papers', ['equipments'], unique=False, postgresql_using='gin')
+    op.create_index('ix_papers_reagents_gin', 'papers', ['reagents'], unique=False, postgresql_using='gin')
+    op.drop_column('papers', 'reagent_keys')
+    op.drop_column('papers', 'equipment_keys')
@@ -1,6 +1,9 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from backend.api.v1.endpoints import user, tool, paper, interest, current_study, recommend, profile
+from backend.api.v1.endpoints import user, tool, paper, interest, current_study, recommend, profile, equipment
+from backend.vector import clients
+from backend.vector.emb_search import index_name as search_index_name
+import asyncio
 import sys
 import os
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
@@ -26,6 +29,12 @@ app.include_router(interest.router, prefix="/api/v1")
 app.include_router(current_study.router, prefix="/api/v1")
 app.include_router(recommend.router, prefix="/api/v1")
 app.include_router(profile.router, prefix="/api/v1")
+app.include_router(equipment.router, prefix="/api/v1")
+
+@app.on_event("startup")
+async def warm_up_clients():
+    # Connect to the vector store in the background so startup never waits on remote calls
+    asyncio.get_running_loop().run_in_executor(None, clients.warm_up, search_index_name)
 
 @app.get("/")
 def read_root():
@@ -33,4 +42,4 @@ def read_root():
 
 @app.get("/health")
 def health_check():
-    return {"status": "healthy"}
\ No newline at end of file
+    return {"status": "healthy", **clients.readiness()}
\ No newline at end of file
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, Text, TIMESTAMP, ForeignKey, ARRAY, Integer
+from sqlalchemy import Column, String, Text, TIMESTAMP, ForeignKey, ARRAY, Integer, Index
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import relationship
 from ..db.base_class import Base  # Import Base directly from base_class
@@ -6,6 +6,11 @@ import uuid
 
 class Paper(Base):
     __tablename__ = "papers"
+    # 장비/시약 배열 겹침(&&) 검색용 GIN 색인 (표기 차이를 없앤 term_key 배열에 건다)
+    __table_args__ = (
+        Index("ix_papers_equipment_keys_gin", "equipment_keys", postgresql_using="gin"),
+        Index("ix_papers_reagent_keys_gin", "reagent_keys", postgresql_using="gin"),
+    )
 
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     user_id = Column(String, ForeignKey("users.user_id"), nullable=False)
@@ -18,6 +23,9 @@ class Paper(Base):
     created_at = Column(TIMESTAMP, nullable=False)
     equipments = Column(ARRAY(String), nullable=False)
     reagents = Column(ARRAY(String), nullable=False)
+    # equipments/reagents의 term_key (core.terms) - 대소문자/띄어쓰기가 달라도 검색되게
+    equipment_keys = Column(ARRAY(String), nullable=False, server_default="{}")
+    reagent_keys = Column(ARRAY(String), nullable=False, server_default="{}")
     vector_embedding_id = Column(UUID(as_uuid=True), nullable=True)
 
     # Add the relationship to the User model
@@ -1,5 +1,5 @@
 from pydantic import BaseModel
-from typing import Optional, List
+from typing import Any, Dict, Optional, List
 from uuid import UUID
 
 class ProfileCreateRequest(BaseModel):
@@ -16,4 +16,17 @@ class PaperContent(BaseModel):
 class ProfileCreateResponse(BaseModel):
     message: str
     status: str
-    paper_count: int
\ No newline at end of file
+    paper_count: int
+    job_id: Optional[str] = None
+
+class ProfileJobStatus(BaseModel):
+    job_id: str
+    status: str  # queued / running / succeeded / failed
+    stage: str  # analyzing, embedding, storing, indexing, retrying, done, failed ...
+    progress: float
+    attempts: int
+    max_attempts: int
+    result: Optional[Dict[str, Any]] = None
+    error: Optional[str] = None
+    created_at: float
+    updated_at: float
\ No newline at end of file
@@ -0,0 +1,19 @@
+from pydantic import BaseModel
+from typing import List, Literal, Optional, Union
+
+class BatchRecommendationRequest(BaseModel):
+    user_ids: Union[List[str], Literal["all"]] = "all"  # 추천을 계산할 사용자 목록 또는 전체
+    n_recommendations: int = 5
+
+class BatchSearchRequest(BaseModel):
+    queries: List[str]  # 검색어 목록 (결과도 같은 순서)
+    top_k: int = 5
+    aggregation: Literal["max", "mean", "sum"] = "max"
+    mode: Literal["dense", "hybrid", "lexical", "profile"] = "dense"  # /search의 mode와 같음
+    # /search와 같은 메타데이터 필터 (모든 검색어에 공통 적용)
+    year_from: Optional[int] = None
+    year_to: Optional[int] = None
+    journal: Optional[List[str]] = None
+    equipment: Optional[List[str]] = None
+    reagent: Optional[List[str]] = None
+    user_id: Optional[List[str]] = None
@@ -0,0 +1,126 @@
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Optional, Tuple
+
+from ..vector.embedding_cache import normalize_text
+
+DEFAULT_CACHE_PATH = os.getenv(
+    'ANALYSIS_CACHE_PATH',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), '../data/analysis_cache.sqlite3'),
+)
+
+_DOI = re.compile(r'10\.\d{4,9}/[^\s"<>?#]+')
+_PUNCTUATION = re.compile(r'[^\w\s]')
+
+KEY_KINDS = ('doi', 'text', 'title')  # 조회 순서 (정확한 키부터)
+
+
+def doi_key(value: Optional[str]) -> Optional[str]:
+    """문자열(DOI, doi.org 링크 등)에서 찾은 DOI를 소문자로 (없으면 None)"""
+    match = _DOI.search(value or '')
+    return match.group(0).rstrip('.').casefold() if match else None
+
+
+def text_key(text: Optional[str]) -> Optional[str]:
+    """추출한 본문의 sha256 (공백/대소문자 정규화 후)"""
+    return hashlib.sha256(normalize_text(text).encode('utf-8')).hexdigest() if text else None
+
+
+def title_key(title: Optional[str]) -> Optional[str]:
+    """구두점을 뺀 정규화 제목 (너무 짧으면 다른 논문과 겹칠 수 있어 None)"""
+    key = ' '.join(_PUNCTUATION.sub(' ', normalize_text(title or '')).split())
+    return key if len(key) >= 16 else None
+
+
+class AnalysisCache:
+    """논문 분석(analyze_paper) 결과 캐시
+
+    결과 하나를 DOI, 추출 본문 해시, 정규화 제목 여러 키로 찾을 수 있게 sqlite에 저장한다.
+    version(프롬프트/함수 스키마/모델의 해시)이 다르면 적중하지 않으므로, 프롬프트를 바꾸면
+    예전 결과는 자연히 쓰이지 않는다.
+    """
+
+    def __init__(self, path: Optional[str] = DEFAULT_CACHE_PATH):
+        self.path = path or ':memory:'
+        if path:
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._db = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        self._db.execute('PRAGMA journal_mode=WAL')
+        self._db.execute(
+            'CREATE TABLE IF NOT EXISTS analyses ('
+            'id INTEGER PRIMARY KEY, version TEXT NOT NULL, model TEXT NOT NULL, '
+            'result TEXT NOT NULL, created_at REAL NOT NULL)'
+        )
+        self._db.execute(
+            'CREATE TABLE IF NOT EXISTS analysis_keys ('
+            'kind TEXT NOT NULL, key TEXT NOT NULL, version TEXT NOT NULL, analysis_id INTEGER NOT NULL, '
+            'PRIMARY KEY (kind, key, version))'
+        )
+        self._lock = threading.Lock()
+        self.hits = {kind: 0 for kind in KEY_KINDS}
+        self.misses = 0
+
+    @staticmethod
+    def _keys(doi=None, text=None, title=None) -> Dict[str, Optional[str]]:
+        return {'doi': doi_key(doi), 'text': text_key(text), 'title': title_key(title)}
+
+    def lookup(self, version: str, doi: Optional[str] = None, text: Optional[str] = None,
+               title: Optional[str] = None) -> Tuple[Optional[Dict[str, Any]], Optional[str]]:
+        """(캐시된 분석 결과, 적중한 키 종류) (없으면 (None, None))"""
+        keys = self._keys(doi, text, title)
+        with self._lock:
+            for kind in KEY_KINDS:
+                if keys[kind] is None:
+                    continue
+                row = self._db.execute(
+                    'SELECT a.result FROM analysis_keys k JOIN analyses a ON a.id = k.analysis_id '
+                    'WHERE k.kind = ? AND k.key = ? AND k.version = ?', (kind, keys[kind], version)).fetchone()
+                if row is not None:
+                    self.hits[kind] += 1
+                    return json.loads(row[0]), kind
+            self.misses += 1
+            return None, None
+
+    def store(self, result: Dict[str, Any], version: str, model: str,
+              text: Optional[str] = None, title: Optional[str] = None):
+        """분석 결과를 결과의 DOI/제목, 추출 본문, (Scholar 등) 원래 제목을 키로 저장"""
+        keys = [(kind, key) for kind, key in self._keys(text=text, title=title).items() if key]
+        keys += [(kind, key) for kind, key in self._keys(doi=result.get('doi'), title=result.get('title')).items()
+                 if key]
+        with self._lock:
+            self._db.execute('BEGIN')
+            try:
+                analysis_id = self._db.execute(
+                    'INSERT INTO analyses (version, model, result, created_at) VALUES (?, ?, ?, ?)',
+                    (version, model, json.dumps(result, ensure_ascii=False), time.time())).lastrowid
+                self._db.executemany('INSERT OR REPLACE INTO analysis_keys VALUES (?, ?, ?, ?)',
+                                     [(kind, key, version, analysis_id) for kind, key in dict.fromkeys(keys)])
+                self._db.execute('COMMIT')
+            except Exception:
+                self._db.execute('ROLLBACK')
+                raise
+
+    def stats(self) -> Dict[str, int]:
+        """프로세스 누적 적중/실패 횟수와 저장된 분석 수"""
+        with self._lock:
+            entries = self._db.execute('SELECT COUNT(*) FROM analyses').fetchone()[0]
+            return {**{f'{kind}_hits': count for kind, count in self.hits.items()},
+                    'misses': self.misses, 'entries': entries}
+
+
+_cache: Optional[AnalysisCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_analysis_cache() -> AnalysisCache:
+    """프로세스 전역 분석 캐시 (sqlite 파일은 워커/재시작 간 공유)"""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = AnalysisCache()
+        return _cache
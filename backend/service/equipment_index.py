@@ -0,0 +1,156 @@
+import json
+import os
+import threading
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from ..core.terms import term_key
+from .recommender import get_recommender
+
+DEFAULT_SYNONYMS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), '../data/term_synonyms.json')
+FIELDS = ('equipments', 'reagents')
+
+
+class TermDictionary:
+    """장비/시약 이름의 동의어 사전
+
+    term_synonyms.json의 {필드: {대표 이름: [이형 표기, ...]}}를 읽어, 한/영 표기나 띄어쓰기가
+    달라도 같은 대표 이름으로 묶는다. 사전에 없는 이름은 그 자체를 대표 이름으로 쓴다.
+    """
+
+    def __init__(self, synonyms: Optional[Dict[str, Dict[str, List[str]]]] = None):
+        self._canonical: Dict[str, Dict[str, str]] = {field: {} for field in FIELDS}
+        self._variants: Dict[str, Dict[str, List[str]]] = {field: {} for field in FIELDS}
+        for field, entries in (synonyms or {}).items():
+            for canonical, variants in entries.items():
+                for variant in [canonical, *variants]:
+                    self._canonical.setdefault(field, {})[term_key(variant)] = canonical
+                self._variants.setdefault(field, {})[canonical] = [canonical, *variants]
+
+    @classmethod
+    def load(cls, path: Optional[str] = None) -> "TermDictionary":
+        path = path or DEFAULT_SYNONYMS_PATH
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                return cls(json.load(f))
+        except (OSError, ValueError) as e:
+            print(f"⚠️ 동의어 사전을 읽지 못함: {str(e)}")
+            return cls()
+
+    def canonical(self, field: str, term: str) -> str:
+        """대표 이름 (사전에 없으면 앞뒤 공백만 없앤 원래 이름)"""
+        return self._canonical.get(field, {}).get(term_key(term), term.strip())
+
+    def variants(self, field: str, term: str) -> List[str]:
+        """같은 대표 이름으로 묶이는 모든 표기 (DB 배열 검색용)"""
+        canonical = self.canonical(field, term)
+        variants = self._variants.get(field, {}).get(canonical, [canonical])
+        return list(dict.fromkeys([*variants, term.strip()]))
+
+
+class EquipmentIndex:
+    """장비/시약 -> 사용자별 논문 수 역색인
+
+    필드마다 {대표 이름: {user_id: 그 장비/시약을 쓴 논문 수}}를 두고, 여러 조건은 posting이
+    가장 짧은 조건부터 교집합을 구해 논문 수 합으로 순위를 매긴다.
+    """
+
+    def __init__(self, dictionary: Optional[TermDictionary] = None):
+        self.dictionary = dictionary or TermDictionary.load()
+        self._postings: Dict[str, Dict[str, Dict[str, int]]] = {field: {} for field in FIELDS}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_store(cls, store, dictionary: Optional[TermDictionary] = None) -> "EquipmentIndex":
+        """UserStore/MappedUserStore의 모든 사용자 논문으로 색인 생성"""
+        index = cls(dictionary)
+        for row, user_id in enumerate(store.user_ids):
+            if store.row_of(user_id) == row:
+                index.add_papers(user_id, store.papers(row))
+        return index
+
+    def add_papers(self, user_id: str, papers: Iterable[Dict[str, Any]]):
+        """사용자의 논문들을 색인에 추가 (한 논문 안의 중복 표기는 한 번만 셈)"""
+        with self._lock:
+            for paper in papers:
+                for field in FIELDS:
+                    terms = {self.dictionary.canonical(field, term) for term in paper.get(field) or [] if term}
+                    for term in terms:
+                        users = self._postings[field].setdefault(term, {})
+                        users[user_id] = users.get(user_id, 0) + 1
+
+    def remove_user(self, user_id: str):
+        with self._lock:
+            for postings in self._postings.values():
+                for users in postings.values():
+                    users.pop(user_id, None)
+
+    def terms(self, field: str) -> List[Tuple[str, int]]:
+        """필드의 대표 이름과 사용자 수 (사용자 수 내림차순)"""
+        with self._lock:
+            counts = [(term, len(users)) for term, users in self._postings[field].items() if users]
+        return sorted(counts, key=lambda item: (-item[1], item[0]))
+
+    def users_with(self, equipments: Optional[List[str]] = None, reagents: Optional[List[str]] = None,
+                   limit: int = 20) -> List[Dict[str, Any]]:
+        """주어진 장비와 시약을 모두 쓴 사용자 [{user_id, score, counts}] (score는 논문 수 합 내림차순)"""
+        conditions = [(field, self.dictionary.canonical(field, term))
+                      for field, terms in zip(FIELDS, (equipments, reagents)) for term in terms or []]
+        conditions = list(dict.fromkeys(conditions))
+        if not conditions:
+            return []
+
+        with self._lock:
+            postings = [self._postings[field].get(term, {}) for field, term in conditions]
+            order = sorted(range(len(conditions)), key=lambda i: len(postings[i]))
+            candidates = set(postings[order[0]])
+            for i in order[1:]:
+                if not candidates:
+                    break
+                candidates.intersection_update(postings[i])
+            results = []
+            for user_id in candidates:
+                counts = {term: postings[i][user_id] for i, (_, term) in enumerate(conditions)}
+                results.append({'user_id': user_id, 'score': sum(counts.values()), 'counts': counts})
+
+        results.sort(key=lambda r: (-r['score'], r['user_id']))
+        return results[:limit]
+
+
+_index: Optional[EquipmentIndex] = None
+_index_snapshot: Optional[str] = None  # 색인을 만들 때의 Recommender 스냅샷
+_index_lock = threading.Lock()
+_dictionary: Optional[TermDictionary] = None
+
+
+def get_term_dictionary() -> TermDictionary:
+    """프로세스 전역 동의어 사전"""
+    global _dictionary
+    if _dictionary is None:
+        _dictionary = TermDictionary.load()
+    return _dictionary
+
+
+def get_equipment_index() -> EquipmentIndex:
+    """Recommender가 불러온 사용자/논문 데이터로 만든 프로세스 전역 장비/시약 색인
+
+    lexical_search.get_lexical_index와 같이 처음 호출할 때 만들고, 새 Recommender 스냅샷이
+    배포되면 그사이 논문이 바뀐 사용자만 다시 색인한다.
+    """
+    global _index, _index_snapshot
+    recommender = get_recommender()
+    recommender.refresh()
+    with _index_lock:
+        if _index is not None and recommender.snapshot == _index_snapshot:
+            return _index
+        snapshot, changes = recommender.changes_since(_index_snapshot)
+        if _index is None or changes is None:
+            _index = EquipmentIndex.from_store(recommender.store, get_term_dictionary())
+            print(f"🔬 장비/시약 색인 생성: 장비 {len(_index.terms('equipments'))}종, "
+                  f"시약 {len(_index.terms('reagents'))}종")
+        else:
+            for user_id, papers in changes.items():
+                _index.remove_user(user_id)
+                if papers:
+                    _index.add_papers(user_id, papers)
+        _index_snapshot = snapshot
+        return _index
@@ -0,0 +1,164 @@
+import json
+import os
+import random
+import sqlite3
+import threading
+import time
+import uuid
+from typing import Any, Dict, Optional
+
+DEFAULT_QUEUE_PATH = os.getenv(
+    'JOB_QUEUE_PATH',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), '../data/jobs.sqlite3'),
+)
+JOB_LEASE_SECONDS = float(os.getenv('JOB_LEASE_SECONDS', '600'))  # 이 시간 동안 진행 보고가 없으면 다른 워커가 가져감
+JOB_MAX_ATTEMPTS = int(os.getenv('JOB_MAX_ATTEMPTS', '3'))
+JOB_RETRY_DELAY = float(os.getenv('JOB_RETRY_DELAY', '30'))  # 첫 재시도까지 대기 (초, 시도마다 2배)
+
+_COLUMNS = ('id', 'kind', 'payload', 'status', 'stage', 'progress', 'attempts', 'max_attempts',
+            'result', 'error', 'created_at', 'updated_at', 'run_after', 'locked_by', 'locked_until', 'key')
+
+
+class JobQueue:
+    """sqlite 파일 기반 영속 작업 큐 (Postgres 작업 테이블 대용)
+
+    웹 프로세스는 enqueue/get만 하고, 별도 워커 프로세스(backend.worker)가 claim으로 작업을
+    가져가 실행한다. 상태는 queued -> running -> succeeded/failed 이고, 실패하면
+    max_attempts까지 지수적으로 늘어나는 간격을 두고 다시 queued가 된다.
+    실행 중인 작업은 lease(locked_until)를 가지며, 워커가 죽어 lease가 끝나면 다른 워커가 이어받는다.
+    key가 같은 작업(예: 같은 사용자의 프로필 생성)은 워커가 여럿이어도 한 번에 하나만 실행된다.
+    """
+
+    def __init__(self, path: Optional[str] = DEFAULT_QUEUE_PATH):
+        self.path = path or ':memory:'
+        if path:
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._db = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None, timeout=30)
+        self._db.row_factory = sqlite3.Row
+        self._db.execute('PRAGMA journal_mode=WAL')
+        self._db.execute(
+            'CREATE TABLE IF NOT EXISTS jobs ('
+            'id TEXT PRIMARY KEY, kind TEXT NOT NULL, payload TEXT NOT NULL, '
+            "status TEXT NOT NULL, stage TEXT NOT NULL DEFAULT 'queued', progress REAL NOT NULL DEFAULT 0, "
+            'attempts INTEGER NOT NULL DEFAULT 0, max_attempts INTEGER NOT NULL, '
+            'result TEXT, error TEXT, created_at REAL NOT NULL, updated_at REAL NOT NULL, '
+            'run_after REAL NOT NULL, locked_by TEXT, locked_until REAL, key TEXT)'
+        )
+        if 'key' not in {row['name'] for row in self._db.execute('PRAGMA table_info(jobs)')}:
+            self._db.execute('ALTER TABLE jobs ADD COLUMN key TEXT')  # key 추가 전에 만든 큐 파일
+        self._db.execute('CREATE INDEX IF NOT EXISTS ix_jobs_key ON jobs (key, status)')
+        self._db.execute('CREATE INDEX IF NOT EXISTS ix_jobs_ready ON jobs (status, run_after)')
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _row(row: Optional[sqlite3.Row]) -> Optional[Dict[str, Any]]:
+        if row is None:
+            return None
+        job = dict(zip(_COLUMNS, (row[c] for c in _COLUMNS)))
+        job['payload'] = json.loads(job['payload'])
+        job['result'] = json.loads(job['result']) if job['result'] else None
+        return job
+
+    def enqueue(self, kind: str, payload: Dict[str, Any], max_attempts: int = JOB_MAX_ATTEMPTS,
+                key: Optional[str] = None) -> str:
+        """작업 추가 후 job_id 반환 (key가 같은 작업끼리는 동시에 실행하지 않음)"""
+        job_id = str(uuid.uuid4())
+        now = time.time()
+        with self._lock:
+            self._db.execute(
+                'INSERT INTO jobs (id, kind, payload, status, max_attempts, created_at, updated_at, run_after, key) '
+                "VALUES (?, ?, ?, 'queued', ?, ?, ?, ?, ?)",
+                (job_id, kind, json.dumps(payload, ensure_ascii=False), max_attempts, now, now, now, key))
+        return job_id
+
+    def claim(self, worker_id: str, lease: float = JOB_LEASE_SECONDS) -> Optional[Dict[str, Any]]:
+        """실행할 작업 하나를 가져와 running으로 표시 (대기 중이거나 lease가 끝난 작업, 없으면 None)
+
+        key가 같은 다른 작업이 lease가 남은 채 실행 중이면 그 작업은 건너뛴다. lease가 끝난 작업이
+        이미 max_attempts만큼 시도됐으면(워커가 계속 죽는 작업) 다시 실행하지 않고 failed로 둔다.
+        """
+        now = time.time()
+        with self._lock:
+            self._db.execute(
+                "UPDATE jobs SET status = 'failed', stage = 'failed', error = 'Lease expired on the last attempt', "
+                'locked_by = NULL, locked_until = NULL, updated_at = ? '
+                "WHERE status = 'running' AND locked_until < ? AND attempts >= max_attempts",
+                (now, now))
+            row = self._db.execute(
+                "UPDATE jobs SET status = 'running', stage = 'started', attempts = attempts + 1, "
+                'locked_by = ?, locked_until = ?, updated_at = ? '
+                'WHERE id = (SELECT id FROM jobs AS j WHERE '
+                "((status = 'queued' AND run_after <= ?) OR (status = 'running' AND locked_until < ?)) "
+                'AND (key IS NULL OR NOT EXISTS (SELECT 1 FROM jobs AS r WHERE r.key = j.key AND r.id != j.id '
+                "AND r.status = 'running' AND r.locked_until >= ?)) "
+                'ORDER BY run_after LIMIT 1) RETURNING *',
+                (worker_id, now + lease, now, now, now, now)).fetchone()
+        return self._row(row)
+
+    def progress(self, job_id: str, worker_id: str, stage: str, progress: float,
+                 lease: float = JOB_LEASE_SECONDS) -> bool:
+        """진행 단계 기록 (lease도 연장)
+
+        progress/complete/fail은 작업을 claim한 worker_id가 아직 잡고 있을 때만 반영되고, lease가 끝나
+        다른 워커가 가져간 뒤라면 False를 돌려준다 (늦게 끝난 워커가 새 워커의 결과를 덮어쓰지 않음).
+        """
+        now = time.time()
+        with self._lock:
+            return self._db.execute(
+                "UPDATE jobs SET stage = ?, progress = ?, locked_until = ?, updated_at = ? "
+                "WHERE id = ? AND status = 'running' AND locked_by = ?",
+                (stage, progress, now + lease, now, job_id, worker_id)).rowcount > 0
+
+    def complete(self, job_id: str, worker_id: str, result: Any = None) -> bool:
+        with self._lock:
+            return self._db.execute(
+                "UPDATE jobs SET status = 'succeeded', stage = 'done', progress = 1, result = ?, error = NULL, "
+                "locked_by = NULL, locked_until = NULL, updated_at = ? "
+                "WHERE id = ? AND status = 'running' AND locked_by = ?",
+                (json.dumps(result, ensure_ascii=False, default=str), time.time(), job_id, worker_id)).rowcount > 0
+
+    def fail(self, job_id: str, worker_id: str, error: str, retry: bool = True,
+             retry_delay: float = JOB_RETRY_DELAY) -> bool:
+        """실패 기록. retry이고 시도 횟수가 남았으면 retry_delay * 2^(시도-1) (+-20%) 뒤에 다시 실행"""
+        now = time.time()
+        with self._lock:
+            row = self._db.execute(
+                "SELECT attempts, max_attempts FROM jobs WHERE id = ? AND status = 'running' AND locked_by = ?",
+                (job_id, worker_id)).fetchone()
+            if row is None:
+                return False
+            if retry and row['attempts'] < row['max_attempts']:
+                delay = retry_delay * 2 ** (row['attempts'] - 1) * random.uniform(0.8, 1.2)
+                self._db.execute(
+                    "UPDATE jobs SET status = 'queued', stage = 'retrying', error = ?, run_after = ?, "
+                    'locked_by = NULL, locked_until = NULL, updated_at = ? WHERE id = ?',
+                    (error, now + delay, now, job_id))
+            else:
+                self._db.execute(
+                    "UPDATE jobs SET status = 'failed', stage = 'failed', error = ?, "
+                    'locked_by = NULL, locked_until = NULL, updated_at = ? WHERE id = ?',
+                    (error, now, job_id))
+            return True
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            return self._row(self._db.execute('SELECT * FROM jobs WHERE id = ?', (job_id,)).fetchone())
+
+    def counts(self) -> Dict[str, int]:
+        """상태별 작업 수"""
+        with self._lock:
+            return {row['status']: row['n'] for row in
+                    self._db.execute('SELECT status, COUNT(*) AS n FROM jobs GROUP BY status')}
+
+
+_queue: Optional[JobQueue] = None
+_queue_lock = threading.Lock()
+
+
+def get_job_queue() -> JobQueue:
+    """프로세스 전역 작업 큐 (웹 프로세스와 워커가 같은 sqlite 파일 공유)"""
+    global _queue
+    with _queue_lock:
+        if _queue is None:
+            _queue = JobQueue()
+        return _queue
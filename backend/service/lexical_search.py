@@ -0,0 +1,82 @@
+import asyncio
+import threading
+from typing import Any, Dict, List, Optional
+
+from ..vector.bm25 import Bm25Index
+from ..vector.emb_search import get_recommendations_async, get_recommendations_batch_async
+from .recommender import get_recommender
+
+RRF_K = 60  # reciprocal rank fusion 상수 (순위가 낮은 결과의 영향을 완만하게)
+
+_index: Optional[Bm25Index] = None
+_index_snapshot: Optional[str] = None  # 색인을 만들 때의 Recommender 스냅샷
+_index_lock = threading.Lock()
+
+
+def get_lexical_index() -> Bm25Index:
+    """Recommender가 불러온 사용자/논문 데이터로 만든 프로세스 전역 BM25 색인
+
+    처음 호출할 때 만들고, 새 Recommender 스냅샷이 배포되면 그사이 논문이 바뀐 사용자만
+    다시 색인한다 (바뀐 사용자를 알 수 없을 만큼 뒤처졌으면 전체를 다시 만든다).
+    """
+    global _index, _index_snapshot
+    recommender = get_recommender()
+    recommender.refresh()
+    with _index_lock:
+        if _index is not None and recommender.snapshot == _index_snapshot:
+            return _index
+        snapshot, changes = recommender.changes_since(_index_snapshot)
+        if _index is None or changes is None:
+            _index = Bm25Index.from_store(recommender.store)
+            print(f"📚 BM25 색인 생성: 논문 {len(_index)}편, posting {_index.posting_bytes()} bytes")
+        else:
+            for user_id, papers in changes.items():
+                _index.remove_user(user_id)
+                if papers:
+                    _index.add_papers(user_id, papers)
+            print(f"📚 BM25 색인 갱신: 사용자 {len(changes)}명")
+        _index_snapshot = snapshot
+        return _index
+
+
+def search_lexical(query: str, top_k: int = 5, aggregation: str = "max",
+                   filter: Optional[Dict[str, Any]] = None) -> List[str]:
+    """BM25만으로 사용자 검색 (임베딩 API/벡터 DB 호출 없음)"""
+    users = get_lexical_index().search_users(query, top_k, aggregation, filter)
+    for user_id, score, n_papers in users:
+        print(f"✅ BM25 추천: {user_id} | score: {score:.4f} | 논문 {n_papers}편")
+    return [user_id for user_id, _, _ in users]
+
+
+def reciprocal_rank_fusion(rankings: List[List[str]], k: int = RRF_K) -> List[str]:
+    """여러 순위 목록을 RRF 점수(sum 1 / (k + 순위))로 합친 순위"""
+    scores: Dict[str, float] = {}
+    for ranking in rankings:
+        for rank, user_id in enumerate(ranking, 1):
+            scores[user_id] = scores.get(user_id, 0.0) + 1.0 / (k + rank)
+    return sorted(scores, key=lambda user_id: -scores[user_id])
+
+
+async def search_hybrid_async(query: str, top_k: int = 5, aggregation: str = "max",
+                              filter: Optional[Dict[str, Any]] = None) -> List[str]:
+    """벡터 검색과 BM25 검색을 동시에 실행해 RRF로 합친 상위 top_k명"""
+    loop = asyncio.get_running_loop()
+    # 두 목록 모두 top_k보다 넉넉히 가져와야 한쪽에만 있는 사용자도 순위가 매겨진다
+    depth = 2 * top_k
+    dense, lexical = await asyncio.gather(
+        get_recommendations_async(query, top_k=depth, aggregation=aggregation, filter=filter),
+        loop.run_in_executor(None, search_lexical, query, depth, aggregation, filter),
+    )
+    return reciprocal_rank_fusion([dense, lexical])[:top_k]
+
+
+async def search_hybrid_batch_async(queries: List[str], top_k: int = 5, aggregation: str = "max",
+                                    filter: Optional[Dict[str, Any]] = None) -> List[List[str]]:
+    """search_hybrid_async의 배치 버전 (벡터 검색은 get_recommendations_batch_async 한 번)"""
+    loop = asyncio.get_running_loop()
+    depth = 2 * top_k
+    dense, lexical = await asyncio.gather(
+        get_recommendations_batch_async(queries, top_k=depth, aggregation=aggregation, filter=filter),
+        loop.run_in_executor(None, lambda: [search_lexical(q, depth, aggregation, filter) for q in queries]),
+    )
+    return [reciprocal_rank_fusion([d, l])[:top_k] for d, l in zip(dense, lexical)]
@@ -1,7 +1,7 @@
 import os
 import sys
 import uuid
-from typing import List, Dict, Any, Optional
+from typing import Callable, List, Dict, Any, Optional, Tuple
 import asyncio
 from fastapi import BackgroundTasks, HTTPException
 from sqlalchemy.ext.asyncio import AsyncSession
@@ -12,9 +12,16 @@ from analyze import analyze_author
 
 # Import models and crud operations
 from ..crud.user import update_user, get_user
-from ..crud.paper import create_paper
+from ..crud.paper import add_papers, get_papers_by_user
+from ..core.terms import paper_key, term_keys
 from ..schemas.paper import PaperCreate
 from ..schemas.user import UserUpdate
+from .recommender import get_recommender_updater
+from .analysis_cache import get_analysis_cache
+from ..vector.clients import EMBEDDING_MODEL, PAPER_INDEX, PROFILE_INDEX, get_openai_client, get_vector_store
+from ..vector.openai_gateway import BACKGROUND, get_openai_gateway, is_retryable
+from ..vector.store import VECTOR_STORE_BACKEND
+from ..vector.profile_vectors import ProfileVectors, paper_vector_id
 
 # For vector database operations (Pinecone)
 # Note: You will need to install the pinecone-client package
@@ -24,114 +31,183 @@ try:
 except ImportError:
     print("Warning: pinecone-client not installed. Vector embeddings will not be stored.")
 
+PROFILE_JOB = "create_profile"  # job kind in the job queue (run by backend.worker)
+
+EMBEDDING_BATCH_SIZE = int(os.getenv('EMBEDDING_BATCH_SIZE', '100'))  # papers per embeddings request
+UPSERT_BATCH_SIZE = int(os.getenv('UPSERT_BATCH_SIZE', '100'))  # vectors per index upsert (Pinecone recommends <= 100)
+
 class ProfileService:
     def __init__(self):
-        self.tmp_dir = './paperTmp/'
+        # PDFs are kept in a per-job in-memory workspace by analyze_author (no shared tmp directory)
         self.pinecone_initialized = False
         self._init_pinecone()
-        
-        # Create tmp directory if it doesn't exist
-        if not os.path.exists(self.tmp_dir):
-            os.makedirs(self.tmp_dir)
     
     def _init_pinecone(self):
-        """Initialize Pinecone connection if API key is available"""
+        """Attach the process-wide vector store (connected once, shared with /search)"""
         try:
-            api_key = os.getenv('PINECONE_API_KEY')
-            environment = os.getenv('PINECONE_ENVIRONMENT', 'gcp-starter')
-            index_name = os.getenv('PINECONE_INDEX', 'research-embeddings')
-            
-            if api_key:
-                # Update to use the newer Pinecone API
-                import pinecone
-                
-                # Initialize Pinecone with the new API
-                pc = pinecone.Pinecone(api_key=api_key)
-                
-                # Check if the index exists, create it if not
-                indexes = [index.name for index in pc.list_indexes()]
-                
-                if index_name not in indexes:
-                    # Create a new index with cosine similarity and 1536 dimensions
-                    # Using OpenAI's ada-002 embedding model dimension
-                    pc.create_index(
-                        name=index_name,
-                        dimension=1536,  # OpenAI ada-002 embedding dimension
-                        metric="cosine",
-                        spec={"serverless": {"cloud": "aws", "region": "us-east-1"}}
-                    )
-                
-                # Get the index
-                self.index = pc.Index(index_name)
+            if VECTOR_STORE_BACKEND == 'local' or os.getenv('PINECONE_API_KEY'):
+                # The same paper index /search queries, created as a cosine index of EMBEDDING_DIMENSION on first use
+                self.index = get_vector_store(PAPER_INDEX, create_if_missing=True)
+                # Per-user weighted centroids of the paper vectors, queried directly by /search and /recommendations
+                self.profiles = ProfileVectors(get_vector_store(PROFILE_INDEX, create_if_missing=True))
                 self.pinecone_initialized = True
-                print(f"Pinecone initialized successfully with index: {index_name}")
             else:
                 print("Warning: PINECONE_API_KEY not set. Vector embeddings will not be stored.")
         except Exception as e:
             print(f"Error initializing Pinecone: {str(e)}")
     
-    def _create_vector_embedding(self, content_dict: Dict[str, Any], user_id: str = None) -> Optional[str]:
-        """Create vector embedding from paper content and store in Pinecone with metadata"""
-        if not self.pinecone_initialized:
+    @staticmethod
+    def _paper_data(row) -> Dict[str, Any]:
+        """A stored paper row as the dict the recommender keeps (same fields as PaperCreate)"""
+        return PaperCreate(
+            user_id=row.user_id, title=row.title, abstract=row.abstract, authors=list(row.authors),
+            year=row.year, journal=row.journal, doi=row.doi, equipments=list(row.equipments),
+            reagents=list(row.reagents),
+            vector_embedding_id=str(row.vector_embedding_id) if row.vector_embedding_id else None,
+        ).dict()
+
+    @staticmethod
+    def _embedding_text(content_dict: Dict[str, Any]) -> str:
+        """Text embedded for a paper (excluding author and journal)"""
+        title = content_dict.get('title', '')
+        abstract = content_dict.get('abstract', '')
+        equipments = ', '.join(content_dict.get('equipments', []))
+        reagents = ', '.join(content_dict.get('reagents', []))
+        return f"Title: {title}\nAbstract: {abstract}\nEquipments: {equipments}\nReagents: {reagents}"
+
+    @staticmethod
+    def _vector_metadata(content_dict: Dict[str, Any], user_id: str = None) -> Dict[str, Any]:
+        """Metadata stored with a paper vector (excluding author); year/journal are filterable in /search"""
+        metadata = {
+            "title": content_dict.get('title', ''),
+            "abstract": content_dict.get('abstract', ''),
+            "equipments": content_dict.get('equipments', []),
+            "reagents": content_dict.get('reagents', []),
+            # term_key forms so /search filters ignore case, spacing and hyphens (see build_filter)
+            "equipment_keys": term_keys(content_dict.get('equipments', [])),
+            "reagent_keys": term_keys(content_dict.get('reagents', [])),
+        }
+        year = content_dict.get('year')
+        if isinstance(year, int) or (isinstance(year, str) and year.isdigit()):
+            metadata["year"] = int(year)
+        if content_dict.get('journal'):
+            metadata["journal"] = content_dict['journal']
+        
+        # Add user_id to metadata if available
+        if user_id:
+            metadata["user_id"] = user_id
+        return metadata
+
+    def _embed_papers(self, contents: List[Dict[str, Any]]) -> Optional[List[List[float]]]:
+        """Embed papers with one embeddings request per EMBEDDING_BATCH_SIZE papers
+
+        Returns one embedding per paper, or None if vectors are not stored (no vector store/API key)
+        or embedding failed. OpenAI errors that are still retryable after the gateway's retries
+        (429, 5xx) are raised, before anything has been written.
+        """
+        if not self.pinecone_initialized or not contents:
             return None
-            
+        if not os.getenv('OPENAI_API_KEY'):
+            print("Warning: OPENAI_API_KEY not set. Vector embeddings will not be created.")
+            return None
+
         try:
-            from openai import OpenAI
-            
-            api_key = os.getenv('OPENAI_API_KEY')
-            if not api_key:
-                print("Warning: OPENAI_API_KEY not set. Vector embeddings will not be created.")
-                return None
-            
-            # Create text for embedding (excluding author and journal)
-            title = content_dict.get('title', '')
-            abstract = content_dict.get('abstract', '')
-            equipments = ', '.join(content_dict.get('equipments', []))
-            reagents = ', '.join(content_dict.get('reagents', []))
-            
-            embedding_text = f"Title: {title}\nAbstract: {abstract}\nEquipments: {equipments}\nReagents: {reagents}"
-                
-            client = OpenAI(api_key=api_key)
-            response = client.embeddings.create(
-                input=embedding_text,
-                model="text-embedding-ada-002"  # or your preferred model
-            )
-            
-            embedding = response.data[0].embedding
-            
-            # Generate a new UUID for this vector
-            vector_id = str(uuid.uuid4())
-            
-            # Create metadata (excluding author and journal)
-            metadata = {
-                "title": title,
-                "abstract": abstract,
-                "equipments": content_dict.get('equipments', []),
-                "reagents": content_dict.get('reagents', [])
+            texts = [self._embedding_text(content) for content in contents]
+            embeddings = []
+            for i in range(0, len(texts), EMBEDDING_BATCH_SIZE):
+                # Rate-limited and retried by the shared gateway, behind interactive /search embeddings
+                response = get_openai_gateway().embed(
+                    get_openai_client(),
+                    EMBEDDING_MODEL,  # the model /search embeds queries with
+                    texts[i:i + EMBEDDING_BATCH_SIZE],
+                    BACKGROUND
+                )
+                # The API may return items out of order; each carries its input index
+                embeddings.extend(item.embedding for item in sorted(response.data, key=lambda item: item.index))
+            return embeddings
+        except Exception as e:
+            if is_retryable(e):
+                # Still rate limited after the gateway's retries: fail the job so the queue retries it later
+                # instead of storing the papers without vectors
+                raise
+            print(f"Error creating vector embeddings: {str(e)}")
+            return None
+
+    def _store_vectors(self, contents: List[Dict[str, Any]], embeddings: List[List[float]],
+                       vector_ids: List[str], user_id: str = None, existing_ids: List[str] = ()) -> Optional[str]:
+        """Upsert paper vectors in batches of UPSERT_BATCH_SIZE and recompute the user's profile vector
+
+        The profile is recomputed from these papers plus the user's already stored paper vectors
+        (existing_ids), so running this again for the same papers leaves the same profile.
+        Returns the profile vector id (None if the profile was not updated).
+        """
+        vectors = [
+            {
+                "id": vector_id,
+                "values": embedding,
+                "metadata": self._vector_metadata(content, user_id)
             }
-            
-            # Add user_id to metadata if available
-            if user_id:
-                metadata["user_id"] = user_id
-                
-            # Upsert the vector with metadata into Pinecone
-            self.index.upsert(
-                vectors=[
-                    {
-                        "id": vector_id, 
-                        "values": embedding,
-                        "metadata": metadata
-                    }
-                ]
-            )
-            
-            return vector_id
+            for vector_id, embedding, content in zip(vector_ids, embeddings, contents)
+        ]
+        try:
+            for i in range(0, len(vectors), UPSERT_BATCH_SIZE):
+                self.index.upsert(vectors=vectors[i:i + UPSERT_BATCH_SIZE])
         except Exception as e:
-            print(f"Error creating vector embedding: {str(e)}")
+            print(f"Error storing vector embeddings: {str(e)}")
             return None
+
+        profile_id = None
+        if user_id:
+            try:
+                papers = [(embedding, content.get('year')) for embedding, content in zip(embeddings, contents)]
+                if existing_ids:
+                    papers += self.profiles.fetch_papers(self.index, list(existing_ids))
+                profile_id = self.profiles.set_papers(user_id, papers)
+            except Exception as e:
+                print(f"Error updating profile vector: {str(e)}")
+        return profile_id
+
+    @staticmethod
+    def _vector_ids(contents: List[Dict[str, Any]], user_id: str = None) -> List[str]:
+        """Vector ids for papers; a user's paper keeps its id (by DOI/title) when it is collected again"""
+        if not user_id:
+            return [str(uuid.uuid4()) for _ in contents]
+        return [paper_vector_id(user_id, content) for content in contents]
+
+    def _create_vector_embeddings(self, contents: List[Dict[str, Any]],
+                                  user_id: str = None) -> Tuple[List[Optional[str]], Optional[str]]:
+        """Embed papers and store them in the vector index in batches
+
+        About two round trips per profile instead of two per paper. Returns the vector id of each
+        paper (all None if embedding failed) and the profile vector id.
+        """
+        embeddings = self._embed_papers(contents)
+        if embeddings is None:
+            return [None] * len(contents), None
+        vector_ids = self._vector_ids(contents, user_id)
+        return vector_ids, self._store_vectors(contents, embeddings, vector_ids, user_id)
+
+    def _create_vector_embedding(self, content_dict: Dict[str, Any], user_id: str = None) -> Optional[str]:
+        """Create vector embedding from paper content and store in Pinecone with metadata"""
+        return self._create_vector_embeddings([content_dict], user_id)[0][0]
     
-    async def create_profile(self, user_id: str, max_papers: int = 5, db: AsyncSession = None) -> Dict[str, Any]:
-        """Process user profile creation by fetching Google Scholar data and storing in DB"""
+    async def _update_recommender(self, user_id: str, papers: List[Dict[str, Any]]) -> None:
+        """Append the user's stored papers that their recommender row lacks and publish it to other workers
+
+        Papers from profiles finishing close together are applied and published as one batch on the
+        updater's thread; this waits (without blocking the event loop) until that batch is published.
+        Papers already in the row are skipped, so a failure here fails the job and its retry catches up.
+        """
+        updater = await asyncio.get_running_loop().run_in_executor(None, get_recommender_updater)
+        await asyncio.wrap_future(updater.submit(user_id, papers))
+
+    async def create_profile(self, user_id: str, max_papers: int = 5, db: AsyncSession = None,
+                             progress: Optional[Callable[[str, float], None]] = None) -> Dict[str, Any]:
+        """Process user profile creation by fetching Google Scholar data and storing in DB
+
+        progress(stage, fraction), if given, is called as the job moves through its stages.
+        """
+        progress = progress or (lambda stage, fraction: None)
         try:
             # Get user from database to get google_scholar_id
             user = await get_user(db, user_id)
@@ -142,8 +218,13 @@ class ProfileService:
             if not google_scholar_id:
                 raise HTTPException(status_code=400, detail="User does not have a Google Scholar ID")
             
-            # Get paper contents from Google Scholar (non-async)
-            paper_contents = analyze_author(google_scholar_id, max_download=max_papers)
+            # Get paper contents from Google Scholar (blocking; run off the event loop)
+            # Papers analyzed before (by DOI, title or extracted text) are served from the analysis cache
+            cache_stats = {}
+            progress("analyzing", 0.05)
+            paper_contents = await asyncio.get_running_loop().run_in_executor(
+                None, lambda: analyze_author(google_scholar_id, max_download=max_papers,
+                                             cache=get_analysis_cache(), stats=cache_stats))
             
             if not paper_contents or len(paper_contents) == 0:
                 return {"status": "error", "message": "No papers found or error fetching papers", "paper_count": 0}
@@ -152,44 +233,80 @@ class ProfileService:
             
             # Process each paper and store in database
             if db:
+                # A retried job (or a repeated request) sees the papers an earlier attempt stored; only
+                # papers the user does not have yet (by DOI, else title) are embedded and inserted
+                existing = await get_papers_by_user(db, user_id)
+                seen = {paper_key(self._paper_data(row)) for row in existing}
+                contents = []
                 for content in paper_contents:
-                    if content:  # Skip None values
-                        vector_id = None
-                        
-                        if self.pinecone_initialized:
-                            # Create vector embedding and store in Pinecone with metadata
-                            vector_id = self._create_vector_embedding(content, user_id)
-                        
-                        # Create paper record in database
-                        paper_data = PaperCreate(
-                            user_id=user_id,
-                            title=content.get('title', 'Untitled'),
-                            abstract=content.get('abstract', ''),
-                            authors=content.get('authors', ['Unknown']),  # Provide default value
-                            year=content.get('year'),  # Extract the year from parsed data
-                            journal=content.get('journal', ''),  # Provide default value
-                            doi=content.get('doi'),  # Extract the DOI from parsed data
-                            equipments=content.get('equipments', []),
-                            reagents=content.get('reagents', []),
-                            vector_embedding_id=vector_id
-                        )
-                        
-                        await create_paper(db, paper_data)
+                    if content and paper_key(content) not in seen:  # Skip None values and duplicates
+                        seen.add(paper_key(content))
+                        contents.append(content)
+                
+                # Embed the new papers at once (off the event loop); nothing is written if this raises
+                progress("embedding", 0.6)
+                embeddings = await asyncio.get_running_loop().run_in_executor(None, self._embed_papers, contents)
+                vector_ids = (self._vector_ids(contents, user_id) if embeddings is not None
+                              else [None] * len(contents))
                 
-                # Update user's vector_embedding_id with the latest paper's vector_id if available
-                if paper_contents and self.pinecone_initialized:
-                    latest_content = paper_contents[-1]
-                    if latest_content:
-                        vector_id = self._create_vector_embedding(latest_content, user_id)
-                        
-                        if vector_id:
-                            user_update = UserUpdate(vector_embedding_id=uuid.UUID(vector_id))
-                            await update_user(db, user_id, user_update)
+                # Store all new paper rows in one transaction, before their vectors, so a /search hit on
+                # a new vector always finds the paper rows (and never caches a partial researcher entry)
+                progress("storing", 0.75)
+                new_papers = [
+                    PaperCreate(
+                        user_id=user_id,
+                        title=content.get('title', 'Untitled'),
+                        abstract=content.get('abstract', ''),
+                        authors=content.get('authors', ['Unknown']),  # Provide default value
+                        year=content.get('year'),  # Extract the year from parsed data
+                        journal=content.get('journal', ''),  # Provide default value
+                        doi=content.get('doi'),  # Extract the DOI from parsed data
+                        equipments=content.get('equipments', []),
+                        reagents=content.get('reagents', []),
+                        vector_embedding_id=vector_id
+                    )
+                    for content, vector_id in zip(contents, vector_ids)
+                ]
+                try:
+                    await add_papers(db, new_papers)
+                    await db.commit()
+                except Exception:
+                    await db.rollback()
+                    raise
+
+                # Everything below is safe to repeat: vector ids are derived from the paper, the profile
+                # is recomputed from all of the user's paper vectors, and the recommender skips papers
+                # the user already has
+                existing_ids = [str(row.vector_embedding_id) for row in existing if row.vector_embedding_id]
+                profile_id = None
+                if self.pinecone_initialized and (embeddings is not None or existing_ids):
+                    profile_id = await asyncio.get_running_loop().run_in_executor(
+                        None, self._store_vectors, contents, embeddings or [], vector_ids if embeddings else [],
+                        user_id, existing_ids)
+
+                # Point the user's vector_embedding_id at their profile vector (no extra embedding)
+                if profile_id and str(user.vector_embedding_id) != profile_id:
+                    user_update = UserUpdate(vector_embedding_id=uuid.UUID(profile_id))
+                    await update_user(db, user_id, user_update)
+
+                if self.pinecone_initialized:
+                    # Persist the local index once per profile instead of once per paper
+                    self.index.flush()
+                    self.profiles.store.flush()
+
+                # Make the papers visible to /recommendations without refitting; the BM25 and
+                # equipment indexes and the researcher directory of every process follow the published
+                # snapshot, so there is nothing else to invalidate here
+                progress("indexing", 0.9)
+                all_papers = [self._paper_data(row) for row in existing] + [paper.dict() for paper in new_papers]
+                if all_papers:
+                    await self._update_recommender(user_id, all_papers)
             
             return {
                 "status": "success",
                 "message": f"Successfully processed {paper_count} papers from Google Scholar",
-                "paper_count": paper_count
+                "paper_count": paper_count,
+                "analysis_cache": cache_stats
             }
             
         except HTTPException as he:
@@ -197,12 +314,3 @@ class ProfileService:
         except Exception as e:
             print(f"Error in create_profile: {str(e)}")
             return {"status": "error", "message": f"Error processing profile: {str(e)}", "paper_count": 0}
-
-async def process_profile_creation_background(
-    user_id: str,
-    max_papers: int,
-    db: AsyncSession
-) -> None:
-    """Background task to process profile creation"""
-    service = ProfileService()
-    await service.create_profile(user_id, max_papers, db)
\ No newline at end of file
@@ -1,105 +1,730 @@
 import os
-from typing import List, Dict, Any
+import threading
+from concurrent.futures import Future
+from contextlib import contextmanager
+from typing import Any, Dict, Iterable, Iterator, List, NamedTuple, Optional, Tuple
 import numpy as np
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.metrics.pairwise import cosine_similarity
+import scipy.sparse as sp
+from sklearn.feature_extraction.text import CountVectorizer, TfidfVectorizer
+from sklearn.preprocessing import normalize
 import json
+import time
+from ..core.terms import paper_key
+from .user_store import UserStore
+from .recommender_snapshot import (
+    current_snapshot, load_snapshot, publish_snapshot, read_manifest, save_snapshot, snapshot_lock, snapshot_path,
+    source_checksum,
+)
+
+DEFAULT_DATA_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), '../data/bio_research_nested.json')
+DEFAULT_SNAPSHOT_DIR = os.getenv(
+    'RECOMMENDER_SNAPSHOT_DIR',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), '../data/snapshots'),
+)
+SNAPSHOT_HISTORY = 256  # manifest에 남기는 배포 이력 수 (이보다 뒤처진 색인은 전체 재생성)
+RECOMMENDER_PUBLISH_DELAY = float(os.getenv('RECOMMENDER_PUBLISH_DELAY', '2'))  # 수집 결과를 모아 배포하는 간격 (초)
+
+
+class _State(NamedTuple):
+    """추천 요청이 읽는 학습 상태 묶음
+
+    self._state에 올라간 뒤에는 고치지 않으므로, 요청 처음에 잡은 참조 하나로 끝까지 계산하면
+    증분 변경이나 스냅샷 교체와 겹쳐도 서로 다른 시점의 저장소와 배열이 섞이지 않는다.
+    """
+    store: Any  # UserStore 또는 MappedUserStore (user_id 인덱스와 논문)
+    user_vectors: Optional[sp.csr_matrix] = None
+    neighbor_ids: Optional[np.ndarray] = None  # (사용자 수, top_k) 이웃 인덱스
+    neighbor_scores: Optional[np.ndarray] = None  # (사용자 수, top_k) 이웃 유사도
+    active: Optional[np.ndarray] = None  # 삭제되지 않은 행 표시 (remove_user는 행을 비활성화만 함)
+    df: Optional[np.ndarray] = None  # 어휘별 문서 빈도
+    idf: Optional[np.ndarray] = None
+
 
 class Recommender:
-    def __init__(self):
-        self.users = []
-        self.user_vectors = None
+    def __init__(self, top_k: int = 50, block_budget: int = 2 ** 24,
+                 data_path: str = None, snapshot_dir: str = None, reload_interval: float = 1.0):
+        self.data_path = data_path or DEFAULT_DATA_PATH
+        self.snapshot_dir = snapshot_dir or DEFAULT_SNAPSHOT_DIR  # 학습 결과 스냅샷 저장 위치
+        self.reload_interval = reload_interval  # 새 스냅샷 배포 여부를 확인하는 최소 간격 (초)
+        self.snapshot = None  # 현재 매핑 중인 스냅샷 디렉터리
+        self._checksum = None  # 원본 데이터 체크섬
+        self._dirty = False  # 아직 배포하지 않은 증분 변경이 있는지
+        self._changes = []  # 매핑 중인 스냅샷 이후의 증분 변경 [(메서드 이름, 인자...)] (배포 때 다시 적용)
+        self._history = []  # 매핑 중인 스냅샷까지의 배포 이력 [[스냅샷 이름, 바뀐 user_id 목록]] (changes_since용)
+        self._lock = threading.RLock()  # 상태를 바꾸는 호출(증분 변경, 배포, 스냅샷 교체)끼리 직렬화 (읽기는 잠금 없음)
+        self._last_reload_check = 0.0
+        self._state = _State(UserStore())  # 읽기 쪽이 보는 상태 (한 번의 대입으로만 교체)
+        self._work = None  # 쓰기 구간에서 고치는 상태 복사본 (_edit 참고)
+        self._rows = {}  # 쓰기 구간에서 바뀐 벡터 행 {행 번호: 1행 희소 행렬} (구간 끝에 한 번에 합침)
+        self._buffers = None  # 쓰기 구간에서 행 단위 배열을 덧붙이는 여유 용량 버퍼 (_append_row 참고)
+        self._write_depth = 0  # 중첩된 쓰기 구간 깊이
         self.vectorizer = None
         self.vector_dim = 100  # 임베딩 차원
+        self.top_k = top_k  # 이웃 테이블에 미리 저장할 이웃 수
+        self.block_budget = block_budget  # 블록 유사도 행렬의 최대 원소 수 (float32 기준 64MB)
+        self._counter = None  # 고정 어휘 기반 단어 빈도 계산기 (증분 업데이트용)
         self.load_users()  # 초기화 시 바로 데이터 로드
 
+    @property
+    def store(self):
+        return self._state.store
+
+    @property
+    def user_vectors(self):
+        return self._state.user_vectors
+
+    @property
+    def neighbor_ids(self):
+        return self._state.neighbor_ids
+
+    @property
+    def neighbor_scores(self):
+        return self._state.neighbor_scores
+
+    @property
+    def active(self):
+        return self._state.active
+
+    @property
+    def _df(self):
+        return self._state.df
+
+    @property
+    def _idf(self):
+        return self._state.idf
+
     def load_users(self):
-        """사용자 데이터 로드"""
+        """사용자 데이터 로드
+
+        원본 파일의 체크섬이 같은 스냅샷이 있으면 학습 없이 메모리 매핑으로 복원하고,
+        없으면 JSON을 읽어 학습한 뒤 스냅샷으로 저장한다. 배포된(CURRENT) 스냅샷이
+        같은 원본에서 나온 것이면 증분 변경이 반영된 그 스냅샷을 우선 사용한다.
+        """
         try:
-            current_dir = os.path.dirname(os.path.abspath(__file__))
-            data_path = os.path.join(current_dir, '../data/bio_research_nested.json')
+            data_path = self.data_path
             print(f"Loading data from: {data_path}")  # 디버깅용
-            
+
+            checksum = source_checksum(data_path)
+            self._checksum = checksum
+            for directory in (current_snapshot(self.snapshot_dir), snapshot_path(self.snapshot_dir, checksum)):
+                if directory and self._snapshot_matches(directory, checksum):
+                    self._attach(directory)
+                    print(f"Loaded {len(self.store)} users from snapshot: {directory}")  # 디버깅용
+                    return
+
             with open(data_path, 'r', encoding='utf-8') as f:
-                self.users = json.load(f)
-            print(f"Loaded {len(self.users)} users")  # 디버깅용
-            self._create_user_vectors()
+                store = UserStore.from_records(json.load(f))
+            print(f"Loaded {len(store)} users")  # 디버깅용
+            self._state = self._create_user_vectors(store)
+            directory = snapshot_path(self.snapshot_dir, checksum)
+            if self._save_snapshot(directory, checksum):
+                # 저장한 스냅샷을 다시 매핑해 다른 워커와 같은 페이지를 공유
+                self._attach(directory)
         except Exception as e:
             print(f"Error loading users: {str(e)}")  # 디버깅용
-            self.users = []
-            self.user_vectors = None
+            self._state = _State(UserStore())
 
-    def _create_user_vectors(self):
-        """사용자 프로필을 벡터로 변환"""
-        if not self.users:
+    def _snapshot_matches(self, directory: str, checksum: str) -> bool:
+        manifest = read_manifest(directory)
+        return (manifest is not None
+                and manifest.get('checksum') == checksum
+                and manifest.get('top_k') == self.top_k
+                and manifest.get('vector_dim') == self.vector_dim)
+
+    def _save_snapshot(self, directory: str, checksum: str) -> bool:
+        if self.user_vectors is None:
+            return False
+        try:
+            save_snapshot(self, directory, checksum)
+            with snapshot_lock(self.snapshot_dir):
+                publish_snapshot(self.snapshot_dir, directory)
+            print(f"Saved recommender snapshot: {directory}")  # 디버깅용
+            return True
+        except Exception as e:
+            # 스냅샷 저장 실패는 다음 기동이 느려질 뿐이므로 추천 자체는 계속 제공
+            print(f"Error saving recommender snapshot: {str(e)}")  # 디버깅용
+            return False
+
+    def _attach(self, directory: str):
+        """스냅샷을 메모리 매핑해 현재 상태로 사용"""
+        with self._lock:
+            loaded = load_snapshot(directory)
+            self._restore(loaded)
+            self._history = loaded['manifest'].get('history') or [[os.path.basename(directory), []]]
+            self.snapshot = directory
+            self._dirty = False
+            self._changes = []
+
+    def _begin_write(self):
+        """증분 변경 전에 최신 배포 스냅샷으로 옮겨 감 (이미 배포 안 한 변경이 있으면 publish 때 다시 적용)"""
+        if self._dirty:
             return
+        directory = current_snapshot(self.snapshot_dir)
+        if directory and directory != self.snapshot and self._snapshot_matches(directory, self._checksum):
+            self._attach(directory)
+
+    @contextmanager
+    def _writing(self):
+        """증분 변경 구간 (중첩 가능)
+
+        가장 바깥 구간을 시작할 때 최신 배포 스냅샷으로 옮겨 가고, 구간 안의 변경은 _edit()이 만든
+        복사본에만 적용한다. 구간이 예외 없이 끝나면 복사본을 한 번의 대입으로 self._state에 올리며,
+        예외로 끝나면 복사본을 버려 읽기 쪽은 변경 전 상태를 그대로 본다.
+        """
+        with self._lock:
+            outermost = not self._write_depth
+            if outermost:
+                self._begin_write()
+            self._write_depth += 1
+            try:
+                yield
+                if outermost and self._work is not None:
+                    self._state, self._dirty = self._merge_rows(), True
+            finally:
+                self._write_depth -= 1
+                if outermost:
+                    self._work, self._rows, self._buffers = None, {}, None
+
+    def batch(self):
+        """여러 증분 변경을 한 쓰기 구간으로 묶는 with 블록 (상태 복사와 행렬 재구성이 블록마다 한 번)"""
+        return self._writing()
+
+    def _current(self) -> _State:
+        """쓰기 구간에서 지금까지의 변경이 반영된 상태"""
+        return self._work if self._work is not None else self._state
+
+    def _edit(self) -> _State:
+        """쓰기 구간의 작업 상태 (처음 부를 때 읽기 상태를 복사해 만들며, 메모리 매핑된 배열도 여기서 복사)
+
+        희소 행렬과 IDF는 제자리에서 고치지 않고 새 객체로 바꾸므로 복사하지 않는다.
+        """
+        if self._work is None:
+            state = self._state
+            self._work = state._replace(
+                store=state.store.to_mutable(),
+                neighbor_ids=np.array(state.neighbor_ids),
+                neighbor_scores=np.array(state.neighbor_scores),
+                active=np.array(state.active),
+                df=np.array(state.df),
+            )
+        return self._work
+
+    def publish(self) -> str:
+        """증분 변경이 반영된 현재 상태를 새 세대 스냅샷으로 저장하고 CURRENT를 교체
+
+        잠금 안에서 CURRENT가 그사이 다른 프로세스의 스냅샷으로 바뀌었으면 그 스냅샷을 매핑하고
+        이 프로세스의 변경을 다시 적용한 뒤 저장하며, CURRENT는 읽은 값 그대로일 때만 교체한다.
+        같은 snapshot_dir을 쓰는 다른 워커는 다음 요청 때 새 스냅샷으로 옮겨 간다.
+        """
+        with self._lock, snapshot_lock(self.snapshot_dir):
+            current = current_snapshot(self.snapshot_dir)
+            if current and current != self.snapshot and self._snapshot_matches(current, self._checksum):
+                changes = self._changes
+                self._attach(current)
+                with self._writing():
+                    for method, *args in changes:
+                        getattr(self, method)(*args)
+            directory = snapshot_path(self.snapshot_dir, self._checksum, generation=time.time_ns())
+            changed = sorted({args[0] for method, *args in self._changes if args})
+            history = (self._history + [[os.path.basename(directory), changed]])[-SNAPSHOT_HISTORY:]
+            save_snapshot(self, directory, self._checksum, history=history)
+            publish_snapshot(self.snapshot_dir, directory, expected=current)
+            self._attach(directory)
+            return directory
+
+    def refresh(self, force: bool = False) -> bool:
+        """다른 프로세스가 새 스냅샷을 배포했으면 매핑을 교체 (force가 아니면 reload_interval마다 한 번 확인)
+
+        교체했으면 True. 배포하지 않은 증분 변경이 있으면 교체하지 않는다 (publish 때 합쳐짐).
+        """
+        now = time.monotonic()
+        if self._dirty or (not force and now - self._last_reload_check < self.reload_interval):
+            return False
+        self._last_reload_check = now
+        directory = current_snapshot(self.snapshot_dir)
+        if directory and directory != self.snapshot and self._snapshot_matches(directory, self._checksum):
+            try:
+                with self._lock:
+                    if self._dirty:
+                        return False
+                    self._attach(directory)
+                print(f"Switched to recommender snapshot: {directory}")  # 디버깅용
+                return True
+            except Exception as e:
+                print(f"Error switching recommender snapshot: {str(e)}")  # 디버깅용
+        return False
+
+    def changes_since(self, snapshot: Optional[str]) -> Tuple[Optional[str], Optional[Dict[str, Any]]]:
+        """snapshot 이후 현재 스냅샷까지 논문이 바뀐 사용자 (현재 스냅샷, {user_id: 지금 논문 목록 또는 삭제됐으면 None})
+
+        snapshot이 배포 이력(최근 SNAPSHOT_HISTORY개)에 없으면 바뀐 사용자를 알 수 없으므로 None을
+        돌려주며, 이때 파생 색인은 전체를 다시 만들어야 한다.
+        """
+        with self._lock:
+            names = [name for name, _ in self._history]
+            if snapshot is None or os.path.basename(snapshot) not in names:
+                return self.snapshot, None
+            changed = set()
+            for _, user_ids in self._history[names.index(os.path.basename(snapshot)) + 1:]:
+                changed.update(user_ids)
+            store = self._state.store
+            changes = {}
+            for user_id in sorted(changed):
+                row = store.row_of(user_id)
+                changes[user_id] = store.papers(row) if row is not None else None
+            return self.snapshot, changes
+
+    def _restore(self, loaded: Dict[str, Any]):
+        """스냅샷에서 읽은 값으로 학습 상태 복원 (TF-IDF 재학습 없음)"""
+        vocabulary = loaded['vocabulary']
+        self._counter = CountVectorizer(vocabulary=vocabulary, dtype=np.float32)
+        self.vectorizer = TfidfVectorizer(max_features=self.vector_dim, dtype=np.float32, vocabulary=vocabulary)
+        self.vectorizer.idf_ = loaded['idf']
+        self._state = _State(
+            store=loaded['store'],
+            user_vectors=loaded['user_vectors'],
+            neighbor_ids=loaded['neighbor_ids'],
+            neighbor_scores=loaded['neighbor_scores'],
+            active=loaded['active'],
+            df=loaded['df'],
+            idf=loaded['idf'],
+        )
+
+    def _create_user_vectors(self, store) -> _State:
+        """사용자 프로필을 벡터로 변환해 store에 대한 새 상태를 만듦"""
+        if not len(store):
+            return _State(store)
 
         # 각 사용자의 프로필을 하나의 문자열로 결합
         user_profiles = []
-        for user in self.users:
+        for row, user_id in enumerate(store.user_ids):
 
             # 사용자의 모든 논문 정보를 결합
-            profile_text = ""
-            for paper in user.get("papers", []):
-                profile_text += f"{paper.get('title', '')} {paper.get('abstract', '')} "
-                profile_text += f"{' '.join(paper.get('equipments', []))} "
-                profile_text += f"{' '.join(paper.get('reagents', []))} "
-            
+            profile_text = store.profile_text(row)
+
             # 빈 문자열이 아닌 경우에만 추가
             if profile_text.strip():
                 user_profiles.append(profile_text)
             else:
                 # 빈 프로필인 경우 기본 텍스트 추가
-                user_profiles.append(f"user_{user.get('user_id', 'unknown')}")
+                user_profiles.append(f"user_{user_id}")
 
         # 최소 하나의 프로필이 있는지 확인
         if not user_profiles:
             print("No valid user profiles found")
+            return _State(store)
+
+
+        # TF-IDF 기반 벡터화 (float32로 보관해 메모리 절반 사용)
+        self.vectorizer = TfidfVectorizer(max_features=self.vector_dim, dtype=np.float32)
+        user_vectors = sp.csr_matrix(self.vectorizer.fit_transform(user_profiles))
+        print(f"Created vectors with shape: {user_vectors.shape}")  # 디버깅용
+
+        # 증분 업데이트를 위해 어휘를 고정하고 문서 빈도를 유지
+        self._counter = CountVectorizer(vocabulary=self.vectorizer.vocabulary_, dtype=np.float32)
+        state = _State(
+            store=store,
+            user_vectors=user_vectors,
+            active=np.ones(user_vectors.shape[0], dtype=bool),
+            df=np.bincount(user_vectors.indices, minlength=len(self.vectorizer.vocabulary_)),
+            idf=self.vectorizer.idf_.astype(np.float32),
+        )
+        return self._build_neighbor_table(state)
+
+    def _row(self, row: int):
+        """작업 상태에서 row의 벡터 (이번 쓰기 구간에서 바뀌었으면 바뀐 값)"""
+        vector = self._rows.get(row)
+        return vector if vector is not None else self._work.user_vectors[row]
+
+    def _merge_rows(self) -> _State:
+        """쓰기 구간에서 바뀐 행을 희소 행렬에 한 번에 합친 작업 상태
+
+        행마다 희소 행렬 전체를 다시 쌓으면 변경 하나가 O(nnz)라 여러 건을 반영하면 제곱으로 늘어나므로,
+        바뀐 행은 _rows에 모아 두었다가 구간 끝에 한 번만 다시 쌓는다.
+        """
+        work = self._work
+        if not self._rows:
+            return work
+        vectors = work.user_vectors
+        pieces, start = [], 0
+        for row in sorted(self._rows):
+            if row > start:
+                pieces.append(vectors[start:row])
+            pieces.append(self._rows[row])
+            start = row + 1
+        if start < vectors.shape[0]:
+            pieces.append(vectors[start:])
+        return work._replace(user_vectors=sp.vstack(pieces, format='csr'))
+
+    def _vectorize(self, profile_text: str):
+        """고정된 어휘와 작업 상태의 IDF로 한 사용자의 TF-IDF 행을 계산"""
+        counts = self._counter.transform([profile_text])
+        return sp.csr_matrix(normalize(counts.multiply(self._work.idf), copy=False), dtype=np.float32)
+
+    def _update_idf(self, old_terms: np.ndarray, new_terms: np.ndarray):
+        """문서 빈도를 갱신하고 TfidfVectorizer(smooth_idf=True)와 같은 식으로 IDF 재계산"""
+        work = self._work
+        np.subtract.at(work.df, old_terms, 1)
+        np.add.at(work.df, new_terms, 1)
+        n_docs = int(work.active.sum())
+        self._work = work._replace(idf=(np.log((1 + n_docs) / (1 + work.df)) + 1).astype(np.float32))
+
+    def _set_row(self, row: int, vector):
+        """작업 상태의 한 행을 교체하거나, row가 끝이면 새 행으로 추가 (희소 행렬은 구간 끝에 _merge_rows로 합침)"""
+        if row == len(self._work.active):
+            self._append_row()
+        self._rows[row] = vector
+
+    def _append_row(self):
+        """작업 상태의 행 단위 배열(active, 이웃 테이블)에 빈 행 하나를 덧붙임
+
+        배열은 용량을 두 배씩 늘리는 버퍼의 앞부분 뷰이므로 덧붙이기가 평균 O(1)이다.
+        """
+        work = self._work
+        n_users = len(work.active)
+        if self._buffers is None or len(self._buffers['active']) == n_users:
+            capacity = max(2 * n_users, 16)
+            self._buffers = {}
+            for name in ('active', 'neighbor_ids', 'neighbor_scores'):
+                array = getattr(work, name)
+                buffer = np.empty((capacity,) + array.shape[1:], dtype=array.dtype)
+                buffer[:n_users] = array
+                self._buffers[name] = buffer
+        self._buffers['active'][n_users] = True
+        self._buffers['neighbor_ids'][n_users] = 0
+        self._buffers['neighbor_scores'][n_users] = -np.inf
+        self._work = work._replace(**{name: buffer[:n_users + 1] for name, buffer in self._buffers.items()})
+
+    def _refresh_neighbors(self, row: int):
+        """row가 바뀐 뒤 작업 상태의 이웃 테이블에서 영향을 받는 행만 다시 계산"""
+        work = self._work
+        k = work.neighbor_ids.shape[1]
+        if k == 0:
+            return
+
+        # row를 이웃으로 갖고 있던 행은 점수가 바뀌었거나 사라졌으므로 전부 재계산
+        stale = np.flatnonzero((work.neighbor_ids == row).any(axis=1) & work.active)
+        stale = stale[stale != row]
+        step = self._block_rows(work)
+        for start in range(0, len(stale), step):
+            rows = stale[start:start + step]
+            ids, scores = self._top_k(self._similarity_block(work, rows, self._rows), k)
+            work.neighbor_ids[rows], work.neighbor_scores[rows] = ids, scores
+
+        if not work.active[row]:
+            work.neighbor_scores[row] = -np.inf
             return
 
+        similarities = self._similarity_block(work, np.array([row]), self._rows)
+        ids, scores = self._top_k(similarities, k)
+        work.neighbor_ids[row], work.neighbor_scores[row] = ids[0], scores[0]
+
+        # 코사인 유사도는 대칭이므로 같은 행을 이용해 다른 사용자의 테이블에 row를 끼워 넣음
+        column = similarities[0]
+        candidates = np.flatnonzero(column > work.neighbor_scores[:, -1])
+        candidates = candidates[~np.isin(candidates, stale)]
+        if len(candidates):
+            merged_ids = np.hstack([work.neighbor_ids[candidates], np.full((len(candidates), 1), row)])
+            merged_scores = np.hstack([work.neighbor_scores[candidates], column[candidates, None]])
+            order = np.argsort(-merged_scores, axis=1, kind="stable")[:, :k]
+            work.neighbor_ids[candidates] = np.take_along_axis(merged_ids, order, axis=1)
+            work.neighbor_scores[candidates] = np.take_along_axis(merged_scores, order, axis=1)
+
+    def upsert_user(self, user_id: str, papers: List[Dict[str, Any]]):
+        """사용자 한 명의 논문 목록을 추가/교체하고 해당 행과 이웃 테이블만 갱신
+
+        어휘는 처음 학습한 것으로 고정되며, IDF는 문서 빈도로부터 증분 갱신된다.
+        다른 사용자의 벡터는 기존 IDF 가중치를 유지하므로 변경이 누적되면 refit()으로 다시 학습한다.
+        """
+        if self.user_vectors is None:
+            self.load_users()
+        if self.user_vectors is None:
+            raise RuntimeError("Recommender has no fitted vectors to update")
+        with self._writing():
+            work = self._edit()
+            old_row = work.store.row_of(user_id)
+            old_terms = self._row(old_row).indices if old_row is not None else np.empty(0, dtype=int)
+            row = work.store.add_user(user_id, papers)
+            if old_row is None:
+                self._set_row(row, sp.csr_matrix((1, work.user_vectors.shape[1]), dtype=np.float32))
+
+            profile_text = work.store.profile_text(row)
+            new_terms = self._counter.transform([profile_text]).indices
+            self._update_idf(old_terms, new_terms)
+            self._set_row(row, self._vectorize(profile_text))
+            self._refresh_neighbors(row)
+            self._changes.append(('upsert_user', user_id, list(papers)))
+            return row
+
+    def add_papers(self, user_id: str, papers: List[Dict[str, Any]]):
+        """사용자의 기존 논문 뒤에 papers를 붙여 upsert_user (배포 때 다시 적용하면 그때의 논문 뒤에 붙음)
 
-        # TF-IDF 기반 벡터화
-        self.vectorizer = TfidfVectorizer(max_features=self.vector_dim)
-        self.user_vectors = self.vectorizer.fit_transform(user_profiles)
-        print(f"Created vectors with shape: {self.user_vectors.shape}")  # 디버깅용
+        이미 있는 논문(DOI, 없으면 제목이 같은 논문)은 건너뛰므로 같은 논문을 다시 보내도 중복되지 않는다.
+        """
+        with self._writing():
+            store = self._current().store
+            row = store.row_of(user_id)
+            existing = store.papers(row) if row is not None else []
+            seen = {paper_key(paper) for paper in existing}
+            new = []
+            for paper in papers:
+                if paper_key(paper) not in seen:
+                    seen.add(paper_key(paper))
+                    new.append(paper)
+            if not new:
+                return row
+            papers = new
+            row = self.upsert_user(user_id, existing + list(papers))
+            self._changes[-1] = ('add_papers', user_id, list(papers))
+            return row
+
+    def remove_user(self, user_id: str) -> bool:
+        """사용자를 추천 대상에서 제거 (행은 비활성화되고 refit() 때 정리됨)"""
+        if self.user_vectors is None:
+            return False
+        with self._writing():
+            if user_id not in self._current().store:
+                return False
+
+            work = self._edit()
+            row = work.store.remove_user(user_id)
+            old_terms = self._row(row).indices
+            work.active[row] = False
+            self._update_idf(old_terms, np.empty(0, dtype=int))
+            self._set_row(row, sp.csr_matrix((1, work.user_vectors.shape[1]), dtype=np.float32))
+            self._refresh_neighbors(row)
+            self._changes.append(('remove_user', user_id))
+            return True
+
+    def refit(self):
+        """삭제된 행을 정리하고 현재 사용자 전체로 어휘와 IDF를 다시 학습"""
+        with self._writing():
+            current = self._current().store
+            store = UserStore()
+            for user_id in current.user_ids:
+                row = current.row_of(user_id)
+                if row is not None:
+                    store.add_user(user_id, current.papers(row))
+            self._work, self._rows, self._buffers = self._create_user_vectors(store), {}, None
+            self._changes.append(('refit',))
+
+    def _block_rows(self, state: _State) -> int:
+        """메모리 예산 안에서 한 번에 계산할 행 수"""
+        return max(1, self.block_budget // max(1, len(state.active)))
+
+    @staticmethod
+    def _top_k(similarities: np.ndarray, k: int):
+        """행마다 상위 k개의 (인덱스, 점수)를 유사도 내림차순으로 반환"""
+        if k < similarities.shape[1]:
+            # 전체 정렬 대신 argpartition으로 후보 k개만 고른 뒤 그 안에서만 정렬
+            candidates = np.argpartition(-similarities, k - 1, axis=1)[:, :k]
+        else:
+            candidates = np.broadcast_to(np.arange(similarities.shape[1]), similarities.shape)
+        candidate_scores = np.take_along_axis(similarities, candidates, axis=1)
+        order = np.argsort(-candidate_scores, axis=1, kind="stable")
+        return (np.take_along_axis(candidates, order, axis=1),
+                np.take_along_axis(candidate_scores, order, axis=1))
+
+    @staticmethod
+    def _similarity_block(state: _State, rows: np.ndarray,
+                          changed: Optional[Dict[int, sp.csr_matrix]] = None) -> np.ndarray:
+        """rows 사용자와 전체 사용자 간의 코사인 유사도 (자기 자신과 삭제된 사용자는 -inf)
+
+        TfidfVectorizer의 출력은 L2 정규화되어 있으므로 내적이 곧 코사인 유사도다.
+        changed는 아직 희소 행렬에 합치지 않은 행이며 (쓰기 구간), 해당 행은 그 벡터로 계산한다.
+        """
+        vectors = state.user_vectors
+        if changed:
+            queries = sp.vstack([changed[row] if row in changed else vectors[row] for row in rows]).toarray()
+        else:
+            queries = vectors[rows].toarray()
+        # 결과 블록은 거의 밀집이므로 희소×희소 곱 대신 (전체 희소 행렬) × (블록의 밀집 전치)로 계산
+        block = np.asarray(vectors @ queries.T).T
+        if changed:
+            full = np.empty((len(rows), len(state.active)), dtype=np.float32)
+            full[:, :block.shape[1]] = block
+            changed_rows = np.array(sorted(changed))
+            full[:, changed_rows] = np.asarray(sp.vstack([changed[row] for row in changed_rows]) @ queries.T).T
+            block = full
+        similarities = np.ascontiguousarray(block, dtype=np.float32)
+        similarities[np.arange(len(rows)), rows] = -np.inf
+        if not state.active.all():
+            similarities[:, ~state.active] = -np.inf
+        return similarities
+
+    def _build_neighbor_table(self, state: _State) -> _State:
+        """학습 직후 사용자별 상위 top_k 이웃 테이블을 블록 단위 희소 행렬 곱으로 계산해 state에 채움"""
+        n_users = state.user_vectors.shape[0]
+        k = min(self.top_k, n_users - 1)
+        neighbor_ids = np.empty((n_users, max(k, 0)), dtype=np.int32)
+        neighbor_scores = np.empty((n_users, max(k, 0)), dtype=np.float32)
+        if k > 0:
+            step = self._block_rows(state)
+            for start in range(0, n_users, step):
+                rows = np.arange(start, min(start + step, n_users))
+                neighbor_ids[rows], neighbor_scores[rows] = self._top_k(self._similarity_block(state, rows), k)
+            print(f"Built neighbor table with shape: {neighbor_ids.shape}")  # 디버깅용
+        return state._replace(neighbor_ids=neighbor_ids, neighbor_scores=neighbor_scores)
+
+    def _neighbors(self, state: _State, user_idx: int, n: int):
+        """이웃 테이블에서 상위 n명을 반환하고, 테이블보다 많이 요청하면 직접 계산"""
+        if state.neighbor_ids is not None and n <= state.neighbor_ids.shape[1]:
+            ids, scores = state.neighbor_ids[user_idx, :n], state.neighbor_scores[user_idx, :n]
+        else:
+            similarities = self._similarity_block(state, np.array([user_idx]))
+            k = min(n, similarities.shape[1] - 1)
+            if k <= 0:
+                return np.empty(0, dtype=np.int32), np.empty(0, dtype=np.float32)
+            ids, scores = self._top_k(similarities, k)
+            ids, scores = ids[0], scores[0]
+        # 삭제된 사용자 등으로 채워지지 않은 칸(-inf)은 제외
+        valid = np.isfinite(scores)
+        return ids[valid], scores[valid]
 
     def get_recommendations(self, user_id: str, n_recommendations: int = 5) -> List[Dict[str, Any]]:
         """사용자 기반 추천"""
-        if not self.users or self.user_vectors is None:
+        if not len(self.store) or self.user_vectors is None:
             self.load_users()
+        self.refresh()
+        # 잠금 없이 읽으므로 이 요청 동안 쓸 상태를 한 번만 잡음
+        state = self._state
 
-        # 현재 사용자 찾기
-        current_user_idx = None
-        for i, user in enumerate(self.users):
-            if user['user_id'] == user_id:
-                current_user_idx = i
-                break
+        # 현재 사용자 찾기 (인덱스로 조회, 선형 탐색 없음)
+        current_user_idx = state.store.row_of(user_id)
 
         if current_user_idx is None:
             print(f"User {user_id} not found")  # 디버깅용
             return []
 
-        # 현재 사용자와 다른 모든 사용자 간의 유사도 계산
-        current_user_vector = self.user_vectors[current_user_idx]
-        similarities = cosine_similarity(current_user_vector, self.user_vectors).flatten()
+        # 미리 계산된 이웃 테이블에서 자기 자신을 제외한 유사 사용자 조회
+        similar_indices, similarity_scores = self._neighbors(state, current_user_idx, n_recommendations)
+        return self._format(state, similar_indices, similarity_scores)
 
-        # 자기 자신을 제외하고 가장 유사한 사용자들의 인덱스 찾기
-        similar_indices = np.argsort(similarities)[::-1][1:n_recommendations+1]
-
-        # 추천 결과 생성
+    @staticmethod
+    def _format(state: _State, similar_indices, similarity_scores) -> List[Dict[str, Any]]:
+        """추천 결과 생성"""
         recommendations = []
-        for idx in similar_indices:
-            user = self.users[idx]
-
+        for idx, score in zip(similar_indices, similarity_scores):
             recommendations.append({
-                'user_id': user['user_id'],
-                'similarity_score': float(similarities[idx]),
-                'papers': user.get('papers', [])
-
+                'user_id': state.store.user_ids[idx],
+                'similarity_score': float(score),
+                'papers': state.store.papers(idx)
             })
 
         return recommendations
 
+    def recommend_batch(self, user_ids: Optional[Iterable[str]] = None,
+                        n_recommendations: int = 5) -> Iterator[Dict[str, Any]]:
+        """여러 사용자의 추천을 한꺼번에 계산해 사용자별로 차례로 반환 (user_ids가 None이면 전체)
+
+        이웃 테이블로 충분하면 테이블에서 바로 읽고, 더 많은 이웃을 요청하면
+        블록 단위 행렬 곱 한 번으로 블록 안의 사용자를 함께 계산한다.
+        끝까지 처음에 잡은 상태 하나로 계산하므로 도중에 배포가 바뀌어도 결과가 섞이지 않는다.
+        """
+        if not len(self.store) or self.user_vectors is None:
+            self.load_users()
+        self.refresh()
+        state = self._state
+
+        if user_ids is None:
+            user_ids = [user_id for row, user_id in enumerate(state.store.user_ids) if state.active[row]]
+        requested = [(user_id, state.store.row_of(user_id)) for user_id in user_ids]
+
+        use_table = state.neighbor_ids is not None and n_recommendations <= state.neighbor_ids.shape[1]
+        k = min(n_recommendations, state.user_vectors.shape[0] - 1)
+        step = max(1, len(requested) if use_table else self._block_rows(state))
+        for start in range(0, len(requested), step):
+            chunk = requested[start:start + step]
+            rows = np.array([row for _, row in chunk if row is not None], dtype=np.int64)
+            if use_table:
+                ids = state.neighbor_ids[rows, :n_recommendations]
+                scores = state.neighbor_scores[rows, :n_recommendations]
+            elif len(rows) and k > 0:
+                ids, scores = self._top_k(self._similarity_block(state, rows), k)
+            else:
+                ids = scores = np.empty((len(rows), 0), dtype=np.float32)
+
+            i = 0
+            for user_id, row in chunk:
+                if row is None:
+                    yield {'user_id': user_id, 'recommendations': []}
+                    continue
+                valid = np.isfinite(scores[i])
+                yield {'user_id': user_id, 'recommendations': self._format(state, ids[i][valid], scores[i][valid])}
+                i += 1
+
     def get_similar_users(self, user_id: str, n_similar: int = 5) -> List[Dict[str, Any]]:
         """유사한 사용자 찾기"""
-        return self.get_recommendations(user_id, n_similar)
\ No newline at end of file
+        return self.get_recommendations(user_id, n_similar)
+
+
+class RecommenderUpdater:
+    """프로필 수집 결과를 모아 Recommender에 한 번에 반영하고 배포
+
+    프로필마다 반영·배포하면 그때마다 상태를 복사하고 희소 행렬을 다시 쌓고 스냅샷 전체를 쓰므로,
+    delay초 동안 들어온 논문을 모아 별도 스레드에서 한 번의 쓰기 구간(복사·재구성)과 배포로 처리한다.
+    submit()이 돌려준 future는 배포가 끝나면 배포한 스냅샷 경로로 완료된다.
+    """
+
+    def __init__(self, recommender: Recommender, delay: float = RECOMMENDER_PUBLISH_DELAY):
+        self.recommender = recommender
+        self.delay = delay
+        self._pending: Dict[str, List[Dict[str, Any]]] = {}
+        self._futures: List[Future] = []
+        self._timer: Optional[threading.Timer] = None
+        self._lock = threading.Lock()
+
+    def submit(self, user_id: str, papers: List[Dict[str, Any]]) -> Future:
+        """user_id의 새 논문을 다음 배포에 포함 (바로 반환)"""
+        future = Future()
+        with self._lock:
+            self._pending.setdefault(user_id, []).extend(papers)
+            self._futures.append(future)
+            if self._timer is None:
+                self._timer = threading.Timer(self.delay, self.flush)
+                self._timer.daemon = True
+                self._timer.start()
+        return future
+
+    def flush(self) -> Optional[str]:
+        """모인 논문을 지금 반영하고 배포 (모인 것이 없으면 None)"""
+        with self._lock:
+            pending, futures, timer = self._pending, self._futures, self._timer
+            self._pending, self._futures, self._timer = {}, [], None
+        if timer is not None:
+            timer.cancel()
+        if not pending:
+            return None
+        try:
+            with self.recommender.batch():
+                for user_id, papers in pending.items():
+                    self.recommender.add_papers(user_id, papers)
+            directory = self.recommender.publish()
+        except Exception as e:
+            for future in futures:
+                future.set_exception(e)
+            return None
+        print(f"Published recommender snapshot with {len(pending)} updated users")  # 디버깅용
+        for future in futures:
+            future.set_result(directory)
+        return directory
+
+
+_recommender = None
+_updater = None
+
+
+def get_recommender() -> Recommender:
+    """프로세스 전역 Recommender 인스턴스 (추천 API와 프로필 수집이 공유)"""
+    global _recommender
+    if _recommender is None:
+        _recommender = Recommender()
+    return _recommender
+
+
+def get_recommender_updater() -> RecommenderUpdater:
+    """프로세스 전역 RecommenderUpdater (프로필 수집 워커가 사용)"""
+    global _updater
+    if _updater is None:
+        _updater = RecommenderUpdater(get_recommender())
+    return _updater
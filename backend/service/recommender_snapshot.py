@@ -0,0 +1,209 @@
+import fcntl
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import time
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+import scipy.sparse as sp
+
+from ..core.file_lock import file_lock
+from .user_store import MappedUserStore, save_user_store
+
+# 저장 형식이 바뀌면 올려서 이전 스냅샷을 무시하게 함
+SNAPSHOT_VERSION = 2
+
+MANIFEST = 'manifest.json'
+# 워커들이 현재 사용할 스냅샷 디렉터리 이름을 담은 포인터 파일
+POINTER = 'CURRENT'
+# 배포(현재 스냅샷 읽기 -> 변경 적용 -> POINTER 교체) 동안 잡는 잠금 파일
+LOCK = '.lock'
+# 스냅샷을 쓰는 동안 공유 잠금을 잡아 두는 파일 (잠긴 세대는 publish_snapshot이 지우지 않음)
+PIN = '.pin'
+_UNCHECKED = object()
+# np.load(mmap_mode='r')로 매핑해서 읽는 배열
+MAPPED_ARRAYS = ('data', 'indices', 'indptr', 'neighbor_ids', 'neighbor_scores', 'active')
+
+
+def source_checksum(path: str, chunk_size: int = 1 << 20) -> str:
+    """원본 데이터 파일의 sha256"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def snapshot_path(root: str, checksum: str, generation: Optional[int] = None) -> str:
+    """형식 버전과 원본 체크섬(증분 갱신 후 배포본이면 세대 번호까지)으로 구분되는 스냅샷 경로"""
+    name = f"v{SNAPSHOT_VERSION}-{checksum[:16]}"
+    if generation is not None:
+        name += f"-g{generation}"
+    return os.path.join(root, name)
+
+
+def current_snapshot(root: str) -> Optional[str]:
+    """POINTER 파일이 가리키는 스냅샷 디렉터리 (없으면 None)"""
+    try:
+        with open(os.path.join(root, POINTER), 'r', encoding='utf-8') as f:
+            name = f.read().strip()
+    except OSError:
+        return None
+    return os.path.join(root, name) if name else None
+
+
+def snapshot_lock(root: str):
+    """배포자끼리 서로 배타적으로 만드는 파일 잠금 (with 문으로 사용)"""
+    return file_lock(os.path.join(root, LOCK))
+
+
+def publish_snapshot(root: str, directory: str, keep: int = 3, expected=_UNCHECKED):
+    """POINTER를 directory로 원자적으로 교체하고 오래된 세대 스냅샷을 정리
+
+    expected를 주면 POINTER가 아직 expected를 가리킬 때만 교체한다 (compare-and-swap,
+    snapshot_lock 안에서 호출). 이미 매핑 중인 워커는 파일이 지워져도 기존 매핑을 계속 읽을 수 있고,
+    다음 확인 때 새 스냅샷으로 옮겨 간다. pin_snapshot으로 고정된 세대는 keep을 넘어도 남겨 둔다.
+    """
+    os.makedirs(root, exist_ok=True)
+    if expected is not _UNCHECKED and current_snapshot(root) != expected:
+        raise RuntimeError(f"Recommender snapshot changed while publishing: expected {expected}")
+    fd, tmp_path = tempfile.mkstemp(prefix='.pointer-', dir=root)
+    with os.fdopen(fd, 'w', encoding='utf-8') as f:
+        f.write(os.path.basename(directory))
+    os.replace(tmp_path, os.path.join(root, POINTER))
+
+    generations = sorted(
+        (entry for entry in os.listdir(root)
+         if not entry.startswith('.') and '-g' in entry and entry != os.path.basename(directory)),
+        key=lambda entry: os.path.getmtime(os.path.join(root, entry)),
+    )
+    for entry in generations[:max(0, len(generations) - (keep - 1))]:
+        _remove_unpinned(os.path.join(root, entry))
+
+
+def pin_snapshot(directory: str):
+    """스냅샷이 지워지지 않도록 고정 (고정한 파일 객체를 돌려주며 close하면 풀림, 이미 지워졌으면 None)
+
+    PIN 파일에 공유 잠금을 거는 방식이라 고정한 프로세스가 죽으면 OS가 풀어 준다.
+    """
+    try:
+        f = open(os.path.join(directory, PIN), 'a')
+    except OSError:
+        return None
+    fcntl.flock(f, fcntl.LOCK_SH)
+    # 잠금을 얻기 전에 지워지고 있었으면 manifest가 없음
+    if read_manifest(directory) is None:
+        f.close()
+        return None
+    return f
+
+
+def _remove_unpinned(directory: str) -> bool:
+    """아무도 고정하지 않은 스냅샷만 삭제 (삭제했으면 True)"""
+    try:
+        f = open(os.path.join(directory, PIN), 'a')
+    except OSError:
+        shutil.rmtree(directory, ignore_errors=True)
+        return True
+    with f:
+        try:
+            fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            return False
+        shutil.rmtree(directory, ignore_errors=True)
+        return True
+
+
+def save_snapshot(recommender, directory: str, checksum: str, history: Optional[List[List[Any]]] = None) -> str:
+    """학습된 Recommender 상태를 디렉터리에 저장
+
+    history는 이 스냅샷까지의 배포 이력 [[스냅샷 이름, 바뀐 user_id 목록]]으로 manifest에 함께 적는다.
+
+    임시 디렉터리에 모두 쓴 뒤 rename 하므로 읽는 쪽은 완성된 스냅샷만 보게 된다.
+    """
+    parent = os.path.dirname(os.path.abspath(directory))
+    os.makedirs(parent, exist_ok=True)
+    tmp_dir = tempfile.mkdtemp(prefix='.snapshot-', dir=parent)
+    try:
+        vectors = recommender.user_vectors
+        arrays = {
+            'data': vectors.data,
+            'indices': vectors.indices,
+            'indptr': vectors.indptr,
+            'neighbor_ids': recommender.neighbor_ids,
+            'neighbor_scores': recommender.neighbor_scores,
+            'active': recommender.active,
+            'df': recommender._df,
+            'idf': recommender._idf,
+        }
+        for name, array in arrays.items():
+            np.save(os.path.join(tmp_dir, f"{name}.npy"), np.asarray(array))
+
+        with open(os.path.join(tmp_dir, 'vocabulary.json'), 'w', encoding='utf-8') as f:
+            json.dump({term: int(i) for term, i in recommender._counter.vocabulary.items()},
+                      f, ensure_ascii=False)
+        save_user_store(recommender.store, tmp_dir)
+
+        manifest = {
+            'version': SNAPSHOT_VERSION,
+            'checksum': checksum,
+            'shape': list(vectors.shape),
+            'vector_dim': recommender.vector_dim,
+            'top_k': recommender.top_k,
+            'created_at': time.time(),
+            'history': history or [],
+        }
+        with open(os.path.join(tmp_dir, MANIFEST), 'w', encoding='utf-8') as f:
+            json.dump(manifest, f)
+
+        if os.path.exists(directory):
+            shutil.rmtree(directory)
+        os.rename(tmp_dir, directory)
+    except Exception:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        raise
+    return directory
+
+
+def read_manifest(directory: str) -> Optional[Dict[str, Any]]:
+    """스냅샷 manifest (없거나 읽을 수 없으면 None)"""
+    try:
+        with open(os.path.join(directory, MANIFEST), 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def load_snapshot(directory: str) -> Dict[str, Any]:
+    """스냅샷을 읽어 Recommender 상태로 복원할 값들을 반환
+
+    큰 배열(CSR 버퍼, 이웃 테이블)과 사용자/논문 저장소는 메모리 매핑되므로
+    실제로 접근한 페이지만 읽히고, 같은 스냅샷을 여는 프로세스끼리 페이지를 공유한다.
+    """
+    manifest = read_manifest(directory)
+    if manifest is None or manifest.get('version') != SNAPSHOT_VERSION:
+        raise ValueError(f"Not a v{SNAPSHOT_VERSION} recommender snapshot: {directory}")
+
+    def array(name: str):
+        mmap_mode = 'r' if name in MAPPED_ARRAYS else None
+        return np.load(os.path.join(directory, f"{name}.npy"), mmap_mode=mmap_mode)
+
+    user_vectors = sp.csr_matrix(
+        (array('data'), array('indices'), array('indptr')), shape=tuple(manifest['shape']), copy=False)
+    with open(os.path.join(directory, 'vocabulary.json'), 'r', encoding='utf-8') as f:
+        vocabulary = json.load(f)
+
+    return {
+        'manifest': manifest,
+        'user_vectors': user_vectors,
+        'neighbor_ids': array('neighbor_ids'),
+        'neighbor_scores': array('neighbor_scores'),
+        'active': array('active'),
+        'df': array('df'),
+        'idf': array('idf'),
+        'vocabulary': vocabulary,
+        'store': MappedUserStore(directory),
+    }
@@ -0,0 +1,207 @@
+import asyncio
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..crud.user import get_users_by_user_ids
+from .recommender import DEFAULT_DATA_PATH, Recommender, get_recommender
+from .user_store import UserStore
+
+SEARCH_PAPER_LIMIT = 3  # /search 응답에 포함하는 사용자별 논문 수
+DB_ENTRY_TTL = float(os.getenv('RESEARCHER_CACHE_TTL', '300'))  # DB에서 가져온 항목을 캐시하는 시간 (초)
+DB_MISS_TTL = 30.0  # DB에도 없던 사용자를 다시 조회하지 않는 시간 (초)
+DB_ENTRY_LIMIT = 10_000  # 캐시하는 DB 항목 수 상한 (오래 안 쓴 것부터 버림)
+
+
+class ResearcherDirectory:
+    """/search 응답에 쓰는 연구자 정보를 프로세스 전역으로 보관하는 디렉터리
+
+    - bio_research_nested.json은 한 번만 읽어 UserStore로 보관하고, 파일 mtime이 바뀌면 다시 읽음
+    - 파일에 없는 사용자는 users/papers 테이블에서 IN 쿼리 한 번으로 가져와 DB_ENTRY_TTL 동안 캐시
+      (DB에도 없던 사용자는 DB_MISS_TTL 동안만)
+    - recommender를 주면 새 스냅샷이 배포될 때 그사이 논문이 바뀐 사용자의 캐시를 지움
+      (다른 프로세스의 프로필 수집도 반영됨). invalidate()는 이 프로세스의 캐시만 비움
+    """
+
+    def __init__(self, data_path: Optional[str] = None, reload_interval: float = 1.0,
+                 recommender: Optional[Recommender] = None):
+        self.data_path = data_path or DEFAULT_DATA_PATH
+        self.reload_interval = reload_interval
+        self.recommender = recommender
+        self.store = UserStore()
+        self._profiles: Dict[str, Dict[str, Any]] = {}  # 파일에 있는 논문 외 필드 (google_scholar_id 등)
+        # DB에서 가져온 항목 {user_id: (만료 시각, 항목 또는 없으면 None)} (LRU 순서)
+        self._db_entries: "OrderedDict[str, Tuple[float, Optional[Dict[str, Any]]]]" = OrderedDict()
+        self._snapshot = recommender.snapshot if recommender is not None else None
+        self._mtime = None
+        self._last_check = 0.0
+        self._lock = threading.Lock()
+        self._refresh_lock = threading.Lock()  # refresh()를 여러 스레드에서 동시에 하지 않도록
+        self._maybe_reload(force=True)
+
+    def _maybe_reload(self, force: bool = False):
+        """reload_interval마다 파일 mtime을 확인해 바뀌었으면 다시 읽음"""
+        now = time.monotonic()
+        if not force and now - self._last_check < self.reload_interval:
+            return
+        self._last_check = now
+        try:
+            mtime = os.stat(self.data_path).st_mtime_ns
+        except OSError:
+            return
+        if mtime == self._mtime:
+            return
+
+        with open(self.data_path, 'r', encoding='utf-8') as f:
+            users = json.load(f)
+        store = UserStore.from_records(users)
+        profiles = {
+            user['user_id']: {key: user[key] for key in ('google_scholar_id', 'linkedin') if key in user}
+            for user in users if 'google_scholar_id' in user or 'linkedin' in user
+        }
+        with self._lock:
+            self.store, self._profiles, self._mtime = store, profiles, mtime
+        print(f"📚 연구자 디렉터리 로드: {len(store)}명")  # 디버깅용
+
+    def _sync_snapshot(self):
+        """Recommender 스냅샷이 바뀌었으면 그사이 바뀐 사용자(알 수 없으면 전체)의 DB 캐시를 지움"""
+        if self.recommender is None:
+            return
+        self.recommender.refresh()
+        if self.recommender.snapshot == self._snapshot:
+            return
+        snapshot, changes = self.recommender.changes_since(self._snapshot)
+        with self._lock:
+            if changes is None:
+                self._db_entries.clear()
+            else:
+                for user_id in changes:
+                    self._db_entries.pop(user_id, None)
+            self._snapshot = snapshot
+
+    def _cached(self, user_id: str) -> Tuple[bool, Optional[Dict[str, Any]]]:
+        """(만료되지 않은 DB 캐시 항목이 있는지, 그 항목)"""
+        with self._lock:
+            cached = self._db_entries.get(user_id)
+            if cached is None:
+                return False, None
+            if cached[0] <= time.monotonic():
+                del self._db_entries[user_id]
+                return False, None
+            self._db_entries.move_to_end(user_id)
+            return True, cached[1]
+
+    def invalidate(self, user_ids: Optional[Iterable[str]] = None):
+        """user_ids의 DB 캐시 항목을 지움 (None이면 DB 캐시 전체를 지우고 파일도 다시 읽음)"""
+        with self._lock:
+            if user_ids is None:
+                self._db_entries.clear()
+                self._mtime = None
+                self._last_check = 0.0
+            else:
+                for user_id in user_ids:
+                    self._db_entries.pop(user_id, None)
+
+    def _file_entry(self, user_id: str) -> Optional[Dict[str, Any]]:
+        row = self.store.row_of(user_id)
+        if row is None:
+            return None
+        profile = self._profiles.get(user_id, {})
+        return {
+            "user_id": user_id,
+            "name": f"연구자 {user_id}",
+            "affiliation": "대학/연구소",
+            "google_scholar_id": profile.get('google_scholar_id', ''),
+            "linkedin": profile.get('linkedin', ''),
+            "papers": self.store.papers(row, SEARCH_PAPER_LIMIT),
+        }
+
+    @staticmethod
+    def _db_entry(user) -> Dict[str, Any]:
+        papers = sorted(user.papers, key=lambda p: p.year or 0, reverse=True)[:SEARCH_PAPER_LIMIT]
+        return {
+            "user_id": user.user_id,
+            "name": user.name,
+            "affiliation": user.affiliation or "",
+            "google_scholar_id": user.google_scholar_id or '',
+            "linkedin": '',
+            "papers": [
+                {
+                    'title': p.title, 'abstract': p.abstract, 'year': p.year, 'journal': p.journal,
+                    'doi': p.doi, 'authors': list(p.authors or []), 'equipments': list(p.equipments or []),
+                    'reagents': list(p.reagents or []),
+                    'vector_embedding_id': str(p.vector_embedding_id) if p.vector_embedding_id else None,
+                }
+                for p in papers
+            ],
+        }
+
+    def get(self, user_id: str) -> Optional[Dict[str, Any]]:
+        return self.get_many([user_id]).get(user_id)
+
+    def refresh(self):
+        """파일 변경과 Recommender 스냅샷 배포를 확인해 반영 (파일 읽기/스냅샷 매핑이 있어 블로킹)"""
+        with self._refresh_lock:
+            self._maybe_reload()
+            self._sync_snapshot()
+
+    def get_many(self, user_ids: Iterable[str]) -> Dict[str, Dict[str, Any]]:
+        """user_id 목록의 연구자 정보 (파일/캐시에 없는 사용자는 결과에서 빠짐)"""
+        self.refresh()
+        return self._lookup(user_ids)
+
+    def _lookup(self, user_ids: Iterable[str]) -> Dict[str, Dict[str, Any]]:
+        """메모리에 있는 항목만으로 get_many (I/O 없음)"""
+        result = {}
+        for user_id in user_ids:
+            entry = self._cached(user_id)[1] or self._file_entry(user_id)
+            if entry is not None:
+                result[user_id] = entry
+        return result
+
+    async def get_many_async(self, user_ids: Iterable[str],
+                             db: Optional[AsyncSession] = None) -> Dict[str, Dict[str, Any]]:
+        """get_many와 같지만, 캐시에 없는 사용자는 DB에서 IN 쿼리 한 번으로 가져옴
+
+        refresh()는 이벤트 루프를 막지 않도록 스레드풀에서 실행한다.
+        """
+        user_ids = list(user_ids)
+        await asyncio.get_running_loop().run_in_executor(None, self.refresh)
+        result = self._lookup(user_ids)
+        missing = [user_id for user_id in user_ids if user_id not in result and not self._cached(user_id)[0]]
+        if db is None or not missing:
+            return result
+
+        try:
+            users = await get_users_by_user_ids(db, missing)
+        except Exception as e:
+            print(f"⚠️ DB에서 연구자 정보를 가져오지 못함: {str(e)}")
+            return result
+
+        found = {user.user_id: self._db_entry(user) for user in users}
+        now = time.monotonic()
+        with self._lock:
+            for user_id in missing:
+                entry = found.get(user_id)
+                self._db_entries[user_id] = (now + (DB_ENTRY_TTL if entry is not None else DB_MISS_TTL), entry)
+                self._db_entries.move_to_end(user_id)
+            while len(self._db_entries) > DB_ENTRY_LIMIT:
+                self._db_entries.popitem(last=False)
+        result.update(found)
+        return result
+
+
+_directory: Optional[ResearcherDirectory] = None
+
+
+def get_researcher_directory() -> ResearcherDirectory:
+    """프로세스 전역 ResearcherDirectory (처음 호출 때 한 번 로드, 전역 Recommender의 스냅샷을 따라감)"""
+    global _directory
+    if _directory is None:
+        _directory = ResearcherDirectory(recommender=get_recommender())
+    return _directory
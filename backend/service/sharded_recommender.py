@@ -0,0 +1,268 @@
+import multiprocessing as mp
+import os
+import threading
+import time
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+import scipy.sparse as sp
+
+from .recommender import DEFAULT_SNAPSHOT_DIR, Recommender, get_recommender
+from .recommender_snapshot import current_snapshot, pin_snapshot, read_manifest
+from .user_store import MappedUserStore
+
+# 코디네이터가 새 스냅샷 배포를 확인하는 간격 (초) - 바뀌면 샤드 프로세스를 다시 띄우므로 Recommender보다 길게
+SHARD_RELOAD_INTERVAL = float(os.getenv('RECOMMENDER_SHARD_RELOAD_INTERVAL', '10'))
+
+
+def _shard_main(directory: str, start: int, stop: int, n_features: int, conn):
+    """샤드 프로세스: 스냅샷에서 [start, stop) 행만 매핑해 들고 질의에 상위 k개로 응답"""
+    def load(name):
+        return np.load(os.path.join(directory, f"{name}.npy"), mmap_mode='r')
+
+    data, indices, indptr = load('data'), load('indices'), load('indptr')
+    lo, hi = int(indptr[start]), int(indptr[stop])
+    matrix = sp.csr_matrix(
+        (data[lo:hi], indices[lo:hi], np.asarray(indptr[start:stop + 1]) - lo),
+        shape=(stop - start, n_features), copy=False)
+    inactive = np.flatnonzero(~np.asarray(load('active')[start:stop]))
+    conn.send('ready')
+
+    while True:
+        message = conn.recv()
+        if message is None:
+            break
+        queries, exclude, k = message
+        similarities = np.ascontiguousarray(np.asarray(matrix @ queries.T).T, dtype=np.float32)
+        if len(inactive):
+            similarities[:, inactive] = -np.inf
+        local = exclude - start
+        mask = (local >= 0) & (local < stop - start)
+        similarities[np.flatnonzero(mask), local[mask]] = -np.inf
+
+        ids, scores = Recommender._top_k(similarities, min(k, stop - start))
+        conn.send((ids + start, scores))
+    conn.close()
+
+
+class _Generation:
+    """코디네이터가 쓰는 스냅샷 세대 하나 (매핑한 배열, 사용자 저장소, 샤드 프로세스, 고정 잠금)"""
+
+    def __init__(self, directory: str, n_shards: int):
+        manifest = read_manifest(directory)
+        if manifest is None:
+            raise ValueError(f"Not a recommender snapshot: {directory}")
+        self.pin = pin_snapshot(directory)
+        if self.pin is None:
+            raise FileNotFoundError(f"Recommender snapshot was removed: {directory}")
+        self.directory = directory
+        self.n_users, self.n_features = manifest['shape']
+        self.n_shards = max(1, min(n_shards, self.n_users))
+        self.indptr = np.load(os.path.join(directory, 'indptr.npy'), mmap_mode='r')
+        self.indices = np.load(os.path.join(directory, 'indices.npy'), mmap_mode='r')
+        self.data = np.load(os.path.join(directory, 'data.npy'), mmap_mode='r')
+        self._store = None
+        self.shards = []
+
+    @property
+    def store(self) -> MappedUserStore:
+        if self._store is None:
+            self._store = MappedUserStore(self.directory)
+        return self._store
+
+    def start(self):
+        if self.shards:
+            return
+        ctx = mp.get_context('spawn')
+        bounds = np.linspace(0, self.n_users, self.n_shards + 1).astype(int)
+        shards = []
+        for start, stop in zip(bounds[:-1], bounds[1:]):
+            parent, child = ctx.Pipe()
+            process = ctx.Process(
+                target=_shard_main, args=(self.directory, int(start), int(stop), self.n_features, child),
+                daemon=True)
+            process.start()
+            shards.append((process, parent))
+        for _, conn in shards:
+            conn.recv()
+        self.shards = shards
+
+    def stop(self):
+        for process, conn in self.shards:
+            try:
+                conn.send(None)
+            except (BrokenPipeError, OSError):
+                pass
+            process.join(timeout=5)
+        self.shards = []
+
+    def close(self):
+        self.stop()
+        self.pin.close()
+
+
+class ShardedRecommender:
+    """사용자 행을 N개의 샤드 프로세스에 나눠 맡기는 scatter-gather 추천기
+
+    각 샤드는 스냅샷의 CSR 버퍼 중 자기 구간만 메모리 매핑하고, 코디네이터는 질의 벡터를
+    모든 샤드에 보낸 뒤 샤드별 상위 k개를 합쳐 전체 상위 n개를 만든다.
+    get_recommendations의 응답 형식은 Recommender와 같다.
+    질의할 때 reload_interval마다 directory가 있는 스냅샷 폴더의 CURRENT를 확인해, 새 세대가
+    배포됐으면 그 세대로 샤드를 다시 띄운다. 쓰는 세대는 pin_snapshot으로 고정해 배포 정리에
+    지워지지 않게 한다.
+    샤드와의 파이프는 질의 하나가 보내고 받는 동안 독점하므로, 여러 스레드(요청 처리 스레드,
+    StreamingResponse 스레드풀)에서 호출하면 질의끼리 차례로 실행된다. async 코드에서는
+    이벤트 루프를 막지 않도록 run_in_executor로 호출한다.
+    """
+
+    def __init__(self, directory: str, n_shards: int = 4, reload_interval: float = SHARD_RELOAD_INTERVAL):
+        self.snapshot_dir = os.path.dirname(os.path.abspath(directory))
+        self.n_shards = n_shards
+        self.reload_interval = reload_interval  # 새 스냅샷 배포 여부를 확인하는 최소 간격 (초)
+        self._last_reload_check = time.monotonic()
+        self._generation = _Generation(directory, n_shards)
+        self._lock = threading.RLock()  # 샤드 파이프를 쓰는 질의(보내기-받기)와 시작/종료/세대 교체를 직렬화
+
+    @property
+    def directory(self) -> str:
+        return self._generation.directory
+
+    @property
+    def store(self) -> MappedUserStore:
+        return self._generation.store
+
+    def refresh(self, force: bool = False) -> bool:
+        """CURRENT가 다른 세대로 바뀌었으면 그 세대로 교체 (force가 아니면 reload_interval마다 한 번 확인)
+
+        교체했으면 True. 기존 샤드가 떠 있었으면 새 세대의 샤드를 띄운 뒤 기존 샤드를 내린다.
+        """
+        with self._lock:
+            now = time.monotonic()
+            if not force and now - self._last_reload_check < self.reload_interval:
+                return False
+            self._last_reload_check = now
+            directory = current_snapshot(self.snapshot_dir)
+            if not directory or os.path.abspath(directory) == os.path.abspath(self.directory):
+                return False
+            try:
+                generation = _Generation(directory, self.n_shards)
+                if self._generation.shards:
+                    generation.start()
+            except (OSError, ValueError) as e:
+                print(f"Error switching sharded recommender snapshot: {str(e)}")  # 디버깅용
+                return False
+            self._generation.close()
+            self._generation = generation
+            print(f"Switched sharded recommender to snapshot: {directory}")  # 디버깅용
+            return True
+
+    def start(self) -> "ShardedRecommender":
+        """샤드 프로세스를 띄우고 모두 준비될 때까지 대기"""
+        with self._lock:
+            self._generation.start()
+            return self
+
+    def close(self):
+        with self._lock:
+            self._generation.stop()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.close()
+
+    @staticmethod
+    def _row_vectors(generation: _Generation, rows: Sequence[int]) -> np.ndarray:
+        """스냅샷에서 질의할 사용자 행들을 밀집 벡터로 읽음"""
+        queries = np.zeros((len(rows), generation.n_features), dtype=np.float32)
+        for i, row in enumerate(rows):
+            lo, hi = generation.indptr[row], generation.indptr[row + 1]
+            queries[i, generation.indices[lo:hi]] = generation.data[lo:hi]
+        return queries
+
+    def query_rows(self, rows: Sequence[int], n: int = 5) -> List[Tuple[np.ndarray, np.ndarray]]:
+        """현재 세대의 행 번호들에 대해 (자기 자신 제외) 상위 n개의 (행 번호, 유사도)를 반환"""
+        with self._lock:
+            self.refresh()
+            return self._query(self._generation, rows, n)
+
+    def _query(self, generation: _Generation, rows: Sequence[int], n: int) -> List[Tuple[np.ndarray, np.ndarray]]:
+        rows = np.asarray(rows, dtype=np.int64)
+        message = (self._row_vectors(generation, rows), rows, n)
+        generation.start()
+        for _, conn in generation.shards:
+            conn.send(message)
+        partials = [conn.recv() for _, conn in generation.shards]
+
+        # 샤드별 상위 k개를 이어 붙인 뒤 다시 상위 n개만 선택
+        ids = np.hstack([p[0] for p in partials])
+        scores = np.hstack([p[1] for p in partials])
+        top, top_scores = Recommender._top_k(scores, min(n, scores.shape[1]))
+        ids = np.take_along_axis(ids, top, axis=1)
+
+        results = []
+        for row_ids, row_scores in zip(ids, top_scores):
+            valid = np.isfinite(row_scores)
+            results.append((row_ids[valid], row_scores[valid]))
+        return results
+
+    def _recommend(self, user_ids: Sequence[str], n: int) -> List[Optional[List[Dict[str, Any]]]]:
+        """사용자별 추천 (없는 사용자는 None) - 행 번호 조회부터 응답 구성까지 한 세대 안에서 처리"""
+        with self._lock:
+            self.refresh()
+            generation = self._generation
+            rows = [generation.store.row_of(user_id) for user_id in user_ids]
+            present = [row for row in rows if row is not None]
+            results = iter(self._query(generation, present, n) if present else [])
+            return [self._format(generation, *next(results)) if row is not None else None for row in rows]
+
+    def get_recommendations(self, user_id: str, n_recommendations: int = 5) -> List[Dict[str, Any]]:
+        """사용자 기반 추천 (Recommender.get_recommendations와 같은 응답 형식)"""
+        recommendations, = self._recommend([user_id], n_recommendations)
+        if recommendations is None:
+            print(f"User {user_id} not found")  # 디버깅용
+            return []
+        return recommendations
+
+    @staticmethod
+    def _format(generation: _Generation, similar_indices, similarity_scores) -> List[Dict[str, Any]]:
+        return [
+            {
+                'user_id': generation.store.user_ids[idx],
+                'similarity_score': float(score),
+                'papers': generation.store.papers(idx),
+            }
+            for idx, score in zip(similar_indices, similarity_scores)
+        ]
+
+    def recommend_batch(self, user_ids: Optional[Iterable[str]] = None, n_recommendations: int = 5,
+                        batch_size: int = 256) -> Iterator[Dict[str, Any]]:
+        """여러 사용자의 추천을 batch_size명씩 모아 샤드에 한 번에 질의 (user_ids가 None이면 전체)"""
+        if user_ids is None:
+            store = self.store
+            user_ids = (user_id for row, user_id in enumerate(store.user_ids) if store.row_of(user_id) == row)
+        user_ids = list(user_ids)
+        for start in range(0, len(user_ids), batch_size):
+            chunk = user_ids[start:start + batch_size]
+            for user_id, recommendations in zip(chunk, self._recommend(chunk, n_recommendations)):
+                yield {'user_id': user_id, 'recommendations': recommendations or []}
+
+    def get_similar_users(self, user_id: str, n_similar: int = 5) -> List[Dict[str, Any]]:
+        """유사한 사용자 찾기"""
+        return self.get_recommendations(user_id, n_similar)
+
+
+_sharded_recommender: Optional[ShardedRecommender] = None
+
+
+def get_sharded_recommender(n_shards: int) -> ShardedRecommender:
+    """현재 배포된 스냅샷 위의 프로세스 전역 ShardedRecommender
+
+    스냅샷이 아직 없으면 Recommender로 한 번 학습해 만든다.
+    """
+    global _sharded_recommender
+    if _sharded_recommender is None:
+        directory = current_snapshot(DEFAULT_SNAPSHOT_DIR) or get_recommender().snapshot
+        _sharded_recommender = ShardedRecommender(directory, n_shards)
+    return _sharded_recommender
@@ -0,0 +1,306 @@
+import copy
+import json
+import os
+import sys
+from array import array
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+_NO_YEAR = -1  # array('i')에는 None을 저장할 수 없으므로 연도 없음 표시값
+COMPACT_RATIO = 0.25  # 참조가 끊긴 논문이 전체 논문 열의 이 비율을 넘으면 열을 다시 만듦
+_PAPER_COLUMNS = ('_titles', '_abstracts', '_years', '_journals', '_dois', '_authors', '_equipments', '_reagents',
+                  '_vector_embedding_ids')
+
+
+class UserStore:
+    """사용자/논문 데이터를 열(column) 단위로 보관하는 저장소
+
+    - user_id -> 행 번호는 dict로 O(1) 조회
+    - 논문은 하나의 열 테이블에 한 번만 저장되고, 사용자는 (시작 오프셋, 개수)로 참조
+    - 반복되는 문자열과 장비/시약 목록은 intern 하여 한 번만 보관
+    """
+
+    def __init__(self):
+        self.user_ids: List[str] = []
+        self._index: Dict[str, int] = {}
+        self._paper_start = array('q')
+        self._paper_count = array('i')
+
+        # 논문 열
+        self._titles: List[str] = []
+        self._abstracts: List[str] = []
+        self._years = array('i')
+        self._journals: List[str] = []
+        self._dois: List[Optional[str]] = []
+        self._authors: List[Tuple[str, ...]] = []
+        self._equipments: List[Tuple[str, ...]] = []
+        self._reagents: List[Tuple[str, ...]] = []
+        self._vector_embedding_ids: List[Optional[str]] = []
+        self._dead_papers = 0  # 교체·삭제로 어느 행도 참조하지 않게 된 논문 수
+        self._tuples: Dict[Tuple[str, ...], Tuple[str, ...]] = {}
+
+    @classmethod
+    def from_records(cls, users: Iterable[Dict[str, Any]]) -> "UserStore":
+        """bio_research_nested.json 형식의 사용자 목록으로 저장소 생성"""
+        store = cls()
+        for user in users:
+            if user.get('removed'):
+                store._append_row(user['user_id'], len(store._titles), 0, indexed=False)
+            else:
+                store.add_user(user['user_id'], user.get('papers', []))
+        return store
+
+    def to_records(self) -> Iterable[Dict[str, Any]]:
+        """행 순서를 유지한 from_records 입력 형식 (삭제된 행은 removed=True로 표시)"""
+        for row, user_id in enumerate(self.user_ids):
+            if self._index.get(user_id) == row:
+                yield {'user_id': user_id, 'papers': self.papers(row)}
+            else:
+                yield {'user_id': user_id, 'papers': [], 'removed': True}
+
+    def __len__(self) -> int:
+        return len(self.user_ids)
+
+    def __contains__(self, user_id: str) -> bool:
+        return user_id in self._index
+
+    @staticmethod
+    def _intern(value: Optional[str]) -> Optional[str]:
+        return sys.intern(value) if isinstance(value, str) else value
+
+    def _intern_tuple(self, values: Optional[Iterable[str]]) -> Tuple[str, ...]:
+        key = tuple(sys.intern(v) for v in (values or []))
+        return self._tuples.setdefault(key, key)
+
+    def _append_paper(self, paper: Dict[str, Any]):
+        year = paper.get('year')
+        self._titles.append(self._intern(paper.get('title', '')))
+        self._abstracts.append(self._intern(paper.get('abstract', '')))
+        self._years.append(_NO_YEAR if year is None else int(year))
+        self._journals.append(self._intern(paper.get('journal', '')))
+        self._dois.append(self._intern(paper.get('doi')))
+        self._authors.append(self._intern_tuple(paper.get('authors')))
+        self._equipments.append(self._intern_tuple(paper.get('equipments')))
+        self._reagents.append(self._intern_tuple(paper.get('reagents')))
+        self._vector_embedding_ids.append(self._intern(paper.get('vector_embedding_id')))
+
+    def add_user(self, user_id: str, papers: List[Dict[str, Any]]) -> int:
+        """사용자를 추가하거나, 이미 있으면 논문 목록을 교체하고 행 번호를 반환"""
+        start = len(self._titles)
+        for paper in papers:
+            self._append_paper(paper)
+
+        row = self._index.get(user_id)
+        if row is None:
+            row = self._append_row(user_id, start, len(papers))
+        else:
+            self._dead_papers += self._paper_count[row]
+            self._paper_start[row] = start
+            self._paper_count[row] = len(papers)
+            self._maybe_compact()
+        return row
+
+    def _append_row(self, user_id: str, start: int, count: int, indexed: bool = True) -> int:
+        row = len(self.user_ids)
+        user_id = sys.intern(user_id)
+        self.user_ids.append(user_id)
+        if indexed:
+            self._index[user_id] = row
+        self._paper_start.append(start)
+        self._paper_count.append(count)
+        return row
+
+    def remove_user(self, user_id: str) -> Optional[int]:
+        """user_id를 인덱스에서 제거하고 비워진 행 번호를 반환 (행 자체는 재사용하지 않음)"""
+        row = self._index.pop(user_id, None)
+        if row is not None:
+            self._dead_papers += self._paper_count[row]
+            self._paper_count[row] = 0
+            self._maybe_compact()
+        return row
+
+    def _maybe_compact(self):
+        """참조가 끊긴 논문이 COMPACT_RATIO를 넘으면 살아 있는 논문만 새 열로 옮김
+
+        기존 열은 to_mutable 원본과 공유할 수 있으므로 제자리에서 지우지 않고 새 열을 만든다.
+        """
+        if self._dead_papers <= COMPACT_RATIO * len(self._titles):
+            return
+        columns = {name: array('i') if name == '_years' else [] for name in _PAPER_COLUMNS}
+        for row in range(len(self.user_ids)):
+            start, count = self._paper_start[row], self._paper_count[row]
+            self._paper_start[row] = len(columns['_titles'])
+            for name, column in columns.items():
+                column.extend(getattr(self, name)[start:start + count])
+        for name, column in columns.items():
+            setattr(self, name, column)
+        self._dead_papers = 0
+
+    def row_of(self, user_id: str) -> Optional[int]:
+        """user_id의 행 번호 (없으면 None)"""
+        return self._index.get(user_id)
+
+    def to_mutable(self) -> "UserStore":
+        """수정용 복사본 (행 열과 인덱스만 복사하고 논문 열은 공유)
+
+        논문 열은 뒤에 덧붙이기만 하므로 복사본에서 논문을 추가해도 원본이 참조하는 범위는 바뀌지 않는다.
+        """
+        store = copy.copy(self)
+        store.user_ids = list(self.user_ids)
+        store._index = dict(self._index)
+        store._paper_start = array('q', self._paper_start)
+        store._paper_count = array('i', self._paper_count)
+        return store
+
+    def paper_count(self, row: int) -> int:
+        return self._paper_count[row]
+
+    def paper(self, offset: int) -> Dict[str, Any]:
+        """오프셋 위치의 논문을 응답용 dict로 복원"""
+        year = self._years[offset]
+        return {
+            'title': self._titles[offset],
+            'abstract': self._abstracts[offset],
+            'year': None if year == _NO_YEAR else year,
+            'journal': self._journals[offset],
+            'doi': self._dois[offset],
+            'authors': list(self._authors[offset]),
+            'equipments': list(self._equipments[offset]),
+            'reagents': list(self._reagents[offset]),
+            'vector_embedding_id': self._vector_embedding_ids[offset],
+        }
+
+    def papers(self, row: int, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """사용자의 논문 목록 (limit이 주어지면 앞에서부터 limit개)"""
+        start, count = self._paper_start[row], self._paper_count[row]
+        if limit is not None:
+            count = min(count, limit)
+        return [self.paper(offset) for offset in range(start, start + count)]
+
+    def profile_text(self, row: int) -> str:
+        """TF-IDF 입력으로 쓰는 사용자 프로필 문자열 (제목, 초록, 장비, 시약)"""
+        start, count = self._paper_start[row], self._paper_count[row]
+        parts = []
+        for offset in range(start, start + count):
+            parts.append(f"{self._titles[offset]} {self._abstracts[offset]} ")
+            parts.append(f"{' '.join(self._equipments[offset])} ")
+            parts.append(f"{' '.join(self._reagents[offset])} ")
+        return "".join(parts)
+
+
+# 스냅샷에 저장되는 파일 (모두 메모리 매핑으로 읽을 수 있는 형식)
+USER_IDS_FILE = 'user_ids.npy'  # 행 순서의 user_id (고정 길이 UTF-8 bytes)
+SORTED_IDS_FILE = 'ids_sorted.npy'  # 이진 탐색용으로 정렬한 활성 user_id
+SORTED_ROWS_FILE = 'ids_rows.npy'  # ids_sorted 각 항목의 행 번호
+PAPER_OFFSETS_FILE = 'paper_offsets.npy'  # 행별 논문 JSON의 papers.bin 내 오프셋 (행 수 + 1)
+PAPER_BLOB_FILE = 'papers.bin'  # 행별 논문 목록을 JSON으로 이어 붙인 바이트열
+
+
+def save_user_store(store, directory: str):
+    """UserStore 또는 MappedUserStore를 메모리 매핑 가능한 파일들로 저장"""
+    encoded_ids = [user_id.encode('utf-8') for user_id in store.user_ids]
+    width = max([len(user_id) for user_id in encoded_ids] + [1])
+    user_ids = np.array(encoded_ids, dtype=f'S{width}')
+
+    active_rows = np.array(
+        [row for row, user_id in enumerate(store.user_ids) if store.row_of(user_id) == row], dtype=np.int32)
+    order = np.argsort(user_ids[active_rows], kind='stable')
+
+    offsets = np.zeros(len(encoded_ids) + 1, dtype=np.int64)
+    with open(os.path.join(directory, PAPER_BLOB_FILE), 'wb') as f:
+        for row, user_id in enumerate(store.user_ids):
+            papers = store.papers(row) if store.row_of(user_id) == row else []
+            chunk = json.dumps(papers, ensure_ascii=False).encode('utf-8')
+            f.write(chunk)
+            offsets[row + 1] = offsets[row] + len(chunk)
+
+    np.save(os.path.join(directory, USER_IDS_FILE), user_ids)
+    np.save(os.path.join(directory, SORTED_IDS_FILE), user_ids[active_rows][order])
+    np.save(os.path.join(directory, SORTED_ROWS_FILE), active_rows[order])
+    np.save(os.path.join(directory, PAPER_OFFSETS_FILE), offsets)
+
+
+class _MappedStrings:
+    """고정 길이 bytes 배열을 str 시퀀스처럼 읽는 래퍼"""
+
+    def __init__(self, values: np.ndarray):
+        self._values = values
+
+    def __len__(self) -> int:
+        return len(self._values)
+
+    def __getitem__(self, row: int) -> str:
+        return self._values[row].decode('utf-8')
+
+    def __iter__(self):
+        for value in self._values:
+            yield value.decode('utf-8')
+
+
+class MappedUserStore:
+    """save_user_store로 저장한 파일을 메모리 매핑해 읽는 읽기 전용 UserStore
+
+    user_id 조회는 정렬된 id 배열에 대한 이진 탐색, 논문은 요청된 행만 JSON으로 복원한다.
+    파일은 OS 페이지 캐시를 통해 같은 스냅샷을 여는 모든 프로세스가 공유하므로
+    워커 수가 늘어도 사용자/논문 데이터가 프로세스마다 복제되지 않는다.
+    """
+
+    def __init__(self, directory: str):
+        def load(name):
+            return np.load(os.path.join(directory, name), mmap_mode='r')
+
+        self.user_ids = _MappedStrings(load(USER_IDS_FILE))
+        self._sorted_ids = load(SORTED_IDS_FILE)
+        self._sorted_rows = load(SORTED_ROWS_FILE)
+        self._offsets = load(PAPER_OFFSETS_FILE)
+        blob_path = os.path.join(directory, PAPER_BLOB_FILE)
+        # 크기가 0인 파일은 mmap 할 수 없음
+        self._blob = (np.memmap(blob_path, dtype=np.uint8, mode='r')
+                      if os.path.getsize(blob_path) else np.empty(0, dtype=np.uint8))
+
+    def __len__(self) -> int:
+        return len(self.user_ids)
+
+    def __contains__(self, user_id: str) -> bool:
+        return self.row_of(user_id) is not None
+
+    def row_of(self, user_id: str) -> Optional[int]:
+        """user_id의 행 번호 (없으면 None)"""
+        key = user_id.encode('utf-8')
+        if not len(self._sorted_ids) or len(key) > self._sorted_ids.dtype.itemsize:
+            return None
+        i = int(np.searchsorted(self._sorted_ids, key))
+        if i < len(self._sorted_ids) and self._sorted_ids[i] == key:
+            return int(self._sorted_rows[i])
+        return None
+
+    def papers(self, row: int, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """사용자의 논문 목록 (limit이 주어지면 앞에서부터 limit개)"""
+        chunk = self._blob[self._offsets[row]:self._offsets[row + 1]].tobytes()
+        papers = json.loads(chunk.decode('utf-8')) if chunk else []
+        return papers if limit is None else papers[:limit]
+
+    def paper_count(self, row: int) -> int:
+        return len(self.papers(row))
+
+    def profile_text(self, row: int) -> str:
+        """TF-IDF 입력으로 쓰는 사용자 프로필 문자열 (UserStore.profile_text와 동일)"""
+        parts = []
+        for paper in self.papers(row):
+            parts.append(f"{paper.get('title', '')} {paper.get('abstract', '')} ")
+            parts.append(f"{' '.join(paper.get('equipments') or [])} ")
+            parts.append(f"{' '.join(paper.get('reagents') or [])} ")
+        return "".join(parts)
+
+    def to_records(self) -> Iterable[Dict[str, Any]]:
+        """행 순서를 유지한 from_records 입력 형식 (삭제된 행은 removed=True로 표시)"""
+        for row, user_id in enumerate(self.user_ids):
+            if self.row_of(user_id) == row:
+                yield {'user_id': user_id, 'papers': self.papers(row)}
+            else:
+                yield {'user_id': user_id, 'papers': [], 'removed': True}
+
+    def to_mutable(self) -> UserStore:
+        """수정이 필요할 때 쓰는 메모리 내 UserStore 복사본"""
+        return UserStore.from_records(self.to_records())
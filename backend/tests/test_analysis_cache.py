@@ -0,0 +1,49 @@
+import analyze
+from backend.service.analysis_cache import AnalysisCache, doi_key, title_key
+
+
+def _run(publications, cache, monkeypatch, downloads, calls):
+    def downloader(title):
+        downloads.append(title)
+        return f"full text of {title.lower().replace(' (preprint)', '')}".encode()
+
+    def fake_model(text):
+        calls.append(text)
+        return {"title": text[13:], "doi": None, "equipments": [], "reagents": []}
+
+    monkeypatch.setattr(analyze, "extract_texts", lambda sources: [source.decode() for source in sources])
+    monkeypatch.setattr(analyze, "openai_api", fake_model)
+    stats = {}
+    with analyze.Workspace() as workspace:
+        summaries = analyze.analyze_publications(publications, workspace, max_download=2,
+                                                 downloader=downloader, cache=cache, stats=stats)
+    return summaries, stats
+
+
+def test_keys():
+    assert doi_key("https://doi.org/10.1038/NATURE12345.") == "10.1038/nature12345"
+    assert doi_key("no doi here") is None
+    assert title_key("Mitochondrial  Calcium: a review!") == title_key("mitochondrial calcium - A Review")
+    assert title_key("Short") is None
+
+
+def test_analysis_cache_skips_download_and_model(monkeypatch):
+    cache = AnalysisCache(path=None)
+    pubs = [{"title": "Calcium imaging in cortical neurons"}, {"title": "Patch clamp of hippocampal slices"}]
+    downloads, calls = [], []
+
+    first, stats = _run(pubs, cache, monkeypatch, downloads, calls)
+    assert stats["model_calls"] == 2 and len(downloads) == 2
+
+    # 같은 논문을 다시 분석하면 다운로드도 모델 호출도 없음
+    again, stats = _run(pubs, cache, monkeypatch, downloads, calls)
+    assert again == first and stats["title_hits"] == 2 and len(downloads) == 2 and len(calls) == 2
+
+    # 공저자 프로필: 대소문자만 다른 제목은 제목으로, 제목이 다른 같은 논문은 본문 해시로 적중
+    coauthor = [{"title": "CALCIUM IMAGING in cortical neurons"}, {"title": "Patch clamp of hippocampal slices (preprint)"}]
+    _, stats = _run(coauthor, cache, monkeypatch, downloads, calls)
+    assert (stats["title_hits"], stats["text_hits"], stats["model_calls"]) == (1, 1, 0)
+    assert len(downloads) == 3 and len(calls) == 2
+
+    # 프롬프트/모델 버전이 바뀌면 적중하지 않음
+    assert cache.lookup("other-version", title=pubs[0]["title"]) == (None, None)
@@ -0,0 +1,87 @@
+import math
+
+import numpy as np
+
+from backend.service.lexical_search import reciprocal_rank_fusion
+from backend.vector import emb_search
+from backend.vector.bm25 import Bm25Index, decode_varints, encode_varints, tokenize
+
+
+def test_varint_round_trip():
+    values = [0, 1, 127, 128, 300, 16384, 2 ** 35]
+    buf = bytearray()
+    encode_varints(values, buf)
+    assert decode_varints(bytes(buf)).tolist() == values
+    assert len(buf) < 8 * len(values)
+
+
+def test_tokenize_korean_bigrams_and_reagent_names():
+    assert tokenize("신경세포 분화") == ["신경", "경세", "세포", "분화"]
+    assert tokenize("Anti-CD3 PCR") == ["anti-cd3", "anti", "cd3", "pcr"]
+
+
+def test_scores_match_reference_bm25():
+    papers = [
+        {"title": "PCR of stem cells", "abstract": "stem cell PCR assay", "equipments": ["PCR machine"]},
+        {"title": "Immune response", "abstract": "T cell activation with Anti-CD3", "reagents": ["Anti-CD3"]},
+        {"title": "줄기세포 분화", "abstract": "줄기세포 배양과 PCR", "equipments": []},
+    ]
+    index = Bm25Index()
+    index.add_papers("a", papers[:2])
+    index.add_papers("b", papers[2:])
+
+    docs = [tokenize(index._document_text(p)) for p in papers]
+    avg = sum(map(len, docs)) / len(docs)
+
+    def reference(query, doc):
+        score = 0.0
+        for term in set(tokenize(query)):
+            df = sum(term in d for d in docs)
+            tf = docs[doc].count(term)
+            if tf:
+                idf = math.log(1 + (len(docs) - df + 0.5) / (df + 0.5))
+                score += idf * tf * 2.2 / (tf + 1.2 * (0.25 + 0.75 * len(docs[doc]) / avg))
+        return score
+
+    for query in ["PCR", "줄기세포", "anti-cd3 cell"]:
+        results = index.search(query, top_k=3)
+        assert results
+        for doc, score in results:
+            assert np.isclose(score, reference(query, doc))
+
+    assert [u[0] for u in index.search_users("줄기세포 PCR")][0] == "b"
+    assert [u[0] for u in index.search_users("PCR", filter={"user_id": {"$in": ["a"]}})] == ["a"]
+    # 장비/시약 필터는 표기 차이(대소문자, 띄어쓰기, 하이픈)를 무시
+    assert [u[0] for u in index.search_users("PCR", filter=emb_search.build_filter(equipments=["pcr-machine "]))] == ["a"]
+    assert index.search_users("cell", aggregation="sum")[0][2] == 2
+    index.remove_user("b")
+    assert [u[0] for u in index.search_users("줄기세포")] == []
+
+
+def test_reindexing_a_user_keeps_scores_and_postings_bounded():
+    papers = {
+        "a": [{"title": "T cell activation", "abstract": "cell culture with Anti-CD3", "year": 2020}],
+        "b": [{"title": "PCR of stem cells", "abstract": "stem cell PCR assay", "year": 2022},
+              {"title": "줄기세포 분화", "abstract": "줄기세포 배양과 PCR", "year": 2023}],
+    }
+    index = Bm25Index()
+    for user_id, user_papers in papers.items():
+        index.add_papers(user_id, user_papers)
+    before = index.search_users("cell PCR", aggregation="sum")
+    posting_bytes = index.posting_bytes()
+
+    for _ in range(5):
+        index.remove_user("a")
+        index.add_papers("a", papers["a"])
+    assert len(index) == 3 and index._df["cell"] == 2
+    after = index.search_users("cell PCR", aggregation="sum")
+    assert [u[0] for u in after] == [u[0] for u in before]
+    assert np.allclose([u[1] for u in after], [u[1] for u in before])
+    assert index.posting_bytes() <= 2 * posting_bytes
+    # 압축으로 문서 번호가 바뀌어도 메타데이터 필터는 같은 논문을 가리킴
+    assert [u[0] for u in index.search_users("cell", filter={"year": {"$lt": 2021}})] == ["a"]
+    assert index.search_users("pcr", filter={"user_id": "b"})[0][2] == 2
+
+
+def test_reciprocal_rank_fusion():
+    assert reciprocal_rank_fusion([["a", "b", "c"], ["c", "a"]]) == ["a", "c", "b"]
@@ -0,0 +1,54 @@
+import numpy as np
+
+from backend.vector import emb_search
+from backend.vector.local_store import LocalVectorStore
+from backend.vector.store import QueryMatch
+
+
+class CountingStore(LocalVectorStore):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.fetches = []
+
+    def query(self, **kwargs):
+        self.fetches.append(kwargs["top_k"])
+        return super().query(**kwargs)
+
+
+def test_prolific_author_does_not_crowd_out_other_users(monkeypatch):
+    rng = np.random.default_rng(0)
+    query = rng.normal(size=16)
+    store = CountingStore(dim=16)
+    # 한 사용자의 논문 60편이 질의와 가장 가깝고, 나머지 30명은 한 편씩
+    store.upsert([{"id": f"p{i}", "values": query + 0.1 * rng.normal(size=16), "metadata": {"user_id": "prolific"}}
+                  for i in range(60)])
+    store.upsert([{"id": f"o{i}", "values": query + 2.0 * rng.normal(size=16), "metadata": {"user_id": f"u{i}"}}
+                  for i in range(30)])
+    monkeypatch.setattr(emb_search, "get_index", lambda: store)
+
+    users = emb_search._search_users(query.tolist(), top_k=5)
+    assert len(users) == 5
+    assert users[0][0] == "prolific" and users[0][2] > 1
+    assert len(store.fetches) <= emb_search.SEARCH_MAX_ROUNDS
+
+
+def test_aggregate_users():
+    matches = [QueryMatch("a", 0.9, {"user_id": "x"}), QueryMatch("b", 0.5, {"user_id": "x"}),
+               QueryMatch("c", 0.8, {"user_id": "y"})]
+    assert [u[0] for u in emb_search.aggregate_users(matches, "max")] == ["x", "y"]
+    assert [u[0] for u in emb_search.aggregate_users(matches, "mean")] == ["y", "x"]
+    assert emb_search.aggregate_users(matches, "sum")[0] == ("x", 1.4, 2)
+
+
+def test_build_filter():
+    assert emb_search.build_filter() is None
+    assert emb_search.build_filter(year_from=2022) == {"year": {"$gte": 2022}}
+    assert emb_search.build_filter(year_from=2022, equipments=["flow cytometer", "PCR"], journals=["Cell"]) == {
+        "$and": [
+            {"year": {"$gte": 2022}},
+            {"journal": {"$in": ["Cell"]}},
+            {"$or": [{"equipment_keys": {"$in": ["flowcytometer"]}}, {"equipments": {"$in": ["flow cytometer"]}}]},
+            {"$or": [{"equipment_keys": {"$in": ["pcr"]}}, {"equipments": {"$in": ["PCR"]}}]},
+        ]
+    }
+    assert emb_search.build_filter(reagents=["  "]) is None
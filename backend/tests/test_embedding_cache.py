@@ -0,0 +1,53 @@
+import asyncio
+import time
+
+from backend.vector.embedding_cache import EmbeddingCache
+
+
+def test_lru_eviction_and_counters():
+    cache = EmbeddingCache(path=None, max_entries=2)
+    cache.put("m", "세포", [1.0, 0.0])
+    cache.put("m", "면역", [0.0, 1.0])
+    assert cache.get("m", "  세포 ") == [1.0, 0.0]  # 공백 정규화
+    cache.put("m", "DNA", [0.5, 0.5])  # 가장 오래 안 쓴 '면역'이 밀려남
+
+    assert cache.get("m", "면역") is None
+    assert cache.get("m", "dna") == [0.5, 0.5]
+    assert cache.get("other-model", "세포") is None
+    stats = cache.stats()
+    assert (stats["memory_hits"], stats["misses"], stats["memory_entries"]) == (2, 2, 2)
+
+
+def test_disk_tier_survives_restart(tmp_path):
+    path = str(tmp_path / "cache.sqlite3")
+    EmbeddingCache(path=path).put("m", "단백질", [0.25, 0.75])
+
+    cache = EmbeddingCache(path=path)
+    assert cache.get("m", "단백질") == [0.25, 0.75]
+    assert cache.get("m", "단백질") == [0.25, 0.75]
+    assert cache.stats()["disk_hits"] == 1 and cache.stats()["memory_hits"] == 1
+
+
+def test_ttl_expiry(tmp_path):
+    cache = EmbeddingCache(path=str(tmp_path / "cache.sqlite3"), ttl=-1)
+    cache.put("m", "세포", [1.0])
+    assert cache.get("m", "세포") is None
+
+
+def test_async_access_and_batched_last_used_writes(tmp_path):
+    path = str(tmp_path / "cache.sqlite3")
+    writer = EmbeddingCache(path=path)
+    asyncio.run(writer.put_many_async("m", [("세포", [1.0]), ("면역", [2.0])]))
+
+    cache = EmbeddingCache(path=path, touch_batch=2)
+    assert asyncio.run(cache.get_many_async("m", ["세포", "없음"])) == [[1.0], None]
+    assert asyncio.run(cache.get_many_async("m", ["세포"])) == [[1.0]]  # 이제 메모리에서
+    assert cache.stats()["disk_hits"] == 1 and cache.stats()["memory_hits"] == 1
+
+    def last_used(text):
+        return cache._db.execute("SELECT last_used FROM embeddings WHERE text = ?", (text,)).fetchone()[0]
+
+    written = last_used("세포")
+    time.sleep(0.01)
+    cache.get("m", "면역")  # 2단 적중이 touch_batch개 모이면 한 번에 기록
+    assert last_used("세포") > written and last_used("면역") > written
@@ -0,0 +1,47 @@
+from backend.service.equipment_index import EquipmentIndex, TermDictionary, term_key
+
+SYNONYMS = {
+    "equipments": {"유세포분석기": ["flow cytometer", "FACS"], "PCR머신": ["PCR machine", "thermal cycler"]},
+    "reagents": {"항체": ["antibody", "antibodies"]},
+}
+
+
+def test_dictionary_normalizes_variants():
+    dictionary = TermDictionary(SYNONYMS)
+    assert term_key(" Flow-Cytometer ") == term_key("flowcytometer")
+    assert dictionary.canonical("equipments", "Flow Cytometer") == "유세포분석기"
+    assert dictionary.canonical("equipments", "thermal-cycler") == "PCR머신"
+    assert dictionary.canonical("equipments", " 원심분리기 ") == "원심분리기"
+    assert dictionary.variants("reagents", "ANTIBODY")[:3] == ["항체", "antibody", "antibodies"]
+
+
+def test_users_with_intersects_and_ranks_by_counts():
+    index = EquipmentIndex(TermDictionary(SYNONYMS))
+    index.add_papers("a", [{"equipments": ["FACS"], "reagents": ["항체"]},
+                           {"equipments": ["유세포분석기", "flow cytometer"], "reagents": ["antibody"]}])
+    index.add_papers("b", [{"equipments": ["flow cytometer", "PCR machine"], "reagents": ["antibodies"]}])
+    index.add_papers("c", [{"equipments": ["PCR머신"], "reagents": []}])
+
+    results = index.users_with(equipments=["flow cytometer"], reagents=["항체"])
+    assert [r["user_id"] for r in results] == ["a", "b"]
+    assert results[0]["counts"] == {"유세포분석기": 2, "항체": 2}
+
+    assert [r["user_id"] for r in index.users_with(equipments=["thermal cycler"])] == ["b", "c"]
+    assert index.users_with(equipments=["PCR머신", "FACS"], reagents=["antibody"]) == \
+        [{"user_id": "b", "score": 3, "counts": {"PCR머신": 1, "유세포분석기": 1, "항체": 1}}]
+    assert index.users_with(equipments=["HPLC"]) == []
+
+    index.remove_user("b")
+    assert [r["user_id"] for r in index.users_with(equipments=["PCR machine"])] == ["c"]
+
+
+def test_db_query_matches_term_keys_not_raw_names():
+    import backend.models.user, backend.models.current_study, backend.models.interest, backend.models.tool  # noqa: F401
+    from sqlalchemy.dialects import postgresql
+    from backend.crud.paper import users_by_terms_query
+
+    compiled = users_by_terms_query([["Flow Cytometer", "FACS", "flow-cytometer"]], [["Anti body"]]).compile(
+        dialect=postgresql.dialect())
+    assert "papers.equipment_keys &&" in str(compiled) and "papers.reagent_keys &&" in str(compiled)
+    assert "papers.equipments &&" not in str(compiled)
+    assert [compiled.params[f"param_{i}"] for i in (1, 2, 3)] == ["flowcytometer", "facs", "antibody"]
@@ -0,0 +1,89 @@
+import time
+
+from backend.service.job_queue import JobQueue
+
+
+def test_job_lifecycle_with_retry():
+    queue = JobQueue(path=None)
+    job_id = queue.enqueue("create_profile", {"user_id": "u1", "max_papers": 3}, max_attempts=2)
+    assert queue.get(job_id)["status"] == "queued"
+
+    job = queue.claim("w1")
+    assert job["id"] == job_id and job["payload"]["user_id"] == "u1" and job["attempts"] == 1
+    assert queue.claim("w2") is None  # 이미 실행 중
+
+    queue.progress(job_id, "w1", "embedding", 0.6)
+    assert (queue.get(job_id)["stage"], queue.get(job_id)["progress"]) == ("embedding", 0.6)
+
+    queue.fail(job_id, "w1", "rate limited", retry_delay=0)
+    assert queue.get(job_id)["status"] == "queued" and queue.get(job_id)["error"] == "rate limited"
+    assert queue.claim("w2")["attempts"] == 2
+    queue.complete(job_id, "w2", {"status": "success", "paper_count": 3})
+    job = queue.get(job_id)
+    assert job["status"] == "succeeded" and job["result"]["paper_count"] == 3 and job["error"] is None
+
+
+def test_attempts_exhausted_and_permanent_failures():
+    queue = JobQueue(path=None)
+    retried = queue.enqueue("create_profile", {}, max_attempts=1)
+    queue.claim("w1")
+    queue.fail(retried, "w1", "boom", retry_delay=0)
+    assert queue.get(retried)["status"] == "failed"
+
+    permanent = queue.enqueue("create_profile", {}, max_attempts=3)
+    queue.claim("w1")
+    queue.fail(permanent, "w1", "User not found", retry=False)
+    assert queue.get(permanent)["status"] == "failed"
+    assert queue.counts() == {"failed": 2}
+
+
+def test_expired_lease_is_reclaimed(tmp_path):
+    path = str(tmp_path / "jobs.sqlite3")
+    job_id = JobQueue(path).enqueue("create_profile", {"user_id": "u1"})
+    assert JobQueue(path).claim("dead-worker", lease=0.05)["id"] == job_id
+
+    other = JobQueue(path)  # 다른 프로세스의 워커
+    assert other.claim("w2") is None
+    time.sleep(0.1)
+    job = other.claim("w2")
+    assert job["id"] == job_id and job["locked_by"] == "w2" and job["attempts"] == 2
+
+
+def test_jobs_with_same_key_run_one_at_a_time():
+    queue = JobQueue(path=None)
+    first = queue.enqueue("create_profile", {"user_id": "u1"}, key="u1")
+    second = queue.enqueue("create_profile", {"user_id": "u1"}, key="u1")
+    other = queue.enqueue("create_profile", {"user_id": "u2"}, key="u2")
+
+    assert queue.claim("w1")["id"] == first
+    assert queue.claim("w2")["id"] == other  # u1의 두 번째 작업은 첫 작업이 끝날 때까지 대기
+    assert queue.claim("w3") is None
+    queue.complete(first, "w1")
+    assert queue.claim("w3")["id"] == second
+
+
+def test_only_the_claiming_worker_can_record_results():
+    queue = JobQueue(path=None)
+    job_id = queue.enqueue("create_profile", {"user_id": "u1"})
+    queue.claim("slow", lease=0.01)
+    time.sleep(0.02)
+    assert queue.claim("w2")["locked_by"] == "w2"
+
+    # lease가 끝난 워커가 늦게 끝나도 새 워커의 작업을 덮어쓰지 않음
+    assert not queue.progress(job_id, "slow", "storing", 0.75)
+    assert not queue.complete(job_id, "slow", {"status": "success"})
+    assert not queue.fail(job_id, "slow", "boom")
+    assert queue.get(job_id)["status"] == "running" and queue.get(job_id)["stage"] == "started"
+    assert queue.complete(job_id, "w2", {"status": "success"})
+    assert queue.get(job_id)["status"] == "succeeded"
+
+
+def test_job_that_keeps_crashing_its_worker_stops_after_max_attempts():
+    queue = JobQueue(path=None)
+    job_id = queue.enqueue("create_profile", {"user_id": "u1"}, max_attempts=2)
+    assert queue.claim("w1", lease=0.01)["attempts"] == 1
+    time.sleep(0.02)
+    assert queue.claim("w2", lease=0.01)["attempts"] == 2
+    time.sleep(0.02)
+    assert queue.claim("w3") is None
+    assert queue.get(job_id)["status"] == "failed"
@@ -0,0 +1,158 @@
+import numpy as np
+
+from backend.vector.local_store import LocalVectorStore
+
+
+def _clustered(n, dim, n_clusters=20, seed=0):
+    """군집 구조가 있는 합성 임베딩 (실제 문서 임베딩처럼 몇몇 주제 주위에 모임)"""
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(n_clusters, dim))
+    return (centers[rng.integers(0, n_clusters, n)] + 0.5 * rng.normal(size=(n, dim))).astype(np.float32)
+
+
+def _vectors(values, offset=0):
+    return [
+        {"id": f"v{offset + i}", "values": v, "metadata": {"user_id": f"u{(offset + i) % 7}", "year": 2000 + i % 20}}
+        for i, v in enumerate(values)
+    ]
+
+
+def _brute_force(values, query, k):
+    normed = values / np.linalg.norm(values, axis=1, keepdims=True)
+    scores = normed @ (query / np.linalg.norm(query))
+    return [f"v{i}" for i in np.argsort(-scores, kind="stable")[:k]]
+
+
+def test_exact_before_training():
+    values = _clustered(500, 16)
+    store = LocalVectorStore(dim=16)
+    store.upsert(_vectors(values))
+
+    result = store.query(vector=values[3], top_k=5)
+    assert [m.id for m in result.matches] == _brute_force(values, values[3], 5)
+    assert result.matches[0].score > 0.999
+    assert result.matches[0].metadata["user_id"] == "u3"
+
+
+def test_ivf_recall_after_training():
+    values = _clustered(6000, 32)
+    store = LocalVectorStore(dim=32, nprobe=8, min_train_size=4096)
+    store.upsert(_vectors(values))
+    assert store.describe_index_stats()["ivf_lists"] > 0
+
+    queries = _clustered(50, 32, seed=1)
+    hits = sum(len(set(m.id for m in store.query(vector=q, top_k=10).matches) & set(_brute_force(values, q, 10)))
+               for q in queries)
+    assert hits / (10 * len(queries)) >= 0.9
+
+
+def test_upsert_replaces_and_delete_removes():
+    values = _clustered(100, 8)
+    store = LocalVectorStore(dim=8)
+    store.upsert(_vectors(values))
+
+    store.upsert([{"id": "v0", "values": values[50], "metadata": {"user_id": "new"}}])
+    assert len(store) == 100
+    assert store.fetch(["v0"])["v0"].metadata == {"user_id": "new"}
+
+    store.delete(["v50"])
+    ids = [m.id for m in store.query(vector=values[50], top_k=3).matches]
+    assert ids[0] == "v0" and "v50" not in ids
+    assert store.query(id="v50").matches == []
+
+
+def test_metadata_filter():
+    values = _clustered(5000, 16)
+    store = LocalVectorStore(dim=16, min_train_size=1000)
+    store.upsert(_vectors(values))
+
+    result = store.query(vector=values[0], top_k=20, filter={"user_id": {"$in": ["u1", "u2"]}, "year": {"$gte": 2010}})
+    assert len(result.matches) == 20
+    assert all(m.metadata["user_id"] in ("u1", "u2") and m.metadata["year"] >= 2010 for m in result.matches)
+
+    # 필터 통과 벡터가 적어도 IVF 탐색이 아닌 전수 비교로 정확히 찾음
+    result = store.query(vector=values[0], top_k=5, filter={"$and": [{"user_id": "u0"}, {"year": 2000}]})
+    assert all(m.metadata["user_id"] == "u0" and m.metadata["year"] == 2000 for m in result.matches)
+    assert len(result.matches) == 5
+
+
+def test_flush_and_reload_across_instances(tmp_path):
+    values = _clustered(3000, 16)
+    writer = LocalVectorStore(dim=16, path=str(tmp_path), min_train_size=2000)
+    writer.upsert(_vectors(values))
+    writer.flush()
+    assert isinstance(writer._vectors, np.memmap)
+
+    reader = LocalVectorStore(dim=16, path=str(tmp_path), reload_interval=0)
+    assert len(reader) == 3000
+    assert [m.id for m in reader.query(id="v7", top_k=5).matches] == \
+        [m.id for m in writer.query(id="v7", top_k=5).matches]
+
+    # 쓰기 전에는 매핑된 배열을 그대로 쓰고, 첫 쓰기에서 복사
+    writer.upsert(_vectors(values[:10], offset=3000))
+    writer.delete(["v0"])
+    writer.flush()
+    assert len(reader) == 3000
+    reader.query(id="v1")
+    assert len(reader) == 3009 and reader.fetch(["v0"]) == {}
+
+
+def test_concurrent_writers_do_not_drop_each_others_vectors(tmp_path):
+    a = LocalVectorStore(dim=4, path=str(tmp_path))
+    b = LocalVectorStore(dim=4, path=str(tmp_path))
+    a.upsert([{"id": "a1", "values": [1, 0, 0, 0]}])
+    a.flush()
+    b.upsert([{"id": "b1", "values": [0, 1, 0, 0]}])
+    b.delete(["a0"])
+    b.flush()
+    assert sorted(LocalVectorStore(dim=4, path=str(tmp_path)).list_ids()) == ["a1", "b1"]
+
+    # 저장하지 않은 변경이 있어도 refresh()는 다른 프로세스의 세대 위에 다시 적용해 보여 줌
+    a.upsert([{"id": "a2", "values": [0, 0, 1, 0]}])
+    b.upsert([{"id": "b2", "values": [0, 0, 0, 1]}])
+    b.flush()
+    a.refresh()
+    assert sorted(a.list_ids()) == ["a1", "a2", "b1", "b2"]
+    a.flush()
+    assert sorted(LocalVectorStore(dim=4, path=str(tmp_path)).list_ids()) == ["a1", "a2", "b1", "b2"]
+
+
+def test_metadata_index_matches_brute_force_filter():
+    rng = np.random.default_rng(3)
+    equipments = ["flow cytometer", "confocal", "PCR", "HPLC"]
+    records = [
+        {"year": int(rng.integers(2010, 2025)), "journal": str(rng.choice(["Cell", "Nature", "Science"])),
+         "equipments": list(rng.choice(equipments, size=int(rng.integers(0, 3)), replace=False))}
+        for _ in range(400)
+    ]
+    store = LocalVectorStore(dim=4)
+    store.upsert([{"id": str(i), "values": rng.normal(size=4), "metadata": m} for i, m in enumerate(records)])
+
+    # (필터, 같은 뜻의 파이썬 조건) - 비트맵 인덱스 결과를 전수 비교로 검증
+    cases = [
+        ({"year": {"$gte": 2022}},
+         lambda m: m["year"] >= 2022),
+        ({"equipments": {"$in": ["flow cytometer"]}, "journal": {"$ne": "Cell"}},
+         lambda m: "flow cytometer" in m["equipments"] and m["journal"] != "Cell"),
+        ({"$or": [{"year": {"$lt": 2012}}, {"equipments": "PCR"}]},
+         lambda m: m["year"] < 2012 or "PCR" in m["equipments"]),
+        ({"$and": [{"equipments": {"$in": ["confocal"]}}, {"equipments": {"$in": ["HPLC"]}}],
+          "journal": {"$nin": ["Science"]}},
+         lambda m: {"confocal", "HPLC"} <= set(m["equipments"]) and m["journal"] != "Science"),
+    ]
+    for f, predicate in cases:
+        expected = [predicate(m) for m in records]
+        assert any(expected) and not all(expected)
+        assert store._filter_mask(f).tolist() == expected
+
+
+def test_query_many_matches_single_queries():
+    values = _clustered(5000, 16)
+    store = LocalVectorStore(dim=16, min_train_size=1000)
+    store.upsert(_vectors(values))
+    queries = _clustered(10, 16, seed=2)
+
+    for search_filter in (None, {"user_id": "u3"}):
+        batched = store.query_many(queries, top_k=5, filter=search_filter)
+        single = [store.query(vector=q, top_k=5, filter=search_filter) for q in queries]
+        assert [[m.id for m in r.matches] for r in batched] == [[m.id for m in r.matches] for r in single]
@@ -0,0 +1,165 @@
+import asyncio
+import threading
+import time
+from types import SimpleNamespace
+
+import httpx
+import openai
+import pytest
+
+from backend.vector.openai_gateway import BACKGROUND, INTERACTIVE, OpenAIGateway
+
+
+def rate_limit_error():
+    response = httpx.Response(429, headers={"retry-after-ms": "10"},
+                              request=httpx.Request("POST", "https://api.openai.com/v1/embeddings"))
+    return openai.RateLimitError("rate limited", response=response, body=None)
+
+
+def test_requests_per_minute_limit():
+    # 분당 1200회 = 초당 20회, 버스트 1회
+    gateway = OpenAIGateway(limit=(1200, 10**9), path=None, burst=0.05)
+    start = time.monotonic()
+    for _ in range(6):
+        gateway.request(lambda: "ok", "m", 1)
+    assert time.monotonic() - start >= 0.2
+    assert gateway.stats()["requests"] == 6
+
+
+def test_retries_rate_limit_then_succeeds():
+    gateway = OpenAIGateway(limit=(60_000, 10**9), path=None, retry_delay=0.01)
+    calls = []
+
+    def send():
+        calls.append(1)
+        if len(calls) < 3:
+            raise rate_limit_error()
+        return "ok"
+
+    assert gateway.request(send, "m", 1) == "ok"
+    stats = gateway.stats()
+    assert len(calls) == 3 and stats["rate_limited"] == 2
+    assert stats["scopes"]["m"]["scale"] < 1  # 429를 받으면 속도를 줄임
+
+    # 재시도해도 소용없는 오류는 바로 올림
+    with pytest.raises(ValueError):
+        gateway.request(lambda: (_ for _ in ()).throw(ValueError("bad request")), "m", 1)
+    # 재시도를 다 쓰면 마지막 오류를 올림 (조용히 버리지 않음)
+    gateway = OpenAIGateway(limit=(60_000, 10**9), path=None, retry_delay=0.001, max_retries=2)
+    with pytest.raises(openai.RateLimitError):
+        gateway.request(lambda: (_ for _ in ()).throw(rate_limit_error()), "m", 1)
+
+
+def test_interactive_requests_go_before_queued_background():
+    gateway = OpenAIGateway(limit=(1200, 10**9), path=None, burst=0.05)
+    order = []
+
+    def worker(name, priority):
+        gateway.request(lambda: order.append(name), "m", 1, priority)
+
+    threads = [threading.Thread(target=worker, args=(f"b{i}", BACKGROUND)) for i in range(6)]
+    for thread in threads:
+        thread.start()
+    time.sleep(0.06)
+    interactive = threading.Thread(target=worker, args=("i", INTERACTIVE))
+    interactive.start()
+    for thread in threads + [interactive]:
+        thread.join()
+    assert order.index("i") <= 3
+
+
+def test_identical_requests_are_coalesced():
+    gateway = OpenAIGateway(limit=(60_000, 10**9), path=None)
+    calls = []
+
+    class Embeddings:
+        async def create(self, model, input):
+            calls.append(input)
+            await asyncio.sleep(0.05)
+            return SimpleNamespace(data=[SimpleNamespace(index=0, embedding=[1.0])])
+
+    client = SimpleNamespace(embeddings=Embeddings())
+
+    async def main():
+        return await asyncio.gather(*[gateway.embed_async(client, "text-embedding-3-small", q)
+                                      for q in ["pcr", "pcr", "pcr", "elisa"]])
+
+    responses = asyncio.run(main())
+    assert sorted(calls) == ["elisa", "pcr"]
+    assert responses[0] is responses[1] is responses[2]
+    assert gateway.stats()["coalesced"] == 2
+
+
+class RecordingClient:
+    """임베딩과 채팅 호출 순서를 기록하는 OpenAI 대역 (같은 API 키)"""
+
+    def __init__(self, order):
+        self.api_key = "sk-test"
+        self.embeddings = SimpleNamespace(create=lambda model, input: order.append(input))
+        self.chat = SimpleNamespace(completions=SimpleNamespace(
+            create=lambda **params: order.append(params["messages"][0]["content"])))
+
+
+def run_background_then_interactive(background_gateway, interactive_gateway, order):
+    """BACKGROUND 임베딩 6개를 쌓아 둔 뒤 INTERACTIVE 채팅 하나를 보냄 (모델이 다름)"""
+    client = RecordingClient(order)
+    threads = [threading.Thread(target=background_gateway.embed,
+                                args=(client, "text-embedding-3-small", f"b{i}", BACKGROUND)) for i in range(6)]
+    for thread in threads:
+        thread.start()
+    time.sleep(0.06)
+    interactive = threading.Thread(target=lambda: interactive_gateway.chat(
+        client, INTERACTIVE, model="gpt-4o-mini", messages=[{"role": "user", "content": "i"}]))
+    interactive.start()
+    for thread in threads + [interactive]:
+        thread.join()
+
+
+def test_priority_applies_across_models_sharing_an_api_key():
+    gateway = OpenAIGateway(limit=(1200, 10**9), path=None, burst=0.05)
+    order = []
+    run_background_then_interactive(gateway, gateway, order)
+    assert order.index("i") <= 3
+    assert list(gateway.stats()["scopes"].values())[0]["waiting"] == 0
+
+
+def test_processes_sharing_a_file_share_one_limit_and_queue(tmp_path):
+    path = str(tmp_path / "gateway.sqlite3")
+    worker = OpenAIGateway(limit=(1200, 10**9), path=path, burst=0.05)
+    web = OpenAIGateway(limit=(1200, 10**9), path=path, burst=0.05)  # 다른 프로세스 대신
+
+    # 두 게이트웨이를 합쳐 초당 20회
+    start = time.monotonic()
+    for i in range(6):
+        (worker, web)[i % 2].request(lambda: "ok", "key", 1)
+    assert time.monotonic() - start >= 0.2
+
+    # 워커에 쌓인 BACKGROUND 요청보다 웹의 INTERACTIVE 요청이 먼저
+    order = []
+    run_background_then_interactive(worker, web, order)
+    assert order.index("i") <= 3
+
+
+def test_cancelled_owner_does_not_cancel_coalesced_waiters():
+    gateway = OpenAIGateway(limit=(60_000, 10**9), path=None)
+    calls = []
+
+    class Embeddings:
+        async def create(self, model, input):
+            calls.append(input)
+            await asyncio.sleep(0.05)
+            return SimpleNamespace(data=[SimpleNamespace(index=0, embedding=[1.0])])
+
+    client = SimpleNamespace(embeddings=Embeddings())
+
+    async def main():
+        owner = asyncio.ensure_future(
+            asyncio.wait_for(gateway.embed_async(client, "text-embedding-3-small", "pcr"), 0.01))
+        await asyncio.sleep(0)
+        waiter = asyncio.ensure_future(gateway.embed_async(client, "text-embedding-3-small", "pcr"))
+        with pytest.raises(asyncio.TimeoutError):
+            await owner
+        return await waiter
+
+    assert asyncio.run(main()).data[0].embedding == [1.0]
+    assert calls == ["pcr"] and gateway.stats()["coalesced"] == 1
@@ -0,0 +1,60 @@
+import time
+
+from analyze import Workspace, download_papers
+
+
+def _downloader(delays, available, calls):
+    def download(title):
+        calls.append(title)
+        time.sleep(delays.get(title, 0.01))
+        if title in available:
+            return b'%PDF-1.4 ' + title.encode()
+        return None
+    return download
+
+
+def test_stops_after_max_download_and_keeps_title_order():
+    titles = [f"paper {i}" for i in range(20)]
+    calls = []
+    with Workspace() as workspace:
+        papers = download_papers(titles, workspace, max_download=3, workers=4,
+                                 downloader=_downloader({}, set(titles[1::2]), calls))
+    assert [data[9:].decode() for _, data in papers] == ["paper 1", "paper 3", "paper 5"]
+    assert len(calls) < len(titles)
+
+
+def test_slow_downloads_time_out_and_run_concurrently():
+    titles = ["hang", "a", "b", "c"]
+    calls = []
+    downloader = _downloader({"hang": 2.0, "a": 0.2, "b": 0.2, "c": 0.2}, set(titles), calls)
+    start = time.monotonic()
+    with Workspace() as workspace:
+        papers = download_papers(titles, workspace, max_download=3, workers=4, timeout=0.5, downloader=downloader)
+    assert time.monotonic() - start < 1.0
+    assert [i for i, _ in papers] == [1, 2, 3]
+
+
+def test_hung_downloads_do_not_use_up_queued_titles_deadlines():
+    # 두 다운로드가 멈춰도 뒤에 기다리던 논문은 새 스레드로 시작해 자기 시간 안에 받음
+    titles = ["hang 1", "hang 2", "a", "b"]
+    calls = []
+    downloader = _downloader({"hang 1": 2.0, "hang 2": 2.0, "a": 0.2, "b": 0.2}, set(titles), calls)
+    start = time.monotonic()
+    with Workspace() as workspace:
+        papers = download_papers(titles, workspace, max_download=2, workers=2, timeout=0.3, downloader=downloader)
+    assert time.monotonic() - start < 1.0
+    assert [i for i, _ in papers] == [2, 3]
+
+
+def test_workspaces_are_isolated_and_spill_large_files(tmp_path):
+    first, second = Workspace(parent=str(tmp_path), memory_limit=100), Workspace(parent=str(tmp_path), memory_limit=100)
+    first.put(0, b'small')
+    second.put(0, b'x' * 1000)
+    assert first.source(0) == b'small' and first.spilled == 0 and len(list(tmp_path.iterdir())) == 1
+
+    path = second.source(0)
+    assert second.spilled == 1 and open(path, 'rb').read() == b'x' * 1000
+    first.close()
+    assert open(path, 'rb').read() == b'x' * 1000
+    second.close()
+    assert not list(tmp_path.iterdir())
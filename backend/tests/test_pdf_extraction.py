@@ -0,0 +1,49 @@
+import io
+
+import PyPDF2
+
+import analyze
+from analyze import extract_texts, find_sections, select_sections
+
+PAPER = """Mitochondrial calcium in cortical neurons
+J. Kim, S. Lee
+Journal of Neuroscience 2021 doi:10.1000/x
+Abstract
+We studied calcium uptake.
+1. Introduction
+Calcium matters a lot. The methods: are below.
+2. Materials and Methods
+Cells were stained with MitoTracker and imaged on a confocal microscope.
+3. Results
+Uptake increased.
+References
+[1] Someone 2020.
+"""
+
+
+def test_find_sections():
+    assert [kind for kind, _ in find_sections(PAPER)] == ["abstract", "introduction", "methods", "results", "references"]
+
+
+def test_select_sections_keeps_front_matter_abstract_and_methods():
+    text = select_sections(PAPER)
+    assert text.startswith("Mitochondrial calcium")
+    assert "We studied calcium uptake." in text and "MitoTracker" in text
+    assert "Calcium matters" not in text and "Uptake increased" not in text and "Someone" not in text
+    assert len(select_sections(PAPER, max_chars=50)) == 50
+
+
+def test_select_sections_falls_back_to_prefix_without_methods():
+    text = "Title\nAbstract\nShort note without a methods heading. " * 10
+    assert select_sections(text, max_chars=100) == text[:100]
+
+
+def test_extract_texts_returns_none_for_unreadable_pdfs():
+    writer = PyPDF2.PdfWriter()
+    writer.add_blank_page(width=200, height=200)
+    buffer = io.BytesIO()
+    writer.write(buffer)
+
+    assert extract_texts([b"not a pdf", buffer.getvalue()]) == [None, ""]
+    # 작업 프로세스는 fork가 아니라 spawn으로 시작 (부모의 클라이언트/스레드를 물려받지 않음)
+    assert analyze._pdf_pool._mp_context.get_start_method() == "spawn"
@@ -0,0 +1,116 @@
+import asyncio
+from types import SimpleNamespace
+
+import numpy as np
+
+from backend.service import profile_service
+from backend.service.profile_service import ProfileService
+from backend.service.recommender import Recommender, RecommenderUpdater
+from backend.vector.local_store import LocalVectorStore
+from backend.vector.profile_vectors import ProfileVectors, profile_vector_id
+
+
+class FakeEmbeddings:
+    def __init__(self):
+        self.calls = []
+
+    def create(self, input, model):
+        self.calls.append(len(input))
+        # 순서를 뒤집어 돌려줘도 index로 맞춰야 함
+        data = [SimpleNamespace(index=i, embedding=[float(len(text)), 1.0, float(i)]) for i, text in enumerate(input)]
+        return SimpleNamespace(data=data[::-1])
+
+
+class CountingStore(LocalVectorStore):
+    upserts = 0
+
+    def upsert(self, vectors, **kwargs):
+        CountingStore.upserts += 1
+        return super().upsert(vectors, **kwargs)
+
+
+def test_batched_embeddings_and_upserts(monkeypatch):
+    embeddings = FakeEmbeddings()
+    monkeypatch.setenv("OPENAI_API_KEY", "test")
+    monkeypatch.setattr(profile_service, "get_openai_client", lambda: SimpleNamespace(embeddings=embeddings))
+    monkeypatch.setattr(profile_service, "EMBEDDING_BATCH_SIZE", 100)
+    monkeypatch.setattr(profile_service, "UPSERT_BATCH_SIZE", 100)
+
+    service = ProfileService.__new__(ProfileService)
+    service.index = CountingStore(dim=3)
+    service.profiles = ProfileVectors(LocalVectorStore(dim=3))
+    service.pinecone_initialized = True
+    contents = [{"title": "t" * i, "abstract": "", "equipments": ["PCR"], "reagents": [], "year": "2020"}
+                for i in range(150)]
+
+    vector_ids, profile_id = service._create_vector_embeddings(contents, "u1")
+    assert embeddings.calls == [100, 50] and CountingStore.upserts == 2
+    assert profile_id == profile_vector_id("u1")
+    assert service.profiles.store.fetch([profile_id])[profile_id].metadata["paper_count"] == 150
+    stored = service.index.fetch(vector_ids)
+    for i, vector_id in enumerate(vector_ids):
+        assert stored[vector_id].metadata["title"] == "t" * i
+        assert stored[vector_id].metadata["year"] == 2020 and stored[vector_id].metadata["user_id"] == "u1"
+        expected = np.array([len(ProfileService._embedding_text(contents[i])), 1.0, i % 100])
+        assert np.allclose(stored[vector_id].values, expected / np.linalg.norm(expected), atol=1e-5)
+
+
+def test_retried_profile_creation_does_not_duplicate_papers(monkeypatch, tmp_path):
+    monkeypatch.setenv("OPENAI_API_KEY", "test")
+    monkeypatch.setattr(profile_service, "get_openai_client", lambda: SimpleNamespace(embeddings=FakeEmbeddings()))
+    contents = [{"title": f"paper {i}", "abstract": "", "equipments": [], "reagents": [], "year": 2020,
+                 "journal": "J", "authors": ["A"], "doi": f"10.1/{i}"} for i in range(3)]
+    monkeypatch.setattr(profile_service, "analyze_author", lambda *args, **kwargs: contents)
+    monkeypatch.setattr(profile_service, "get_analysis_cache", lambda: None)
+
+    class FakeSession:
+        """커밋한 행만 남기는 DB 대역"""
+
+        def __init__(self):
+            self.rows, self.pending = [], []
+
+        async def commit(self):
+            self.rows, self.pending = self.rows + self.pending, []
+
+        async def rollback(self):
+            self.pending = []
+
+    async def get_user(db, user_id):
+        return SimpleNamespace(google_scholar_id="scholar", vector_embedding_id=None)
+
+    async def get_papers_by_user(db, user_id):
+        return list(db.rows)
+
+    async def add_papers(db, papers):
+        db.pending += [SimpleNamespace(**paper.dict()) for paper in papers]
+
+    failures = [RuntimeError("connection reset")]  # 첫 시도는 논문을 커밋한 뒤 실패
+
+    async def update_user(db, user_id, update):
+        if failures:
+            raise failures.pop()
+
+    recommender = Recommender(top_k=5, snapshot_dir=str(tmp_path))
+    updater = RecommenderUpdater(recommender, delay=0)
+    monkeypatch.setattr(profile_service, "get_user", get_user)
+    monkeypatch.setattr(profile_service, "get_papers_by_user", get_papers_by_user)
+    monkeypatch.setattr(profile_service, "add_papers", add_papers)
+    monkeypatch.setattr(profile_service, "update_user", update_user)
+    monkeypatch.setattr(profile_service, "get_recommender_updater", lambda: updater)
+
+    service = ProfileService.__new__(ProfileService)
+    service.index = LocalVectorStore(dim=3)
+    service.profiles = ProfileVectors(LocalVectorStore(dim=3))
+    service.pinecone_initialized = True
+    db = FakeSession()
+
+    assert asyncio.run(service.create_profile("u1", 3, db))["status"] == "error"
+    # 재시도는 이미 저장된 논문을 다시 넣지 않고, 첫 시도가 못 한 추천기 반영을 마저 함
+    assert asyncio.run(service.create_profile("u1", 3, db))["status"] == "success"
+    assert asyncio.run(service.create_profile("u1", 3, db))["status"] == "success"
+
+    assert sorted(row.doi for row in db.rows) == ["10.1/0", "10.1/1", "10.1/2"]
+    assert service.index.describe_index_stats()["total_vector_count"] == 3
+    profile_id = profile_vector_id("u1")
+    assert service.profiles.store.fetch([profile_id])[profile_id].metadata["paper_count"] == 3
+    assert [p["doi"] for p in recommender.store.papers(recommender.store.row_of("u1"))] == ["10.1/0", "10.1/1", "10.1/2"]
@@ -0,0 +1,47 @@
+import numpy as np
+
+from backend.vector.local_store import LocalVectorStore
+from backend.vector.profile_vectors import ProfileVectors, paper_weight, profile_vector_id
+
+
+def _unit(v):
+    v = np.asarray(v, dtype=np.float64)
+    return v / np.linalg.norm(v)
+
+
+def test_weighted_centroid_and_incremental_updates():
+    profiles = ProfileVectors(LocalVectorStore(dim=3), half_life=5)
+    old, new = [1.0, 0.0, 0.0], [0.0, 1.0, 0.0]
+    assert paper_weight(2020, 5) == 2 * paper_weight(2015, 5) == 2 * paper_weight("2015", 5)
+
+    profiles.add_papers("u1", [(old, 2015), (new, 2020)])
+    stored = profiles.store.fetch([profile_vector_id("u1")])[profile_vector_id("u1")]
+    assert np.allclose(stored.values, _unit([1.0, 2.0, 0.0]), atol=1e-6)
+    assert stored.metadata["paper_count"] == 2
+
+    # 논문을 더했다가 빼면 원래 중심으로 돌아옴
+    profiles.add_papers("u1", [([0.0, 0.0, 1.0], 2024)])
+    profiles.remove_papers("u1", [([0.0, 0.0, 1.0], 2024)])
+    stored = profiles.store.fetch([profile_vector_id("u1")])[profile_vector_id("u1")]
+    assert np.allclose(stored.values, _unit([1.0, 2.0, 0.0]), atol=1e-5)
+
+    profiles.remove_papers("u1", [(old, 2015), (new, 2020)])
+    assert profiles.store.fetch([profile_vector_id("u1")]) == {}
+
+
+def test_search_similar_and_rebuild():
+    rng = np.random.default_rng(0)
+    papers = LocalVectorStore(dim=8)
+    topics = rng.normal(size=(3, 8))
+    records = []
+    for u in range(6):
+        for p in range(4):
+            vector = topics[u % 3] + 0.1 * rng.normal(size=8)
+            records.append({"id": f"p{u}-{p}", "values": vector, "metadata": {"user_id": f"u{u}", "year": 2010 + p}})
+    papers.upsert(records)
+
+    profiles = ProfileVectors(LocalVectorStore(dim=8))
+    assert profiles.rebuild(papers) == 6
+    assert [user_id for user_id, _ in profiles.similar("u0", top_k=1)] == ["u3"]
+    assert {user_id for user_id, _ in profiles.search(topics[1], top_k=2)} == {"u1", "u4"}
+    assert [user_id for user_id, _ in profiles.search(topics[1], top_k=5, filter={"user_id": {"$in": ["u4", "u5"]}})][0] == "u4"
@@ -0,0 +1,356 @@
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+from sklearn.metrics.pairwise import cosine_similarity
+
+from backend.service.recommender import Recommender, RecommenderUpdater
+from backend.service.sharded_recommender import ShardedRecommender
+from backend.service.user_store import COMPACT_RATIO
+
+DATA_PATH = os.path.join(os.path.dirname(__file__), "../data/bio_research_nested.json")
+
+
+def _brute_force(recommender, user_idx, n):
+    """기존 방식: 전체 사용자와의 코사인 유사도를 계산한 뒤 자기 자신을 제외하고 정렬"""
+    similarities = cosine_similarity(
+        recommender.user_vectors[user_idx], recommender.user_vectors
+    ).flatten()
+    similarities[user_idx] = -np.inf
+    order = np.argsort(-similarities, kind="stable")[:n]
+    return similarities[order]
+
+
+def test_neighbor_table_matches_brute_force(tmp_path):
+    recommender = Recommender(top_k=10, snapshot_dir=str(tmp_path))
+    assert recommender.neighbor_ids.shape == (len(recommender.store), 10)
+
+    for user_idx, user_id in enumerate(recommender.store.user_ids):
+        recommendations = recommender.get_recommendations(user_id, 5)
+        scores = [r["similarity_score"] for r in recommendations]
+        assert np.allclose(scores, _brute_force(recommender, user_idx, 5), atol=1e-5)
+        assert user_id not in [r["user_id"] for r in recommendations]
+
+
+def test_request_larger_than_table_falls_back_to_direct_query(tmp_path):
+    recommender = Recommender(top_k=3, snapshot_dir=str(tmp_path))
+    user_id = recommender.store.user_ids[0]
+
+    recommendations = recommender.get_recommendations(user_id, 8)
+    scores = [r["similarity_score"] for r in recommendations]
+    assert len(recommendations) == 8
+    assert np.allclose(scores, _brute_force(recommender, 0, 8), atol=1e-5)
+
+
+def test_small_block_budget_gives_same_table(tmp_path):
+    full = Recommender(top_k=5, snapshot_dir=str(tmp_path))
+    blocked = Recommender(top_k=5, block_budget=1, snapshot_dir=str(tmp_path / "blocked"))
+    assert np.allclose(full.neighbor_scores, blocked.neighbor_scores, atol=1e-6)
+
+
+def test_unknown_user_returns_empty(tmp_path):
+    assert Recommender(snapshot_dir=str(tmp_path)).get_recommendations("no-such-user") == []
+
+
+def test_papers_round_trip_through_store(tmp_path):
+    with open(DATA_PATH, encoding="utf-8") as f:
+        users = json.load(f)
+    recommender = Recommender(snapshot_dir=str(tmp_path))
+
+    for user in users:
+        row = recommender.store.row_of(user["user_id"])
+        assert recommender.store.papers(row) == user["papers"]
+
+
+def _assert_table_is_exact(recommender):
+    """증분 갱신된 이웃 테이블 점수가 현재 행렬로 처음부터 계산한 값과 같은지 확인"""
+    state = recommender._state
+    rebuilt = recommender._build_neighbor_table(state)
+    assert np.allclose(state.neighbor_scores[state.active], rebuilt.neighbor_scores[state.active], atol=1e-5)
+
+
+def test_upsert_new_user_updates_neighbors(tmp_path):
+    recommender = Recommender(top_k=5, snapshot_dir=str(tmp_path))
+    target = recommender.store.user_ids[0]
+    papers = recommender.store.papers(0)
+
+    row = recommender.upsert_user("new-user", papers)
+    assert row == len(recommender.store) - 1
+    _assert_table_is_exact(recommender)
+
+    recommended = [r["user_id"] for r in recommender.get_recommendations(target, 5)]
+    assert recommended[0] == "new-user"
+
+
+def test_upsert_existing_user_replaces_papers(tmp_path):
+    recommender = Recommender(top_k=5, snapshot_dir=str(tmp_path))
+    user_id = recommender.store.user_ids[3]
+    papers = recommender.store.papers(1)
+
+    recommender.upsert_user(user_id, papers)
+    assert recommender.store.papers(recommender.store.row_of(user_id)) == papers
+    assert len(recommender.store) == 32
+    _assert_table_is_exact(recommender)
+
+
+def test_remove_user(tmp_path):
+    recommender = Recommender(top_k=5, snapshot_dir=str(tmp_path))
+    user_id = recommender.store.user_ids[0]
+
+    assert recommender.remove_user(user_id)
+    assert recommender.get_recommendations(user_id) == []
+    for other in recommender.store.user_ids[1:]:
+        assert user_id not in [r["user_id"] for r in recommender.get_recommendations(other, 5)]
+    _assert_table_is_exact(recommender)
+
+    recommender.refit()
+    assert len(recommender.store) == 31
+
+
+def test_batched_upserts_merge_vectors_once(tmp_path):
+    recommender = Recommender(top_k=5, snapshot_dir=str(tmp_path))
+    sequential = Recommender(top_k=5, snapshot_dir=str(tmp_path / "sequential"))
+    user_ids = list(recommender.store.user_ids)
+    papers = [recommender.store.papers(row) for row in range(len(user_ids))]
+
+    def apply(target):
+        for i in range(20):
+            target.upsert_user(f"new-{i}", papers[i])
+            target.upsert_user(user_ids[i], papers[i + 1])
+            if i % 5 == 4:
+                target.remove_user(f"new-{i // 2}")
+
+    before = recommender._state
+    with recommender.batch():
+        apply(recommender)
+        assert recommender._state is before
+    apply(sequential)
+
+    assert recommender.user_vectors.shape == sequential.user_vectors.shape
+    assert abs(recommender.user_vectors - sequential.user_vectors).max() < 1e-6
+    assert np.allclose(recommender.neighbor_scores, sequential.neighbor_scores, atol=1e-5)
+    _assert_table_is_exact(recommender)
+
+
+def test_replacing_papers_keeps_store_bounded(tmp_path):
+    recommender = Recommender(top_k=5, snapshot_dir=str(tmp_path))
+    user_id = recommender.store.user_ids[0]
+    expected = {r: recommender.store.papers(r) for r in range(1, len(recommender.store))}
+
+    for i in range(50):
+        recommender.upsert_user(user_id, recommender.store.papers(1 + i % 5))
+    store = recommender.store
+    live = sum(store.paper_count(row) for row in range(len(store)))
+    assert len(store._titles) <= live / (1 - COMPACT_RATIO) + 1
+    assert store.papers(0) == expected[1 + 49 % 5]
+    assert all(store.papers(row) == papers for row, papers in expected.items())
+
+
+def test_writes_never_change_a_state_readers_already_hold(tmp_path):
+    recommender = Recommender(top_k=5, snapshot_dir=str(tmp_path))
+    state = recommender._state
+    neighbor_ids, active = state.neighbor_ids.copy(), state.active.copy()
+    papers = state.store.papers(0)
+
+    recommender.upsert_user("new-user", state.store.papers(1))
+    recommender.upsert_user(state.store.user_ids[0], state.store.papers(2))
+    recommender.remove_user(state.store.user_ids[3])
+
+    assert recommender._state is not state
+    assert len(state.store) == state.user_vectors.shape[0] == len(neighbor_ids) == 32
+    assert np.array_equal(state.neighbor_ids, neighbor_ids) and np.array_equal(state.active, active)
+    assert state.store.papers(0) == papers and "new-user" not in state.store
+
+
+def test_readers_see_consistent_state_during_writes(tmp_path):
+    recommender = Recommender(top_k=5, snapshot_dir=str(tmp_path))
+    user_ids = list(recommender.store.user_ids)
+    papers = [recommender.store.papers(row) for row in range(len(user_ids))]
+
+    def write():
+        for i in range(40):
+            recommender.upsert_user(f"new-{i}", papers[i % len(papers)])
+            recommender.upsert_user(user_ids[i % len(user_ids)], papers[(i + 1) % len(papers)])
+
+    def read(_):
+        known = set(user_ids) | {f"new-{i}" for i in range(40)}
+        for _ in range(40):
+            for result in recommender.recommend_batch(user_ids[:8], 8):
+                returned = [r["user_id"] for r in result["recommendations"]]
+                assert result["user_id"] not in returned and set(returned) <= known
+
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        futures = [pool.submit(write)] + [pool.submit(read, i) for i in range(3)]
+        for future in futures:
+            future.result()
+    _assert_table_is_exact(recommender)
+
+
+def test_second_start_restores_from_snapshot(tmp_path):
+    fitted = Recommender(top_k=5, snapshot_dir=str(tmp_path))
+    restored = Recommender(top_k=5, snapshot_dir=str(tmp_path))
+
+    assert isinstance(restored.neighbor_ids, np.memmap)
+    assert np.array_equal(fitted.neighbor_ids, restored.neighbor_ids)
+    for user_id in fitted.store.user_ids:
+        assert fitted.get_recommendations(user_id) == restored.get_recommendations(user_id)
+
+    # 매핑된 스냅샷 위에서도 증분 업데이트가 가능해야 함
+    restored.upsert_user("new-user", restored.store.papers(0))
+    assert restored.get_recommendations(restored.store.user_ids[0])[0]["user_id"] == "new-user"
+
+
+def test_snapshot_rebuilt_when_source_changes(tmp_path):
+    data_path = tmp_path / "users.json"
+    with open(DATA_PATH, encoding="utf-8") as f:
+        users = json.load(f)
+    data_path.write_text(json.dumps(users[:10], ensure_ascii=False), encoding="utf-8")
+    assert len(Recommender(data_path=str(data_path), snapshot_dir=str(tmp_path / "snap")).store) == 10
+
+    data_path.write_text(json.dumps(users[:12], ensure_ascii=False), encoding="utf-8")
+    assert len(Recommender(data_path=str(data_path), snapshot_dir=str(tmp_path / "snap")).store) == 12
+
+
+def test_published_snapshot_is_picked_up_by_other_workers(tmp_path):
+    writer = Recommender(top_k=5, snapshot_dir=str(tmp_path), reload_interval=0)
+    reader = Recommender(top_k=5, snapshot_dir=str(tmp_path), reload_interval=0)
+    target = reader.store.user_ids[0]
+    assert reader.store.row_of("new-user") is None
+
+    writer.upsert_user("new-user", writer.store.papers(0))
+    published = writer.publish()
+
+    assert reader.get_recommendations(target)[0]["user_id"] == "new-user"
+    assert reader.snapshot == published
+    # 새 워커도 원본 대신 배포된 스냅샷에서 시작
+    assert Recommender(top_k=5, snapshot_dir=str(tmp_path)).store.row_of("new-user") is not None
+
+
+def test_changes_since_lists_users_changed_by_later_publishes(tmp_path):
+    writer = Recommender(top_k=5, snapshot_dir=str(tmp_path))
+    reader = Recommender(top_k=5, snapshot_dir=str(tmp_path), reload_interval=60)
+    start = reader.snapshot
+    removed = writer.store.user_ids[1]
+
+    writer.upsert_user("new-user", writer.store.papers(0))
+    writer.publish()
+    writer.remove_user(removed)
+    published = writer.publish()
+
+    assert reader.changes_since(start) == (start, {})
+    assert reader.refresh(force=True) and not reader.refresh(force=True)
+    assert reader.changes_since(start) == (published, {"new-user": writer.store.papers(0), removed: None})
+    assert reader.changes_since(published) == (published, {})
+    # 이력에 없는 스냅샷이면 바뀐 사용자를 알 수 없음
+    assert reader.changes_since(None) == (published, None)
+    assert reader.changes_since(str(tmp_path / "unknown")) == (published, None)
+
+
+def test_concurrent_publishers_do_not_lose_updates(tmp_path):
+    a = Recommender(top_k=5, snapshot_dir=str(tmp_path), reload_interval=60)
+    b = Recommender(top_k=5, snapshot_dir=str(tmp_path), reload_interval=60)
+    papers = a.store.papers(0)
+
+    # 배포된 변경 뒤의 쓰기는 최신 스냅샷 위에서 시작
+    a.upsert_user("newA", papers)
+    a.publish()
+    b.upsert_user("newB", papers)
+    b.publish()
+    fresh = Recommender(top_k=5, snapshot_dir=str(tmp_path))
+    assert fresh.store.row_of("newA") is not None and fresh.store.row_of("newB") is not None
+
+    # 둘 다 배포 전에 바꾼 경우에도 나중 배포가 먼저 배포된 스냅샷 위에 다시 적용
+    a.upsert_user("newC", papers)
+    b.remove_user("newA")
+    a.publish()
+    b.publish()
+    fresh = Recommender(top_k=5, snapshot_dir=str(tmp_path))
+    assert fresh.store.row_of("newC") is not None and fresh.store.row_of("newB") is not None
+    assert fresh.store.row_of("newA") is None
+    _assert_table_is_exact(fresh)
+
+
+def test_updater_batches_profiles_into_one_publish(tmp_path):
+    recommender = Recommender(top_k=5, snapshot_dir=str(tmp_path))
+    updater = RecommenderUpdater(recommender, delay=60)
+    user_id = recommender.store.user_ids[0]
+    before = recommender.store.papers(0)
+    new_paper = dict(before[0], title="new paper", doi="10.1000/new-paper")
+
+    futures = [updater.submit(user_id, [new_paper]), updater.submit("new-user", before[:1])]
+    directory = updater.flush()
+    assert [f.result(timeout=0) for f in futures] == [directory, directory]
+    assert recommender.snapshot == directory and not recommender._dirty
+
+    fresh = Recommender(top_k=5, snapshot_dir=str(tmp_path))
+    assert fresh.store.papers(fresh.store.row_of(user_id)) == before + [new_paper]
+    assert fresh.store.papers(fresh.store.row_of("new-user")) == before[:1]
+    assert updater.flush() is None
+
+
+def test_sharded_recommender_matches_single_process(tmp_path):
+    recommender = Recommender(top_k=5, snapshot_dir=str(tmp_path))
+    recommender.remove_user(recommender.store.user_ids[1])
+    recommender.publish()
+
+    with ShardedRecommender(recommender.snapshot, n_shards=3) as sharded:
+        for user_id in recommender.store.user_ids:
+            expected = recommender.get_recommendations(user_id, 5)
+            actual = sharded.get_recommendations(user_id, 5)
+            assert [r["user_id"] for r in actual] == [r["user_id"] for r in expected]
+            assert np.allclose([r["similarity_score"] for r in actual],
+                               [r["similarity_score"] for r in expected], atol=1e-5)
+
+
+def test_sharded_recommender_is_safe_to_query_from_many_threads(tmp_path):
+    recommender = Recommender(top_k=5, snapshot_dir=str(tmp_path))
+    user_ids = list(recommender.store.user_ids)
+    expected = {user_id: [r["user_id"] for r in recommender.get_recommendations(user_id, 3)] for user_id in user_ids}
+
+    with ShardedRecommender(recommender.snapshot, n_shards=2) as sharded:
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            actual = list(pool.map(lambda user_id: [r["user_id"] for r in sharded.get_recommendations(user_id, 3)],
+                                   user_ids * 4))
+    assert actual == [expected[user_id] for user_id in user_ids * 4]
+
+
+def test_sharded_recommender_follows_published_snapshots(tmp_path):
+    recommender = Recommender(top_k=5, snapshot_dir=str(tmp_path))
+    papers = recommender.store.papers(0)
+    recommender.remove_user(recommender.store.user_ids[1])
+    recommender.publish()  # 배포 정리 대상인 세대 스냅샷에서 시작
+    with ShardedRecommender(recommender.snapshot, n_shards=2, reload_interval=60) as sharded:
+        pinned = sharded.directory
+        for i in range(4):  # publish_snapshot의 keep(3)보다 많이 배포
+            recommender.upsert_user(f"new{i}", papers)
+            recommender.publish()
+        # 쓰고 있는 세대는 지워지지 않아 아직 확인 전이어도 질의할 수 있음
+        assert os.path.exists(os.path.join(pinned, "user_ids.npy"))
+        assert sharded.get_recommendations("new0", 3) == []
+
+        assert sharded.refresh(force=True) and sharded.directory == recommender.snapshot
+        actual = sharded.get_recommendations("new3", 3)
+        expected = recommender.get_recommendations("new3", 3)
+        assert [r["user_id"] for r in actual] == [r["user_id"] for r in expected]
+
+        # 놓아준 세대는 다음 배포 때 정리됨
+        recommender.upsert_user("new4", papers)
+        recommender.publish()
+        assert not os.path.exists(pinned)
+        assert len(sharded.get_recommendations("new0", 3)) == 3
+
+
+def test_recommend_batch_matches_single_requests(tmp_path):
+    recommender = Recommender(top_k=3, snapshot_dir=str(tmp_path))
+    user_ids = list(recommender.store.user_ids)[:10] + ["no-such-user"]
+
+    for n in (3, 7):  # 이웃 테이블 조회 / 블록 행렬 곱
+        results = list(recommender.recommend_batch(user_ids, n))
+        assert [r["user_id"] for r in results] == user_ids
+        for result in results:
+            expected = recommender.get_recommendations(result["user_id"], n)
+            assert np.allclose([r["similarity_score"] for r in result["recommendations"]],
+                               [r["similarity_score"] for r in expected], atol=1e-5)
+
+    assert len(list(recommender.recommend_batch(None, 3))) == len(recommender.store)
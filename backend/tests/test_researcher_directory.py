@@ -0,0 +1,85 @@
+import asyncio
+import json
+import os
+import threading
+from types import SimpleNamespace
+
+from backend.service.researcher_directory import ResearcherDirectory
+
+DATA_PATH = os.path.join(os.path.dirname(__file__), "../data/bio_research_nested.json")
+
+
+def test_get_many_matches_json_records():
+    with open(DATA_PATH, "r", encoding="utf-8") as f:
+        users = {user["user_id"]: user for user in json.load(f)}
+    directory = ResearcherDirectory(DATA_PATH)
+
+    user_ids = list(users)[:5] + ["unknown"]
+    result = directory.get_many(user_ids)
+    assert list(result) == user_ids[:5]
+    for user_id, entry in result.items():
+        assert entry["user_id"] == user_id
+        assert entry["papers"] == users[user_id]["papers"][:3]
+
+
+def test_reloads_when_file_changes(tmp_path):
+    path = tmp_path / "users.json"
+    path.write_text(json.dumps([{"user_id": "a", "papers": []}]), encoding="utf-8")
+    directory = ResearcherDirectory(str(path), reload_interval=0)
+    assert directory.get("b") is None
+
+    path.write_text(json.dumps([{"user_id": "a", "papers": []}, {"user_id": "b", "papers": [], "linkedin": "x"}]),
+                    encoding="utf-8")
+    os.utime(path, ns=(0, os.stat(path).st_mtime_ns + 1))
+    assert directory.get("b")["linkedin"] == "x"
+
+
+def test_db_entries_expire_and_follow_recommender_snapshots(tmp_path, monkeypatch):
+    from backend.service import researcher_directory
+    from backend.service.recommender import Recommender
+
+    queries = []
+    names = {"db-user": "first"}
+
+    async def get_users_by_user_ids(db, user_ids):
+        queries.append(list(user_ids))
+        return [SimpleNamespace(user_id=user_id, name=names[user_id], affiliation=None, google_scholar_id=None,
+                                papers=[]) for user_id in user_ids if user_id in names]
+
+    monkeypatch.setattr(researcher_directory, "get_users_by_user_ids", get_users_by_user_ids)
+    writer = Recommender(top_k=5, snapshot_dir=str(tmp_path))
+    reader = Recommender(top_k=5, snapshot_dir=str(tmp_path), reload_interval=0)
+    directory = ResearcherDirectory(DATA_PATH, recommender=reader)
+
+    def fetch(*user_ids):
+        return asyncio.run(directory.get_many_async(list(user_ids), db=object()))
+
+    assert fetch("db-user", "missing")["db-user"]["name"] == "first"
+    assert fetch("db-user", "missing") and len(queries) == 1  # 찾은 항목과 없던 항목 모두 캐시
+
+    # 다른 프로세스가 수집 후 배포하면 그 사용자만 다시 조회
+    names["db-user"] = "second"
+    writer.upsert_user("db-user", writer.store.papers(0))
+    writer.publish()
+    assert fetch("db-user", "missing")["db-user"]["name"] == "second"
+    assert queries[-1] == ["db-user"]
+
+    # 없던 사용자는 DB_MISS_TTL이 지나면 다시 조회
+    monkeypatch.setattr(researcher_directory, "DB_MISS_TTL", 0.0)
+    directory.invalidate(["missing"])
+    fetch("missing")
+    fetch("missing")
+    assert queries[-2:] == [["missing"], ["missing"]]
+
+
+def test_get_many_async_refreshes_off_the_event_loop():
+    directory = ResearcherDirectory(DATA_PATH)
+    threads = []
+    refresh = directory.refresh
+    directory.refresh = lambda: (threads.append(threading.get_ident()), refresh())
+
+    async def main():
+        return threading.get_ident(), await directory.get_many_async([directory.store.user_ids[0]])
+
+    loop_thread, result = asyncio.run(main())
+    assert len(result) == 1 and threads and loop_thread not in threads
@@ -0,0 +1,276 @@
+import math
+import re
+import threading
+from array import array
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from ..core.terms import term_keys
+from .metadata_index import MetadataIndex
+
+_TOKEN = re.compile(r'[가-힣]+|[0-9a-z]+(?:[-.][0-9a-z]+)*')
+COMPACT_RATIO = 0.25  # 삭제된 문서가 이 비율을 넘으면 posting에서 걷어 내고 문서 번호를 다시 매김
+
+
+def tokenize(text: str) -> List[str]:
+    """BM25용 토큰화
+
+    - 영문/숫자는 소문자 단어 단위 ("anti-cd3"처럼 하이픈으로 이어진 시약 이름은 통째로, 부분도 함께)
+    - 한글은 띄어쓰기/조사와 무관하게 맞도록 두 글자씩 겹쳐 자른 bigram (한 글자 단어는 그대로)
+    """
+    tokens = []
+    for word in _TOKEN.findall(text.lower()):
+        if '가' <= word[0] <= '힣':
+            if len(word) == 1:
+                tokens.append(word)
+            else:
+                tokens.extend(word[i:i + 2] for i in range(len(word) - 1))
+        else:
+            tokens.append(word)
+            if '-' in word or '.' in word:
+                tokens.extend(part for part in re.split(r'[-.]', word) if part)
+    return tokens
+
+
+def encode_varints(values: Iterable[int], out: bytearray):
+    """음이 아닌 정수들을 7비트 가변 길이(varint)로 out 뒤에 붙임"""
+    for value in values:
+        while value >= 0x80:
+            out.append((value & 0x7F) | 0x80)
+            value >>= 7
+        out.append(value)
+
+
+def decode_varints(buf) -> np.ndarray:
+    """encode_varints의 역변환 (numpy로 한 번에 디코딩)"""
+    data = np.frombuffer(buf, dtype=np.uint8)
+    if not len(data):
+        return np.empty(0, dtype=np.int64)
+    ends = np.flatnonzero(data < 0x80)
+    starts = np.concatenate([[0], ends[:-1] + 1])
+    shifts = 7 * (np.arange(len(data)) - np.repeat(starts, ends - starts + 1))
+    return np.add.reduceat((data & 0x7F).astype(np.int64) << shifts, starts)
+
+
+class Bm25Index:
+    """논문 단위 BM25 역색인
+
+    문서(논문) 번호는 추가 순서대로 늘어나므로, 단어별 posting은 (이전 문서와의 차이, 빈도)
+    쌍을 varint로 이어 붙인 bytearray 하나로 보관하고 새 논문은 뒤에 덧붙이기만 한다.
+    사용자 삭제는 문서를 표시만 하고 문서 빈도/길이 합계에서 빼며(문서별 단어 번호 목록을 따로 둠),
+    삭제된 문서가 COMPACT_RATIO를 넘으면 posting을 압축하므로 문서 번호는 그때 바뀔 수 있다.
+    """
+
+    def __init__(self, k1: float = 1.2, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self._postings: Dict[str, bytearray] = {}
+        self._last_doc: Dict[str, int] = {}
+        self._df: Dict[str, int] = {}  # 살아 있는 문서 기준
+        self._doc_lengths = array('I')
+        self._total_length = 0  # 살아 있는 문서 길이 합
+        self._alive = bytearray()
+        self._live_docs = 0
+        # 문서별 단어 번호 (정렬 후 차이를 varint로) - 삭제 때 문서 빈도를 되돌리는 데 사용
+        self._term_ids: Dict[str, int] = {}
+        self._terms: List[str] = []
+        self._doc_terms = bytearray()
+        self._doc_term_offsets = array('Q', [0])
+
+        # 문서별 사용자 번호와, 벡터 메타데이터와 같은 키로 만든 필터용 색인
+        self._users: List[str] = []
+        self._user_numbers: Dict[str, int] = {}
+        self._doc_users = array('i')
+        self._user_docs: Dict[str, List[int]] = {}
+        self._metadata_index = MetadataIndex()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return self._live_docs
+
+    @classmethod
+    def from_store(cls, store) -> "Bm25Index":
+        """UserStore/MappedUserStore의 모든 사용자 논문으로 색인 생성"""
+        index = cls()
+        for row, user_id in enumerate(store.user_ids):
+            if store.row_of(user_id) == row:
+                index.add_papers(user_id, store.papers(row))
+        return index
+
+    @staticmethod
+    def _document_text(paper: Dict[str, Any]) -> str:
+        return ' '.join([
+            paper.get('title') or '',
+            paper.get('abstract') or '',
+            ' '.join(paper.get('equipments') or []),
+            ' '.join(paper.get('reagents') or []),
+        ])
+
+    def add_papers(self, user_id: str, papers: Iterable[Dict[str, Any]]):
+        """사용자의 논문들을 색인에 추가"""
+        with self._lock:
+            user_number = self._user_numbers.get(user_id)
+            if user_number is None:
+                user_number = self._user_numbers[user_id] = len(self._users)
+                self._users.append(user_id)
+            for paper in papers:
+                doc = len(self._doc_lengths)
+                tokens = tokenize(self._document_text(paper))
+                counts: Dict[str, int] = {}
+                for token in tokens:
+                    counts[token] = counts.get(token, 0) + 1
+
+                term_ids = []
+                for term, tf in counts.items():
+                    postings = self._postings.get(term)
+                    if postings is None:
+                        postings = self._postings[term] = bytearray()
+                    encode_varints((doc - self._last_doc.get(term, 0), tf), postings)
+                    self._last_doc[term] = doc
+                    self._df[term] = self._df.get(term, 0) + 1
+                    term_id = self._term_ids.get(term)
+                    if term_id is None:
+                        term_id = self._term_ids[term] = len(self._terms)
+                        self._terms.append(term)
+                    term_ids.append(term_id)
+
+                term_ids.sort()
+                encode_varints(np.diff(term_ids, prepend=0).tolist(), self._doc_terms)
+                self._doc_term_offsets.append(len(self._doc_terms))
+                self._doc_lengths.append(len(tokens))
+                self._total_length += len(tokens)
+                self._alive.append(1)
+                self._live_docs += 1
+                self._doc_users.append(user_number)
+                self._user_docs.setdefault(user_id, []).append(doc)
+                self._metadata_index.add(doc, self._metadata(user_id, paper))
+
+    def remove_user(self, user_id: str):
+        """사용자의 논문을 검색 대상과 문서 빈도/평균 길이 통계에서 제외"""
+        with self._lock:
+            for doc in self._user_docs.pop(user_id, []):
+                self._alive[doc] = 0
+                self._live_docs -= 1
+                self._total_length -= self._doc_lengths[doc]
+                for term_id in self._doc_term_ids(doc):
+                    term = self._terms[term_id]
+                    self._df[term] -= 1
+            if len(self._doc_lengths) - self._live_docs > COMPACT_RATIO * len(self._doc_lengths):
+                self._compact()
+
+    def _doc_term_ids(self, doc: int) -> np.ndarray:
+        lo, hi = self._doc_term_offsets[doc], self._doc_term_offsets[doc + 1]
+        return np.cumsum(decode_varints(bytes(self._doc_terms[lo:hi])))
+
+    def _compact(self):
+        """삭제된 문서를 posting/문서별 배열/메타데이터 색인에서 걷어 내고 문서 번호를 다시 매김 (잠금 안에서 호출)"""
+        alive = np.frombuffer(self._alive, dtype=np.uint8).astype(bool)
+        new_docs = np.full(len(alive), -1, dtype=np.int64)
+        new_docs[alive] = np.arange(int(alive.sum()))
+
+        for term in list(self._postings):
+            pairs = decode_varints(bytes(self._postings[term]))
+            docs = new_docs[np.cumsum(pairs[0::2])]
+            keep = docs >= 0
+            if not keep.any():
+                del self._postings[term], self._last_doc[term], self._df[term]
+                continue
+            docs, tf = docs[keep], pairs[1::2][keep]
+            interleaved = np.empty(2 * len(docs), dtype=np.int64)
+            interleaved[0::2] = np.diff(docs, prepend=0)
+            interleaved[1::2] = tf
+            postings = bytearray()
+            encode_varints(interleaved.tolist(), postings)
+            self._postings[term] = postings
+            self._last_doc[term] = int(docs[-1])
+
+        doc_terms, offsets = bytearray(), array('Q', [0])
+        for doc in np.flatnonzero(alive):
+            doc_terms += self._doc_terms[self._doc_term_offsets[doc]:self._doc_term_offsets[doc + 1]]
+            offsets.append(len(doc_terms))
+        self._doc_terms, self._doc_term_offsets = doc_terms, offsets
+        self._doc_lengths = array('I', np.frombuffer(self._doc_lengths, dtype=np.uint32)[alive].tobytes())
+        self._doc_users = array('i', np.frombuffer(self._doc_users, dtype=np.int32)[alive].tobytes())
+        self._alive = bytearray(b'\x01' * len(self._doc_lengths))
+        self._user_docs = {user_id: new_docs[docs].tolist() for user_id, docs in self._user_docs.items()}
+        self._metadata_index.compact(new_docs)
+
+    @staticmethod
+    def _metadata(user_id: str, paper: Dict[str, Any]) -> Dict[str, Any]:
+        """벡터 메타데이터와 같은 키 (/search 필터를 그대로 쓰기 위해)"""
+        metadata = {
+            'user_id': user_id,
+            'equipments': list(paper.get('equipments') or []),
+            'reagents': list(paper.get('reagents') or []),
+            'equipment_keys': term_keys(paper.get('equipments') or []),
+            'reagent_keys': term_keys(paper.get('reagents') or []),
+        }
+        if isinstance(paper.get('year'), int):
+            metadata['year'] = paper['year']
+        if paper.get('journal'):
+            metadata['journal'] = paper['journal']
+        return metadata
+
+    def _score(self, query: str, top_k: int, filter: Optional[Dict[str, Any]]):
+        """점수 내림차순 상위 top_k개의 (문서 번호, 점수, 사용자 번호) 배열"""
+        empty = (np.empty(0, dtype=np.int64), np.empty(0), np.empty(0, dtype=np.int32))
+        terms = set(tokenize(query))
+        with self._lock:
+            n_docs = self._live_docs
+            if not n_docs or not terms:
+                return empty
+            avg_length = self._total_length / n_docs
+            doc_lengths = np.frombuffer(self._doc_lengths, dtype=np.uint32)
+
+            docs, scores = [], []
+            for term in terms:
+                postings = self._postings.get(term)
+                if postings is None:
+                    continue
+                pairs = decode_varints(bytes(postings))
+                term_docs = np.cumsum(pairs[0::2])
+                tf = pairs[1::2].astype(np.float64)
+                idf = math.log(1 + (n_docs - self._df[term] + 0.5) / (self._df[term] + 0.5))
+                norm = self.k1 * (1 - self.b + self.b * doc_lengths[term_docs] / avg_length)
+                docs.append(term_docs)
+                scores.append(idf * tf * (self.k1 + 1) / (tf + norm))
+            if not docs:
+                return empty
+
+            # 여러 단어에 걸친 점수를 문서별로 합산
+            unique_docs, inverse = np.unique(np.concatenate(docs), return_inverse=True)
+            totals = np.bincount(inverse, weights=np.concatenate(scores))
+            keep = np.frombuffer(self._alive, dtype=np.uint8)[unique_docs].astype(bool)
+            if filter:
+                keep &= self._metadata_index.mask(filter, len(self._doc_lengths))[unique_docs]
+            unique_docs, totals = unique_docs[keep], totals[keep]
+            doc_users = np.frombuffer(self._doc_users, dtype=np.int32)[unique_docs]
+
+        order = np.argsort(-totals, kind='stable')[:top_k]
+        return unique_docs[order], totals[order], doc_users[order]
+
+    def search(self, query: str, top_k: int = 10,
+               filter: Optional[Dict[str, Any]] = None) -> List[Tuple[int, float]]:
+        """BM25 점수 상위 top_k개의 (문서 번호, 점수)"""
+        docs, scores, _ = self._score(query, top_k, filter)
+        return [(int(doc), float(score)) for doc, score in zip(docs, scores)]
+
+    def search_users(self, query: str, top_k: int = 5, aggregation: str = "max",
+                     filter: Optional[Dict[str, Any]] = None) -> List[Tuple[str, float, int]]:
+        """사용자 단위 BM25 검색 [(user_id, 점수, 일치 논문 수)] (점수는 논문 점수의 max/mean/sum)"""
+        _, scores, doc_users = self._score(query, len(self._doc_lengths), filter)
+        if not len(scores):
+            return []
+        users, first, counts = np.unique(doc_users, return_index=True, return_counts=True)
+        if aggregation == "max":
+            user_scores = scores[first]  # 점수 내림차순이므로 사용자별 첫 문서가 최댓값
+        else:
+            sums = np.bincount(np.searchsorted(users, doc_users), weights=scores)
+            user_scores = sums if aggregation == "sum" else sums / counts
+        order = np.argsort(-user_scores, kind='stable')[:top_k]
+        return [(self._users[users[i]], float(user_scores[i]), int(counts[i])) for i in order]
+
+    def posting_bytes(self) -> int:
+        """압축된 posting 전체 크기 (바이트)"""
+        return sum(len(postings) for postings in self._postings.values())
@@ -0,0 +1,125 @@
+import os
+import threading
+from typing import Any, Dict, Optional
+
+import openai
+from dotenv import load_dotenv
+
+from .openai_gateway import get_openai_gateway
+from .profile_vectors import profile_index_name
+from .store import VECTOR_STORE_BACKEND, PineconeVectorStore, VectorStore, open_local_store
+
+load_dotenv()
+
+EMBEDDING_TIMEOUT = float(os.getenv("EMBEDDING_TIMEOUT", "10"))
+PINECONE_POOL_SIZE = int(os.getenv("PINECONE_POOL_SIZE", "16"))
+# 논문 저장(프로필 수집)과 검색이 같은 모델/인덱스를 쓰도록 여기서만 정함
+# (모델을 바꾸면 기존 벡터는 다른 공간이므로 논문 인덱스를 다시 임베딩해야 함)
+EMBEDDING_MODEL = os.getenv("EMBEDDING_MODEL", "text-embedding-3-small")
+EMBEDDING_DIMENSION = 1536
+PAPER_INDEX = os.getenv("PINECONE_INDEX", "bio-paper-index")
+PROFILE_INDEX = os.getenv("PROFILE_INDEX", profile_index_name(PAPER_INDEX))
+
+_lock = threading.Lock()
+_pinecone = None
+_vector_stores: Dict[str, VectorStore] = {}
+_errors: Dict[str, str] = {}
+_openai_client = None
+_async_openai_client = None
+
+
+def _pinecone_api_key() -> Optional[str]:
+    # 검색 쪽은 예전부터 PINCONE_API_KEY 이름을 써 왔으므로 둘 다 허용
+    return os.getenv("PINECONE_API_KEY") or os.getenv("PINCONE_API_KEY")
+
+
+def get_pinecone():
+    """프로세스 전역 Pinecone 클라이언트 (처음 호출 때 생성, HTTP 연결 풀 공유)"""
+    global _pinecone
+    with _lock:
+        if _pinecone is None:
+            from pinecone import Pinecone
+            api_key = _pinecone_api_key()
+            if not api_key:
+                raise RuntimeError("PINECONE_API_KEY not set")
+            _pinecone = Pinecone(api_key=api_key, connection_pool_maxsize=PINECONE_POOL_SIZE)
+        return _pinecone
+
+
+def get_vector_store(index_name: str, create_if_missing: bool = False,
+                     dimension: int = EMBEDDING_DIMENSION) -> VectorStore:
+    """인덱스 이름별 프로세스 전역 벡터 저장소
+
+    처음 호출할 때만 연결/인덱스 확인을 하고 이후에는 같은 객체를 돌려준다.
+    인덱스가 없으면 create_if_missing일 때 만들고, 아니면 LookupError.
+    """
+    store = _vector_stores.get(index_name)
+    if store is not None:
+        return store
+
+    try:
+        if VECTOR_STORE_BACKEND == 'local':
+            store = open_local_store(index_name, dimension)
+        else:
+            pc = get_pinecone()
+            if index_name not in pc.list_indexes().names():
+                if not create_if_missing:
+                    raise LookupError(f"Pinecone index '{index_name}' does not exist")
+                pc.create_index(
+                    name=index_name,
+                    dimension=dimension,
+                    metric="cosine",
+                    spec={"serverless": {"cloud": "aws", "region": "us-east-1"}}
+                )
+            store = PineconeVectorStore(pc.Index(index_name))
+    except Exception as e:
+        _errors[index_name] = str(e)
+        raise
+
+    with _lock:
+        store = _vector_stores.setdefault(index_name, store)
+        _errors.pop(index_name, None)
+    print(f"✅ 벡터 인덱스 '{index_name}' 연결 ({VECTOR_STORE_BACKEND})")
+    return store
+
+
+def get_openai_client() -> openai.OpenAI:
+    """프로세스 전역 OpenAI 클라이언트 (내부 httpx 연결 풀 공유)
+
+    재시도는 openai_gateway가 한도에 맞춰 하므로 클라이언트 자체 재시도는 끈다.
+    """
+    global _openai_client
+    with _lock:
+        if _openai_client is None:
+            _openai_client = openai.OpenAI(api_key=os.getenv("OPENAI_API_KEY"), timeout=EMBEDDING_TIMEOUT,
+                                           max_retries=0)
+        return _openai_client
+
+
+def get_async_openai_client() -> openai.AsyncOpenAI:
+    """프로세스 전역 AsyncOpenAI 클라이언트"""
+    global _async_openai_client
+    with _lock:
+        if _async_openai_client is None:
+            _async_openai_client = openai.AsyncOpenAI(api_key=os.getenv("OPENAI_API_KEY"),
+                                                      timeout=EMBEDDING_TIMEOUT, max_retries=0)
+        return _async_openai_client
+
+
+def warm_up(*index_names: str):
+    """인덱스 연결을 미리 만들어 둠 (실패는 readiness()에 기록만 하고 넘어감)"""
+    for index_name in index_names:
+        try:
+            get_vector_store(index_name)
+        except Exception as e:
+            print(f"⚠️ 벡터 인덱스 '{index_name}' 연결 실패: {str(e)}")
+
+
+def readiness() -> Dict[str, Any]:
+    """/health에 보고할 외부 클라이언트 상태 (연결을 새로 시도하지 않음)"""
+    indexes = {name: 'ready' for name in _vector_stores}
+    indexes.update({name: f"error: {error}" for name, error in _errors.items()})
+    return {
+        'vector_store': {'backend': VECTOR_STORE_BACKEND, 'indexes': indexes},
+        'openai': {'configured': bool(os.getenv("OPENAI_API_KEY")), 'gateway': get_openai_gateway().stats()},
+    }
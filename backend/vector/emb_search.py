@@ -1,40 +1,192 @@
-from pinecone import Pinecone
+import asyncio
+import math
 import os
+from concurrent.futures import ThreadPoolExecutor
 import numpy as np
-import openai
 from dotenv import load_dotenv
 
+from ..core.terms import term_key
+from .clients import (
+    EMBEDDING_MODEL, EMBEDDING_TIMEOUT, PAPER_INDEX, PROFILE_INDEX, get_async_openai_client, get_openai_client,
+    get_vector_store,
+)
+from .embedding_cache import EmbeddingCache
+from .openai_gateway import INTERACTIVE, get_openai_gateway
+from .profile_vectors import ProfileVectors
+
 # 환경 변수 로드
 load_dotenv()
-print("\n🔥 PINCONE_API_KEY 로드됨?:", os.getenv("PINCONE_API_KEY"))
-print("\n🔥 OPENAI_API_KEY 로드됨?:", os.getenv("OPENAI_API_KEY"))
 
-# OpenAI API 키 설정
-openai.api_key = os.getenv("OPENAI_API_KEY")
+# 호출별 제한 시간(초)
+VECTOR_QUERY_TIMEOUT = float(os.getenv("VECTOR_QUERY_TIMEOUT", "5"))
+
+# 사용자 단위 검색: 첫 질의에서 top_k의 몇 배 논문을 가져올지, 최대 질의 횟수와 최대 논문 수
+SEARCH_OVERFETCH = int(os.getenv("SEARCH_OVERFETCH", "4"))
+SEARCH_MAX_ROUNDS = int(os.getenv("SEARCH_MAX_ROUNDS", "3"))
+SEARCH_MAX_FETCH = int(os.getenv("SEARCH_MAX_FETCH", "1000"))
+
+# 동기 벡터 검색을 이벤트 루프 밖에서 실행할 스레드 풀
+_query_executor = ThreadPoolExecutor(max_workers=int(os.getenv("VECTOR_QUERY_THREADS", "16")),
+                                     thread_name_prefix="vector-query")
 
-# Pinecone 초기화
-pc = Pinecone(api_key=os.getenv("PINCONE_API_KEY"))
-index_name = "bio-paper-index"
+# 반복되는 검색어는 임베딩 API를 다시 호출하지 않도록 캐시 (프로세스 내 LRU + sqlite)
+embedding_cache = EmbeddingCache(
+    max_entries=int(os.getenv("EMBEDDING_CACHE_SIZE", "1024")),
+    ttl=float(os.getenv("EMBEDDING_CACHE_TTL", str(30 * 24 * 3600))),
+)
 
-# 기존 인덱스 사용
-if index_name in pc.list_indexes().names():
-    print(f"✅ 기존 인덱스 '{index_name}'를 사용합니다.")
-    index = pc.Index(index_name)
-    print("🧠 인덱스 상태:", index.describe_index_stats())
-else:
-    print(f"⚠️ 인덱스 '{index_name}'가 존재하지 않습니다. 검색을 진행할 수 없습니다.")
-    exit(1)
+# 프로필 수집이 논문을 저장하는 인덱스와 같은 인덱스 (clients에서 한 곳에서 정함)
+index_name = PAPER_INDEX
+# 사용자 프로필 벡터 인덱스 (논문 인덱스와 같은 임베딩 모델, python -m backend.vector.profile_vectors로 생성)
+profile_index_name = PROFILE_INDEX
+
+# 연결은 임포트 때가 아니라 처음 검색할 때 한 번만 만든다 (clients의 프로세스 전역 객체 공유)
+def get_index():
+    """검색에 쓰는 벡터 인덱스 (처음 호출 때 연결, 없으면 LookupError)"""
+    return get_vector_store(index_name)
+
+def get_profiles() -> ProfileVectors:
+    """사용자 프로필 벡터 인덱스 (처음 호출 때 연결, 없으면 LookupError)"""
+    return ProfileVectors(get_vector_store(profile_index_name))
 
 def get_embedding(text: str) -> list:
     """OpenAI API를 사용하여 텍스트의 임베딩을 얻습니다."""
-    response = openai.Embedding.create(
-        model="text-embedding-3-small",
-        input=text
+    embedding = embedding_cache.get(EMBEDDING_MODEL, text)
+    if embedding is not None:
+        return embedding
+    # 검색어 임베딩은 사용자가 기다리므로 백그라운드 분석보다 먼저 보냄
+    response = get_openai_gateway().embed(get_openai_client(), EMBEDDING_MODEL, text, INTERACTIVE)
+    embedding = response.data[0].embedding
+    embedding_cache.put(EMBEDDING_MODEL, text, embedding)
+    return embedding
+
+async def get_embedding_async(text: str) -> list:
+    """get_embedding의 비동기 버전 (이벤트 루프를 막지 않음, 캐시의 sqlite 접근도 루프 밖에서)"""
+    embedding, = await embedding_cache.get_many_async(EMBEDDING_MODEL, [text])
+    if embedding is not None:
+        return embedding
+    response = await asyncio.wait_for(
+        get_openai_gateway().embed_async(get_async_openai_client(), EMBEDDING_MODEL, text, INTERACTIVE),
+        EMBEDDING_TIMEOUT,
     )
-    return response.data[0].embedding
+    embedding = response.data[0].embedding
+    await embedding_cache.put_many_async(EMBEDDING_MODEL, [(text, embedding)])
+    return embedding
+
+async def get_embeddings_async(texts: list) -> list:
+    """여러 텍스트의 임베딩 (캐시에 없는 것만 모아 임베딩 API를 한 번 호출)"""
+    embeddings = await embedding_cache.get_many_async(EMBEDDING_MODEL, texts)
+    missing = [i for i, embedding in enumerate(embeddings) if embedding is None]
+    if missing:
+        response = await asyncio.wait_for(
+            get_openai_gateway().embed_async(get_async_openai_client(), EMBEDDING_MODEL,
+                                             [texts[i] for i in missing], INTERACTIVE),
+            EMBEDDING_TIMEOUT,
+        )
+        for item in response.data:
+            embeddings[missing[item.index]] = item.embedding
+        await embedding_cache.put_many_async(EMBEDDING_MODEL, [(texts[i], embeddings[i]) for i in missing])
+    return embeddings
+
+def aggregate_users(matches, aggregation: str = "max") -> list:
+    """논문 단위 검색 결과를 사용자 단위로 묶어 [(user_id, 점수, 논문 수)]를 점수순으로 반환
+
+    aggregation: 사용자 점수 = 논문 점수의 max / mean / sum
+    """
+    scores = {}
+    for match in matches:
+        user_id = match.metadata.get("user_id")
+        if user_id is not None:
+            scores.setdefault(user_id, []).append(match.score)
+
+    reduce = {"max": max, "mean": lambda s: sum(s) / len(s), "sum": sum}[aggregation]
+    users = [(user_id, reduce(s), len(s)) for user_id, s in scores.items()]
+    users.sort(key=lambda u: -u[1])
+    return users
+
+def build_filter(year_from=None, year_to=None, journals=None, equipments=None, reagents=None, user_ids=None):
+    """검색 조건을 벡터 저장소 메타데이터 필터(Pinecone 문법)로 변환 (조건이 없으면 None)
 
-def get_recommendations(query_text, top_k=5):
-    """쿼리 텍스트에 대한 추천을 반환합니다."""
+    journals/user_ids는 그중 하나, equipments/reagents는 모두 사용한 논문을 찾는다.
+    장비/시약은 메타데이터에 저장된 term_key 형태(equipment_keys/reagent_keys)와 비교하므로
+    대소문자/띄어쓰기/하이픈이 달라도 찾으며, 키가 없는 이전 벡터는 원래 표기가 정확히 같을 때 찾는다.
+    """
+    conditions = []
+    year = {}
+    if year_from is not None:
+        year["$gte"] = year_from
+    if year_to is not None:
+        year["$lte"] = year_to
+    if year:
+        conditions.append({"year": year})
+    if journals:
+        conditions.append({"journal": {"$in": list(journals)}})
+    if user_ids:
+        conditions.append({"user_id": {"$in": list(user_ids)}})
+    for field, key_field, values in (("equipments", "equipment_keys", equipments),
+                                     ("reagents", "reagent_keys", reagents)):
+        for value in values or []:
+            key = term_key(value)
+            if key:
+                conditions.append({"$or": [{key_field: {"$in": [key]}}, {field: {"$in": [value]}}]})
+
+    if not conditions:
+        return None
+    return conditions[0] if len(conditions) == 1 else {"$and": conditions}
+
+def _search_users(query_vector, top_k: int, aggregation: str = "max", filter=None) -> list:
+    """서로 다른 사용자 top_k명이 모일 때까지 논문 검색 범위를 넓혀 가며 질의 (최대 SEARCH_MAX_ROUNDS번)
+
+    첫 질의는 top_k * SEARCH_OVERFETCH개를 가져오고, 사용자가 모자라면 지금까지 본
+    사용자당 논문 수로 필요한 개수를 추정해 다시 질의한다. 인덱스의 결과가 다 떨어졌거나
+    SEARCH_MAX_FETCH에 닿으면 그대로 끝낸다. filter는 인덱스 질의에 그대로 전달되어
+    조건에 맞는 논문만 top_k 예산을 쓴다.
+    """
+    index = get_index()
+    fetch = min(top_k * SEARCH_OVERFETCH, SEARCH_MAX_FETCH)
+    for _ in range(SEARCH_MAX_ROUNDS):
+        results = index.query(vector=query_vector, top_k=fetch, filter=filter, include_metadata=True)
+        users = aggregate_users(results.matches, aggregation)
+        print(f"📊 유사한 문서 {len(results.matches)}개, 사용자 {len(users)}명 발견")
+        fetch = _next_fetch(fetch, top_k, len(results.matches), len(users))
+        if fetch is None:
+            break
+
+    for user_id, score, n_papers in users[:top_k]:
+        print(f"✅ 추천: {user_id} | score: {score:.4f} | 논문 {n_papers}편")
+    return users[:top_k]
+
+def _next_fetch(fetch: int, top_k: int, n_matches: int, n_users: int):
+    """다음 질의에서 가져올 논문 수 (충분히 모였거나 더 가져올 수 없으면 None)"""
+    if n_users >= top_k or n_matches < fetch or fetch >= SEARCH_MAX_FETCH:
+        return None
+    papers_per_user = n_matches / max(n_users, 1)
+    return min(max(2 * fetch, math.ceil(1.5 * top_k * papers_per_user)), SEARCH_MAX_FETCH)
+
+def _search_users_many(query_vectors: list, top_k: int, aggregation: str = "max", filter=None) -> list:
+    """_search_users를 여러 질의에 대해 한꺼번에 (라운드마다 아직 모자란 질의만 모아 다중 벡터 질의 한 번)"""
+    index = get_index()
+    users = [[] for _ in query_vectors]
+    pending = list(range(len(query_vectors)))
+    fetch = min(top_k * SEARCH_OVERFETCH, SEARCH_MAX_FETCH)
+    for _ in range(SEARCH_MAX_ROUNDS):
+        results = index.query_many([query_vectors[i] for i in pending], top_k=fetch, filter=filter,
+                                   include_metadata=True)
+        next_pending, next_fetch = [], fetch
+        for i, result in zip(pending, results):
+            users[i] = aggregate_users(result.matches, aggregation)
+            needed = _next_fetch(fetch, top_k, len(result.matches), len(users[i]))
+            if needed is not None:
+                next_pending.append(i)
+                next_fetch = max(next_fetch, needed)
+        print(f"📊 질의 {len(pending)}개 검색, 사용자가 모자란 질의 {len(next_pending)}개")
+        if not next_pending:
+            break
+        pending, fetch = next_pending, next_fetch
+    return [u[:top_k] for u in users]
+
+def get_recommendations(query_text, top_k=5, aggregation="max", filter=None):
+    """쿼리 텍스트에 대한 추천 사용자 top_k명의 user_id를 반환합니다."""
     if not query_text.strip():
         print("🚨 유효한 쿼리 텍스트 없음!")
         return []
@@ -43,18 +195,88 @@ def get_recommendations(query_text, top_k=5):
     query_vector = get_embedding(query_text)
     print(f"🧪 벡터 평균: {np.mean(query_vector):.4f}, 분산: {np.var(query_vector):.4f}")
 
-    # Pinecone에서 유사한 벡터 검색
-    results = index.query(vector=query_vector, top_k=top_k, include_metadata=True)
+    # 벡터 저장소에서 유사한 논문을 찾아 사용자 단위로 집계
+    return [user_id for user_id, _, _ in _search_users(query_vector, top_k, aggregation, filter)]
 
-    print(f"📊 유사한 문서 {len(results.matches)}개 발견")
-    recommended_users = []
-    for match in results.matches:
-        user_id = match.metadata.get("user_id")
-        print(f"✅ 추천: {user_id} | 제목: {match.metadata.get('title')} | score: {match.score:.4f}")
-        if user_id not in recommended_users:
-            recommended_users.append(user_id)
+async def get_recommendations_async(query_text, top_k=5, aggregation="max", filter=None):
+    """get_recommendations의 비동기 버전
 
-    return recommended_users
+    임베딩은 AsyncOpenAI로, 벡터 검색은 스레드 풀에서 실행하고 각각 제한 시간을 둔다.
+    제한 시간을 넘기면 asyncio.TimeoutError가 발생한다.
+    """
+    if not query_text.strip():
+        print("🚨 유효한 쿼리 텍스트 없음!")
+        return []
+
+    query_vector = await get_embedding_async(query_text)
+
+    loop = asyncio.get_running_loop()
+    users = await asyncio.wait_for(
+        loop.run_in_executor(_query_executor, _search_users, query_vector, top_k, aggregation, filter),
+        VECTOR_QUERY_TIMEOUT,
+    )
+    return [user_id for user_id, _, _ in users]
+
+async def get_recommendations_batch_async(query_texts: list, top_k=5, aggregation="max", filter=None) -> list:
+    """여러 쿼리의 추천 사용자 목록 (임베딩 API 호출 한 번 + 다중 벡터 질의)
+
+    빈 쿼리는 빈 목록을 반환하고, 결과는 query_texts와 같은 순서다.
+    """
+    texts = [text for text in query_texts if text.strip()]
+    if not texts:
+        return [[] for _ in query_texts]
+
+    query_vectors = await get_embeddings_async(texts)
+
+    loop = asyncio.get_running_loop()
+    users = await asyncio.wait_for(
+        loop.run_in_executor(_query_executor, _search_users_many, query_vectors, top_k, aggregation, filter),
+        VECTOR_QUERY_TIMEOUT,
+    )
+    by_text = iter(users)
+    return [[user_id for user_id, _, _ in next(by_text)] if text.strip() else [] for text in query_texts]
+
+async def get_profile_recommendations_async(query_text, top_k=5, filter=None):
+    """프로필 벡터 인덱스에서 바로 찾은 추천 사용자 top_k명 (논문 검색 후 사용자별 집계 없음)
+
+    filter는 프로필 메타데이터(user_id, paper_count)에만 적용된다.
+    """
+    if not query_text.strip():
+        print("🚨 유효한 쿼리 텍스트 없음!")
+        return []
+
+    query_vector = await get_embedding_async(query_text)
+
+    loop = asyncio.get_running_loop()
+    users = await asyncio.wait_for(
+        loop.run_in_executor(_query_executor, lambda: get_profiles().search(query_vector, top_k, filter)),
+        VECTOR_QUERY_TIMEOUT,
+    )
+    return [user_id for user_id, _ in users]
+
+async def get_profile_recommendations_batch_async(query_texts: list, top_k=5, filter=None) -> list:
+    """get_profile_recommendations_async의 배치 버전 (임베딩 API 호출 한 번 + 다중 벡터 질의)"""
+    texts = [text for text in query_texts if text.strip()]
+    if not texts:
+        return [[] for _ in query_texts]
+
+    query_vectors = await get_embeddings_async(texts)
+
+    loop = asyncio.get_running_loop()
+    users = await asyncio.wait_for(
+        loop.run_in_executor(_query_executor, lambda: get_profiles().search_many(query_vectors, top_k, filter)),
+        VECTOR_QUERY_TIMEOUT,
+    )
+    by_text = iter(users)
+    return [[user_id for user_id, _ in next(by_text)] if text.strip() else [] for text in query_texts]
+
+async def get_similar_profiles_async(user_id: str, top_k=5) -> list:
+    """프로필 벡터가 가장 비슷한 다른 사용자 [(user_id, 점수)] (임베딩 API 호출 없음)"""
+    loop = asyncio.get_running_loop()
+    return await asyncio.wait_for(
+        loop.run_in_executor(_query_executor, lambda: get_profiles().similar(user_id, top_k)),
+        VECTOR_QUERY_TIMEOUT,
+    )
 
 if __name__ == "__main__":
     # 검색 테스트
@@ -0,0 +1,178 @@
+import asyncio
+import os
+import sqlite3
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+DEFAULT_CACHE_PATH = os.getenv(
+    'EMBEDDING_CACHE_PATH',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), '../data/embedding_cache.sqlite3'),
+)
+SQLITE_BUSY_TIMEOUT = 5.0  # 다른 프로세스의 쓰기가 끝나기를 기다리는 최대 시간 (초)
+
+
+def normalize_text(text: str) -> str:
+    """캐시 키용 텍스트 정규화 (유니코드 NFC, 공백 정리, 대소문자 무시)"""
+    return ' '.join(unicodedata.normalize('NFC', text).split()).casefold()
+
+
+class EmbeddingCache:
+    """(모델, 정규화한 텍스트) -> 임베딩 2단 캐시
+
+    - 1단: 프로세스 내 LRU (OrderedDict, 최대 max_entries개)
+    - 2단: sqlite 파일에 float32 바이트로 저장 (최대 max_disk_entries개, 프로세스 재시작/워커 간 공유)
+    - ttl초가 지난 항목은 두 단 모두에서 만료
+    - 2단 적중 때의 last_used 갱신은 모아 두었다가 touch_batch개마다 한 번에 씀 (적중마다 쓰지 않음)
+    - async 코드는 get_many_async/put_many_async를 써서 sqlite 접근을 이벤트 루프 밖(전용 스레드)에서 함
+    """
+
+    def __init__(self, path: Optional[str] = DEFAULT_CACHE_PATH, max_entries: int = 1024,
+                 max_disk_entries: int = 100_000, ttl: float = 30 * 24 * 3600, touch_batch: int = 256):
+        self.path = path
+        self.max_entries = max_entries
+        self.max_disk_entries = max_disk_entries
+        self.ttl = ttl
+        self.touch_batch = touch_batch
+        self._lru: "OrderedDict[Tuple[str, str], Tuple[float, np.ndarray]]" = OrderedDict()
+        self._touched: Dict[Tuple[str, str], float] = {}  # 아직 쓰지 않은 last_used
+        self._lock = threading.Lock()
+        self._puts = 0
+        self.hits = {'memory': 0, 'disk': 0}
+        self.misses = 0
+
+        self._db = None
+        self._executor = None
+        if path:
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+            # 다른 워커가 쓰는 중이면 잠시 기다림 (바로 database is locked로 실패하지 않도록)
+            self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None,
+                                       timeout=SQLITE_BUSY_TIMEOUT)
+            self._db.execute(f'PRAGMA busy_timeout = {int(SQLITE_BUSY_TIMEOUT * 1000)}')
+            self._db.execute('PRAGMA journal_mode=WAL')
+            self._db.execute(
+                'CREATE TABLE IF NOT EXISTS embeddings ('
+                'model TEXT NOT NULL, text TEXT NOT NULL, vector BLOB NOT NULL, '
+                'created_at REAL NOT NULL, last_used REAL NOT NULL, PRIMARY KEY (model, text))'
+            )
+            self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='embedding-cache')
+
+    def _expired(self, created_at: float, now: float) -> bool:
+        return now - created_at > self.ttl
+
+    def _remember(self, key: Tuple[str, str], created_at: float, vector: np.ndarray):
+        self._lru[key] = (created_at, vector)
+        self._lru.move_to_end(key)
+        while len(self._lru) > self.max_entries:
+            self._lru.popitem(last=False)
+
+    def _get_memory(self, key: Tuple[str, str], now: float) -> Optional[List[float]]:
+        with self._lock:
+            entry = self._lru.get(key)
+            if entry is not None and not self._expired(entry[0], now):
+                self._lru.move_to_end(key)
+                self.hits['memory'] += 1
+                return entry[1].tolist()
+            self._lru.pop(key, None)
+            if self._db is None:
+                self.misses += 1
+            return None
+
+    def _get_disk(self, key: Tuple[str, str], now: float) -> Optional[List[float]]:
+        with self._lock:
+            row = self._db.execute('SELECT vector, created_at FROM embeddings WHERE model = ? AND text = ?',
+                                   key).fetchone()
+            if row is not None and not self._expired(row[1], now):
+                vector = np.frombuffer(row[0], dtype=np.float32)
+                self._touched[key] = now
+                if len(self._touched) >= self.touch_batch:
+                    self._flush_touched()
+                self._remember(key, row[1], vector)
+                self.hits['disk'] += 1
+                return vector.tolist()
+            self.misses += 1
+            return None
+
+    def _flush_touched(self):
+        """모아 둔 last_used를 한 번에 기록 (_lock 안에서 호출)"""
+        if self._touched:
+            self._db.executemany('UPDATE embeddings SET last_used = ? WHERE model = ? AND text = ?',
+                                 [(used, *key) for key, used in self._touched.items()])
+            self._touched.clear()
+
+    def get(self, model: str, text: str) -> Optional[List[float]]:
+        """캐시된 임베딩 (없거나 만료되면 None)"""
+        key = (model, normalize_text(text))
+        now = time.time()
+        embedding = self._get_memory(key, now)
+        if embedding is None and self._db is not None:
+            embedding = self._get_disk(key, now)
+        return embedding
+
+    async def get_many_async(self, model: str, texts: List[str]) -> List[Optional[List[float]]]:
+        """여러 텍스트의 캐시된 임베딩 (메모리에 없는 것만 전용 스레드에서 sqlite로 한 번에 조회)"""
+        now = time.time()
+        keys = [(model, normalize_text(text)) for text in texts]
+        embeddings = [self._get_memory(key, now) for key in keys]
+        missing = [i for i, embedding in enumerate(embeddings) if embedding is None]
+        if missing and self._db is not None:
+            found = await asyncio.get_running_loop().run_in_executor(
+                self._executor, lambda: [self._get_disk(keys[i], now) for i in missing])
+            for i, embedding in zip(missing, found):
+                embeddings[i] = embedding
+        return embeddings
+
+    def put(self, model: str, text: str, embedding: List[float]):
+        self.put_many(model, [(text, embedding)])
+
+    def put_many(self, model: str, items: List[Tuple[str, List[float]]]):
+        now = time.time()
+        rows = []
+        with self._lock:
+            for text, embedding in items:
+                key = (model, normalize_text(text))
+                vector = np.asarray(embedding, dtype=np.float32)
+                self._remember(key, now, vector)
+                rows.append((*key, vector.tobytes(), now, now))
+            if self._db is None:
+                return
+            self._db.executemany('INSERT OR REPLACE INTO embeddings VALUES (?, ?, ?, ?, ?)', rows)
+            before = self._puts
+            self._puts += len(rows)
+            if self._puts // 256 != before // 256:
+                self._evict(now)
+
+    async def put_many_async(self, model: str, items: List[Tuple[str, List[float]]]):
+        """put_many의 비동기 버전 (sqlite 쓰기는 전용 스레드에서)"""
+        if self._db is None:
+            self.put_many(model, items)
+            return
+        await asyncio.get_running_loop().run_in_executor(self._executor, self.put_many, model, items)
+
+    def _evict(self, now: float):
+        """만료 항목을 지우고, 최근 사용 순으로 max_disk_entries개만 남김"""
+        self._flush_touched()
+        self._db.execute('DELETE FROM embeddings WHERE created_at < ?', (now - self.ttl,))
+        self._db.execute(
+            'DELETE FROM embeddings WHERE rowid IN ('
+            'SELECT rowid FROM embeddings ORDER BY last_used DESC LIMIT -1 OFFSET ?)',
+            (self.max_disk_entries,))
+
+    def stats(self) -> Dict[str, int]:
+        """적중/실패 횟수와 현재 크기"""
+        with self._lock:
+            disk = self._db.execute('SELECT COUNT(*) FROM embeddings').fetchone()[0] if self._db else 0
+            return {'memory_hits': self.hits['memory'], 'disk_hits': self.hits['disk'], 'misses': self.misses,
+                    'memory_entries': len(self._lru), 'disk_entries': disk}
+
+    def clear(self):
+        with self._lock:
+            self._lru.clear()
+            self._touched.clear()
+            if self._db is not None:
+                self._db.execute('DELETE FROM embeddings')
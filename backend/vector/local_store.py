@@ -0,0 +1,425 @@
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+from typing import Any, Dict, Iterator, List, Optional
+
+import numpy as np
+import scipy.sparse as sp
+
+from ..core.file_lock import file_lock
+from .metadata_index import MetadataIndex
+from .store import QueryMatch, QueryResult, VectorStore
+
+POINTER = 'CURRENT'  # 현재 세대 디렉터리 이름을 담은 파일
+LOCK = '.lock'  # 새 세대를 쓰는 동안 잡는 잠금 파일
+
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    """코사인 유사도를 내적으로 계산하기 위한 L2 정규화 (영벡터는 그대로)"""
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    return np.divide(vectors, norms, out=np.zeros_like(vectors), where=norms > 0)
+
+
+def _nearest_centroid(vectors: np.ndarray, centroids: np.ndarray, chunk: int = 65536) -> np.ndarray:
+    assign = np.empty(len(vectors), dtype=np.int32)
+    for start in range(0, len(vectors), chunk):
+        assign[start:start + chunk] = np.argmax(vectors[start:start + chunk] @ centroids.T, axis=1)
+    return assign
+
+
+def _spherical_kmeans(data: np.ndarray, k: int, iterations: int = 10, seed: int = 0) -> np.ndarray:
+    """정규화된 벡터에 대한 k-means (중심도 정규화해 코사인 기준으로 군집)"""
+    rng = np.random.default_rng(seed)
+    centroids = data[rng.choice(len(data), k, replace=False)].copy()
+    for _ in range(iterations):
+        assign = _nearest_centroid(data, centroids)
+        membership = sp.csr_matrix(
+            (np.ones(len(data), dtype=np.float32), (assign, np.arange(len(data)))), shape=(k, len(data)))
+        sums = np.asarray(membership @ data)
+        empty = np.flatnonzero(np.bincount(assign, minlength=k) == 0)
+        sums[empty] = data[rng.choice(len(data), len(empty))]
+        centroids = _normalize(sums.astype(np.float32))
+    return centroids
+
+
+class LocalVectorStore(VectorStore):
+    """프로세스 내 근사 최근접 이웃(IVF) 벡터 저장소
+
+    - 벡터는 정규화된 float32 배열에 보관하고 점수는 코사인 유사도(내적)
+    - 벡터 수가 min_train_size를 넘으면 구면 k-means로 sqrt(N)개의 리스트를 학습하고,
+      질의 때는 질의와 가까운 nprobe개 리스트의 벡터만 비교
+    - flush()는 세대별 디렉터리에 저장하고 CURRENT 포인터를 원자적으로 교체하며,
+      다른 프로세스는 reload_interval마다 포인터를 확인해 새 세대를 메모리 매핑으로 다시 연다
+    - 여러 프로세스가 써도 되도록, 아직 저장하지 않은 upsert/delete를 기록해 두었다가 다른 프로세스가
+      더 새 세대를 저장했으면 그 세대를 불러와 기록을 다시 적용(rebase)한 뒤 저장한다 (파일 잠금 안에서)
+    """
+
+    def __init__(self, dim: int = 1536, path: Optional[str] = None, nprobe: int = 16,
+                 min_train_size: int = 4096, reload_interval: float = 1.0):
+        self.dim = dim
+        self.path = path
+        self.nprobe = nprobe
+        self.min_train_size = min_train_size
+        self.reload_interval = reload_interval
+        self.snapshot = None  # 현재 매핑 중인 세대 디렉터리
+        self._lock = threading.RLock()
+        self._dirty = False
+        self._last_reload_check = 0.0
+        self._reset()
+        if path:
+            self._load_current()
+
+    @classmethod
+    def open(cls, path: str, dim: int = 1536, **kwargs) -> "LocalVectorStore":
+        """path에 저장된 인덱스를 열거나, 없으면 빈 인덱스를 만듦"""
+        return cls(dim=dim, path=path, **kwargs)
+
+    def _reset(self):
+        self._vectors = np.empty((0, self.dim), dtype=np.float32)  # 용량만큼 잡힌 버퍼
+        self._size = 0
+        self._ids: List[str] = []
+        self._metadata: List[Dict[str, Any]] = []
+        self._metadata_index = MetadataIndex()
+        self._rows: Dict[str, int] = {}
+        self._alive = np.zeros(0, dtype=bool)
+        self._assign = np.zeros(0, dtype=np.int32)
+        self._centroids = None
+        self._trained_size = 0
+        self._list_offsets = None  # 학습 시점 행들의 리스트별 구간 (CSR)
+        self._list_members = None
+        self._pending: List[int] = []  # 학습 이후 추가되어 CSR에 아직 없는 행
+        self._changes: List[tuple] = []  # 마지막으로 불러온 세대 이후의 ('upsert', vectors) / ('delete', ids)
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    # ----- 저장 / 불러오기 -----
+
+    def _current_directory(self) -> Optional[str]:
+        try:
+            with open(os.path.join(self.path, POINTER), 'r', encoding='utf-8') as f:
+                name = f.read().strip()
+        except OSError:
+            return None
+        return os.path.join(self.path, name) if name else None
+
+    def _load_current(self):
+        directory = self._current_directory()
+        if directory and directory != self.snapshot:
+            self._load(directory)
+
+    def _load(self, directory: str):
+        with open(os.path.join(directory, 'manifest.json'), 'r', encoding='utf-8') as f:
+            manifest = json.load(f)
+        if manifest['dim'] != self.dim:
+            raise ValueError(f"Vector store dimension {manifest['dim']} != {self.dim}")
+
+        ids, metadata = [], []
+        with open(os.path.join(directory, 'records.jsonl'), 'r', encoding='utf-8') as f:
+            for line in f:
+                record = json.loads(line)
+                ids.append(record['id'])
+                metadata.append(record['metadata'])
+
+        with self._lock:
+            self._reset()
+            self._vectors = np.load(os.path.join(directory, 'vectors.npy'), mmap_mode='r')
+            self._size = len(ids)
+            self._ids = ids
+            self._metadata = metadata
+            self._rows = {vector_id: row for row, vector_id in enumerate(ids)}
+            for row, entry in enumerate(metadata):
+                self._metadata_index.add(row, entry)
+            self._alive = np.ones(self._size, dtype=bool)
+            centroids_path = os.path.join(directory, 'centroids.npy')
+            if os.path.exists(centroids_path):
+                self._centroids = np.load(centroids_path)
+                self._assign = np.load(os.path.join(directory, 'assign.npy'))
+                self._trained_size = manifest['trained_size']
+                self._rebuild_lists()
+            self.snapshot = directory
+            self._dirty = False
+
+    def _rebase(self, directory: str):
+        """directory 세대를 불러온 뒤 아직 저장하지 않은 변경을 다시 적용"""
+        changes = self._changes
+        self._load(directory)
+        for op, args in changes:
+            if op == 'upsert':
+                self.upsert(args)
+            else:
+                self.delete(args)
+
+    def flush(self) -> None:
+        """변경이 있으면 살아 있는 행만 새 세대 디렉터리에 저장하고 CURRENT 교체
+
+        잠금 안에서 최신 세대 위에 이 프로세스의 변경을 다시 적용한 뒤 쓰므로, 다른 프로세스가
+        그사이 저장한 벡터를 덮어써 잃어버리지 않는다.
+        """
+        if not self.path:
+            return
+        with self._lock:
+            if not self._dirty:
+                return
+            os.makedirs(self.path, exist_ok=True)
+            with file_lock(os.path.join(self.path, LOCK)):
+                current = self._current_directory()
+                if current and current != self.snapshot:
+                    self._rebase(current)
+                self._write_generation()
+
+    def _write_generation(self):
+        """현재 상태를 새 세대 디렉터리에 쓰고 CURRENT 교체 (flush가 잠금을 잡은 채 호출)"""
+        rows = np.flatnonzero(self._alive[:self._size])
+        name = f"g{time.time_ns()}"
+        tmp_dir = tempfile.mkdtemp(prefix='.tmp-', dir=self.path)
+        try:
+            np.save(os.path.join(tmp_dir, 'vectors.npy'), np.asarray(self._vectors[rows]))
+            with open(os.path.join(tmp_dir, 'records.jsonl'), 'w', encoding='utf-8') as f:
+                for row in rows:
+                    f.write(json.dumps({'id': self._ids[row], 'metadata': self._metadata[row]},
+                                       ensure_ascii=False) + '\n')
+            if self._centroids is not None:
+                np.save(os.path.join(tmp_dir, 'centroids.npy'), self._centroids)
+                np.save(os.path.join(tmp_dir, 'assign.npy'), self._assign[rows])
+            with open(os.path.join(tmp_dir, 'manifest.json'), 'w', encoding='utf-8') as f:
+                json.dump({'dim': self.dim, 'count': len(rows), 'trained_size': self._trained_size}, f)
+            os.rename(tmp_dir, os.path.join(self.path, name))
+        except Exception:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+            raise
+
+        fd, tmp_pointer = tempfile.mkstemp(prefix='.pointer-', dir=self.path)
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            f.write(name)
+        os.replace(tmp_pointer, os.path.join(self.path, POINTER))
+
+        # 직전 세대 하나만 남기고 정리 (이미 매핑한 프로세스는 계속 읽을 수 있음)
+        generations = sorted(entry for entry in os.listdir(self.path) if entry.startswith('g'))
+        for entry in generations[:-2]:
+            shutil.rmtree(os.path.join(self.path, entry), ignore_errors=True)
+
+        # 압축된 새 세대를 다시 매핑해 행 번호와 메모리를 정리
+        self._load(os.path.join(self.path, name))
+
+    def _maybe_reload(self, force: bool = False):
+        """다른 프로세스가 새 세대를 저장했으면 다시 불러옴 (저장하지 않은 변경이 있으면 그 위에 다시 적용)"""
+        if not self.path:
+            return
+        now = time.monotonic()
+        if not force and now - self._last_reload_check < self.reload_interval:
+            return
+        self._last_reload_check = now
+        directory = self._current_directory()
+        if directory and directory != self.snapshot:
+            with self._lock:
+                if self._dirty:
+                    self._rebase(directory)
+                else:
+                    self._load(directory)
+
+    def refresh(self) -> None:
+        """reload_interval과 관계없이 지금 최신 세대를 확인 (읽고-고쳐-쓰는 호출 전에 사용)"""
+        self._maybe_reload(force=True)
+
+    # ----- 쓰기 -----
+
+    def _reserve(self, extra: int):
+        """버퍼 용량을 두 배씩 늘림 (메모리 매핑된 배열이면 이때 쓰기 가능한 메모리로 복사)"""
+        needed = self._size + extra
+        if needed <= len(self._vectors) and self._vectors.flags.writeable:
+            return
+        capacity = max(needed, 2 * len(self._vectors), 1024)
+        vectors = np.empty((capacity, self.dim), dtype=np.float32)
+        vectors[:self._size] = self._vectors[:self._size]
+        self._vectors = vectors
+        self._alive = np.concatenate([self._alive[:self._size], np.zeros(capacity - self._size, dtype=bool)])
+        self._assign = np.concatenate(
+            [self._assign[:self._size], np.full(capacity - self._size, -1, dtype=np.int32)])
+
+    def upsert(self, vectors: List[Dict[str, Any]]) -> int:
+        if not vectors:
+            return 0
+        values = _normalize(np.asarray([v['values'] for v in vectors], dtype=np.float32).reshape(-1, self.dim))
+        with self._lock:
+            if self.path:
+                self._changes.append(('upsert', list(vectors)))
+            self._reserve(len(vectors))
+            for vector, value in zip(vectors, values):
+                # 같은 id는 기존 행을 지우고 새 행으로 추가
+                old_row = self._rows.get(vector['id'])
+                if old_row is not None:
+                    self._alive[old_row] = False
+                row = self._size
+                self._size += 1
+                self._vectors[row] = value
+                self._alive[row] = True
+                self._ids.append(vector['id'])
+                self._metadata.append(dict(vector.get('metadata') or {}))
+                self._metadata_index.add(row, self._metadata[row])
+                self._rows[vector['id']] = row
+                if self._centroids is not None:
+                    self._pending.append(row)
+
+            if self._centroids is not None:
+                new_rows = np.arange(self._size - len(vectors), self._size)
+                self._assign[new_rows] = _nearest_centroid(values, self._centroids)
+            self._dirty = True
+            self._maybe_train()
+        return len(vectors)
+
+    def delete(self, ids: List[str]) -> None:
+        with self._lock:
+            if self.path:
+                self._changes.append(('delete', list(ids)))
+            for vector_id in ids:
+                row = self._rows.pop(vector_id, None)
+                if row is not None:
+                    if not self._alive.flags.writeable:
+                        self._alive = self._alive.copy()
+                    self._alive[row] = False
+                    self._dirty = True
+
+    # ----- IVF 학습 -----
+
+    def _maybe_train(self):
+        """처음 min_train_size를 넘었을 때, 그리고 학습 이후 4배로 커졌을 때 다시 학습"""
+        n = len(self._rows)
+        if n >= self.min_train_size and (self._centroids is None or n >= 4 * self._trained_size):
+            self.train()
+        elif len(self._pending) > max(1024, self._trained_size // 10):
+            self._rebuild_lists()
+
+    def train(self, n_lists: Optional[int] = None, sample_size: int = 256):
+        """살아 있는 벡터로 IVF 리스트 중심을 학습하고 모든 행을 다시 배정"""
+        with self._lock:
+            rows = np.flatnonzero(self._alive[:self._size])
+            if not len(rows):
+                return
+            n_lists = n_lists or max(1, int(np.sqrt(len(rows))))
+            rng = np.random.default_rng(0)
+            sample = rows if len(rows) <= sample_size * n_lists else rng.choice(rows, sample_size * n_lists,
+                                                                                replace=False)
+            self._centroids = _spherical_kmeans(np.asarray(self._vectors[np.sort(sample)]), n_lists)
+            if not self._assign.flags.writeable or len(self._assign) < self._size:
+                self._assign = np.full(max(len(self._vectors), self._size), -1, dtype=np.int32)
+            self._assign[:self._size] = _nearest_centroid(self._vectors[:self._size], self._centroids)
+            self._trained_size = len(rows)
+            self._rebuild_lists()
+            self._dirty = True
+
+    def _rebuild_lists(self):
+        """행별 리스트 번호로부터 리스트별 행 목록(CSR)을 다시 만듦"""
+        assign = self._assign[:self._size]
+        order = np.argsort(assign, kind='stable')
+        counts = np.bincount(assign[assign >= 0], minlength=len(self._centroids))
+        self._list_offsets = np.concatenate([[0], np.cumsum(counts)])
+        self._list_members = order[np.count_nonzero(assign < 0):].astype(np.int64)
+        self._pending = []
+
+    # ----- 검색 -----
+
+    def _filter_mask(self, filter: Optional[Dict[str, Any]]) -> np.ndarray:
+        mask = self._alive[:self._size].copy()
+        if filter:
+            mask &= self._metadata_index.mask(filter, self._size)
+        return mask
+
+    def _exact(self, mask: np.ndarray) -> bool:
+        """IVF를 거치지 않고 필터 통과 행 전부와 비교할지 (학습 전이거나 통과 행이 nprobe개 리스트 분량 이하)"""
+        return self._centroids is None or int(mask.sum()) <= self.nprobe * self._size / len(self._centroids)
+
+    def _candidates(self, query: np.ndarray, mask: np.ndarray, top_k: int) -> np.ndarray:
+        """비교할 후보 행: 전수 비교면 필터 통과 행 전부, 아니면 질의와 가까운 리스트의 행"""
+        if self._exact(mask):
+            return np.flatnonzero(mask)
+
+        order = np.argsort(-(self._centroids @ query))
+        pending = np.asarray(self._pending, dtype=np.int64)
+        candidates, found = [], 0
+        for probed, list_id in enumerate(order):
+            members = self._list_members[self._list_offsets[list_id]:self._list_offsets[list_id + 1]]
+            if len(pending):
+                members = np.concatenate([members, pending[self._assign[pending] == list_id]])
+            members = members[mask[members]]
+            candidates.append(members)
+            found += len(members)
+            # nprobe개를 본 뒤에도 top_k개가 안 모이면 (필터가 있을 때) 리스트를 더 봄
+            if probed + 1 >= self.nprobe and found >= top_k:
+                break
+        return np.concatenate(candidates) if candidates else np.empty(0, dtype=np.int64)
+
+    def _result(self, candidates: np.ndarray, scores: np.ndarray, top_k: int, include_metadata: bool,
+                include_values: bool) -> QueryResult:
+        if not len(candidates):
+            return QueryResult()
+        k = min(top_k, len(candidates))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top], kind='stable')]
+        return QueryResult(matches=[
+            QueryMatch(
+                id=self._ids[candidates[i]],
+                score=float(scores[i]),
+                metadata=dict(self._metadata[candidates[i]]) if include_metadata else {},
+                values=self._vectors[candidates[i]].tolist() if include_values else None,
+            )
+            for i in top
+        ])
+
+    def query(self, vector=None, id=None, top_k=10, filter=None, include_metadata=True, include_values=False):
+        self._maybe_reload()
+        with self._lock:
+            if vector is None:
+                row = self._rows.get(id)
+                if row is None:
+                    return QueryResult()
+                query = np.asarray(self._vectors[row])
+            else:
+                query = _normalize(np.asarray(vector, dtype=np.float32))
+
+            candidates = self._candidates(query, self._filter_mask(filter), top_k)
+            scores = np.asarray(self._vectors[candidates]) @ query
+            return self._result(candidates, scores, top_k, include_metadata, include_values)
+
+    def query_many(self, vectors, top_k=10, filter=None, include_metadata=True, include_values=False):
+        """여러 질의를 한 번에 처리 (필터는 한 번만 평가하고, 전수 비교면 행렬 곱 한 번)"""
+        self._maybe_reload()
+        with self._lock:
+            queries = _normalize(np.asarray(vectors, dtype=np.float32).reshape(-1, self.dim))
+            mask = self._filter_mask(filter)
+            if self._exact(mask):
+                candidates = np.flatnonzero(mask)
+                scores = queries @ np.asarray(self._vectors[candidates]).T
+                return [self._result(candidates, row_scores, top_k, include_metadata, include_values)
+                        for row_scores in scores]
+
+            results = []
+            for query in queries:
+                candidates = self._candidates(query, mask, top_k)
+                scores = np.asarray(self._vectors[candidates]) @ query
+                results.append(self._result(candidates, scores, top_k, include_metadata, include_values))
+            return results
+
+    def fetch(self, ids: List[str]) -> Dict[str, QueryMatch]:
+        self._maybe_reload()
+        with self._lock:
+            result = {}
+            for vector_id in ids:
+                row = self._rows.get(vector_id)
+                if row is not None:
+                    result[vector_id] = QueryMatch(id=vector_id, score=0.0, metadata=dict(self._metadata[row]),
+                                                   values=self._vectors[row].tolist())
+            return result
+
+    def list_ids(self) -> Iterator[str]:
+        self._maybe_reload()
+        with self._lock:
+            ids = list(self._rows)
+        return iter(ids)
+
+    def describe_index_stats(self) -> Dict[str, Any]:
+        return {'dimension': self.dim, 'total_vector_count': len(self._rows),
+                'ivf_lists': 0 if self._centroids is None else len(self._centroids)}
@@ -0,0 +1,115 @@
+from array import array
+from typing import Any, Dict, Iterable, Tuple
+
+import numpy as np
+
+_RANGE_OPS = {
+    '$gt': np.greater,
+    '$gte': np.greater_equal,
+    '$lt': np.less,
+    '$lte': np.less_equal,
+}
+
+
+def _rows(rows: array) -> np.ndarray:
+    return np.frombuffer(rows, dtype=np.int64) if len(rows) else np.empty(0, dtype=np.int64)
+
+
+class MetadataIndex:
+    """LocalVectorStore의 메타데이터 필터용 색인
+
+    - 필드별 역색인: 값 -> 그 값을 가진 행 번호 목록 (리스트 값은 원소마다 등록)
+    - 숫자 필드: (행 번호, 값) 열을 따로 두어 범위 조건을 벡터 연산으로 계산
+    필터는 행 수 길이의 불리언 비트맵으로 평가하므로, 조건마다 해당 행만 건드리고
+    메타데이터 dict를 하나씩 보지 않는다. 교체/삭제된 행도 남아 있으므로 호출하는 쪽에서
+    살아 있는 행 마스크와 AND 해야 한다.
+    """
+
+    def __init__(self):
+        self._postings: Dict[str, Dict[Any, array]] = {}
+        self._present: Dict[str, array] = {}
+        self._numeric: Dict[str, Tuple[array, array]] = {}
+
+    def add(self, row: int, metadata: Dict[str, Any]):
+        for field, value in metadata.items():
+            if value is None:
+                continue
+            self._present.setdefault(field, array('q')).append(row)
+            postings = self._postings.setdefault(field, {})
+            for v in (value if isinstance(value, list) else [value]):
+                if isinstance(v, (str, int, float, bool)):
+                    postings.setdefault(v, array('q')).append(row)
+            if isinstance(value, (int, float)) and not isinstance(value, bool):
+                rows, values = self._numeric.setdefault(field, (array('q'), array('d')))
+                rows.append(row)
+                values.append(value)
+
+    def compact(self, new_rows: np.ndarray):
+        """행 번호를 new_rows[이전 행 번호]로 바꾸고 음수(삭제)인 행은 색인에서 제거"""
+        def remap(rows: array) -> Tuple[array, np.ndarray]:
+            mapped = new_rows[_rows(rows)]
+            keep = mapped >= 0
+            return array('q', mapped[keep].tobytes()), keep
+
+        for field, postings in self._postings.items():
+            for value in list(postings):
+                postings[value], _ = remap(postings[value])
+                if not len(postings[value]):
+                    del postings[value]
+        for field, rows in self._present.items():
+            self._present[field], _ = remap(rows)
+        for field, (rows, values) in self._numeric.items():
+            rows, keep = remap(rows)
+            self._numeric[field] = (rows, array('d', np.frombuffer(values, dtype=np.float64)[keep].tobytes()))
+
+    def _any_of(self, field: str, values: Iterable[Any], size: int) -> np.ndarray:
+        mask = np.zeros(size, dtype=bool)
+        postings = self._postings.get(field, {})
+        for value in values:
+            rows = postings.get(value)
+            if rows is not None:
+                mask[_rows(rows)] = True
+        return mask
+
+    def _field_mask(self, field: str, condition: Any, size: int) -> np.ndarray:
+        if not isinstance(condition, dict):
+            condition = {'$eq': condition}
+        result = np.ones(size, dtype=bool)
+        for op, operand in condition.items():
+            if op == '$eq':
+                result &= self._any_of(field, [operand], size)
+            elif op == '$ne':
+                result &= ~self._any_of(field, [operand], size)
+            elif op == '$in':
+                result &= self._any_of(field, operand, size)
+            elif op == '$nin':
+                result &= ~self._any_of(field, operand, size)
+            elif op in _RANGE_OPS:
+                mask = np.zeros(size, dtype=bool)
+                if field in self._numeric:
+                    rows, values = self._numeric[field]
+                    mask[_rows(rows)[_RANGE_OPS[op](np.frombuffer(values, dtype=np.float64), operand)]] = True
+                result &= mask
+            elif op == '$exists':
+                mask = np.zeros(size, dtype=bool)
+                mask[_rows(self._present.get(field, array('q')))] = True
+                result &= mask if operand else ~mask
+            else:
+                raise ValueError(f"Unsupported filter operator: {op}")
+        return result
+
+    def mask(self, filter: Dict[str, Any], size: int) -> np.ndarray:
+        """Pinecone 필터 문법을 행 비트맵으로 평가"""
+        result = np.ones(size, dtype=bool)
+        for key, condition in filter.items():
+            if key == '$and':
+                for sub in condition:
+                    result &= self.mask(sub, size)
+            elif key == '$or':
+                any_of = np.zeros(size, dtype=bool)
+                for sub in condition:
+                    any_of |= self.mask(sub, size)
+                result &= any_of
+            else:
+                result &= self._field_mask(key, condition, size)
+        return result
@@ -0,0 +1,454 @@
+import asyncio
+import concurrent.futures
+import hashlib
+import itertools
+import json
+import os
+import random
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Awaitable, Callable, Dict, Iterable, Optional, Tuple
+
+import openai
+
+INTERACTIVE = 0  # 사용자가 기다리는 요청 (/search 검색어 임베딩)
+BACKGROUND = 1  # 작업 큐에서 실행되는 요청 (논문 분석, 프로필 임베딩)
+
+# API 키 하나의 (분당 요청 수, 분당 토큰 수). 그 키를 쓰는 모든 모델과 모든 프로세스(웹 서버, 워커)가
+# 함께 나눠 쓰므로, 실제 계정 한도 중 가장 낮은 모델의 한도에 맞춰 설정한다
+OPENAI_RPM = int(os.getenv('OPENAI_RPM', '3000'))
+OPENAI_TPM = int(os.getenv('OPENAI_TPM', '1000000'))
+# 프로세스들이 버킷과 대기 순서를 공유하는 sqlite 파일
+DEFAULT_GATEWAY_PATH = os.getenv(
+    'OPENAI_GATEWAY_PATH',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), '../data/openai_gateway.sqlite3'),
+)
+OPENAI_BURST_SECONDS = float(os.getenv('OPENAI_BURST_SECONDS', '1'))  # 한 번에 몰아 보낼 수 있는 양 (몇 초 분량)
+OPENAI_MAX_RETRIES = int(os.getenv('OPENAI_MAX_RETRIES', '6'))
+OPENAI_RETRY_DELAY = float(os.getenv('OPENAI_RETRY_DELAY', '1'))  # 첫 재시도까지 대기 (초, 시도마다 2배)
+OPENAI_MAX_RETRY_DELAY = float(os.getenv('OPENAI_MAX_RETRY_DELAY', '60'))
+CHARS_PER_TOKEN = 4  # 토큰 수 추정용 (응답의 usage로 나중에 보정)
+POLL_INTERVAL = 0.005  # 차례가 아닌 요청이 다시 확인하는 간격 (초)
+WAITER_TTL = 10.0  # 이 시간 동안 확인하지 않은 대기 요청(죽은 프로세스)은 순서에서 뺌 (초)
+
+_RETRYABLE = (openai.RateLimitError, openai.APIConnectionError, openai.InternalServerError)
+
+
+def is_retryable(error: BaseException) -> bool:
+    """다시 보내면 성공할 수 있는 오류인지 (429, 연결 오류/시간 초과, 5xx)"""
+    return isinstance(error, _RETRYABLE)
+
+
+def estimate_tokens(texts: Iterable[str]) -> int:
+    return sum(len(text) for text in texts) // CHARS_PER_TOKEN + 1
+
+
+def request_key(kind: str, **params) -> str:
+    """진행 중인 같은 요청을 찾기 위한 키"""
+    payload = json.dumps([kind, params], sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+def _retry_after(error: BaseException) -> Optional[float]:
+    """429 응답의 retry-after(-ms) 헤더 (초)"""
+    headers = getattr(getattr(error, 'response', None), 'headers', None) or {}
+    for name, scale in (('retry-after-ms', 0.001), ('retry-after', 1.0)):
+        try:
+            return float(headers[name]) * scale
+        except (KeyError, TypeError, ValueError):
+            continue
+    return None
+
+
+def limit_scope(client) -> str:
+    """한도를 공유하는 범위 (같은 API 키를 쓰는 클라이언트는 모델과 프로세스에 관계없이 같은 값)"""
+    api_key = getattr(client, 'api_key', None) or ''
+    return hashlib.sha256(api_key.encode('utf-8')).hexdigest()[:16]
+
+
+class TokenBucket:
+    """분당 한도를 초당 속도로 채우는 토큰 버킷
+
+    용량은 burst초 분량이라 한도를 1분 초반에 몰아 쓰지 않는다. 용량보다 큰 요청은
+    버킷이 가득 찼을 때 보내고 모자란 만큼 빚(음수)으로 남긴다. 429를 받으면 속도를
+    줄이고(scale *= 0.75) 성공할 때마다 조금씩 되돌린다.
+    상태(level, updated, scale)는 게이트웨이가 공유 파일에서 읽어 넘기고 다시 저장한다.
+    """
+
+    def __init__(self, per_minute: float, burst: float = OPENAI_BURST_SECONDS, level: Optional[float] = None,
+                 updated: Optional[float] = None, scale: float = 1.0):
+        self.per_minute = per_minute
+        self.burst = burst
+        self.scale = scale
+        self.level = self.capacity if level is None else level
+        self.updated = time.time() if updated is None else updated
+
+    @property
+    def rate(self) -> float:
+        return self.per_minute / 60 * self.scale
+
+    @property
+    def capacity(self) -> float:
+        return max(self.per_minute / 60 * self.burst, 1.0)
+
+    def _refill(self, now: float):
+        self.level = min(self.capacity, self.level + max(now - self.updated, 0) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount: float, now: float) -> float:
+        """amount를 꺼낼 수 있을 때까지 남은 시간 (초)"""
+        self._refill(now)
+        return max(min(amount, self.capacity) - self.level, 0) / self.rate
+
+    def take(self, amount: float):
+        self.level -= amount
+
+    def refund(self, amount: float):
+        """추정과 실제 사용량의 차이 보정 (음수면 더 차감)"""
+        self.level = min(self.capacity, self.level + amount)
+
+    def slow_down(self, now: float):
+        self._refill(now)
+        self.scale = max(self.scale * 0.75, 0.1)
+        self.level = min(self.level, 0)
+
+    def speed_up(self, now: float):
+        if self.scale < 1:
+            self._refill(now)
+            self.scale = min(self.scale + 0.02, 1.0)
+
+
+class OpenAIGateway:
+    """OpenAI 호출을 한 곳에서 한도에 맞춰 내보내는 스케줄러
+
+    - API 키(scope)마다 분당 요청 수/토큰 수 토큰 버킷 하나를 두고, 그 키로 보내는 모든 모델의 요청이
+      한도 안에서만 나간다. 버킷과 대기 순서는 sqlite 파일(path)에 있어 같은 파일을 쓰는 프로세스
+      (웹 서버의 검색 임베딩, 워커의 논문 분석/프로필 임베딩)가 함께 한도를 나눠 쓴다.
+    - 기다리는 요청은 프로세스와 모델에 관계없이 (우선순위, 도착 순서)대로 보내므로 INTERACTIVE 요청이
+      쌓여 있는 BACKGROUND 요청보다 먼저 나간다.
+    - 429/연결 오류/5xx는 지수적으로 늘어나는 간격(+-지터)으로 max_retries까지 다시 보내고,
+      429면 그 키의 속도를 줄여 다른 요청(다른 프로세스 포함)도 함께 물러나게 한다.
+    - 프로세스 안에서 key가 같은 요청이 진행 중이면 새로 보내지 않고 그 결과를 같이 쓴다.
+      비동기 요청은 별도 task에서 보내므로 처음 요청한 쪽이 취소돼도 같이 기다리던 쪽은 결과를 받는다.
+
+    동기(스레드)와 비동기 호출이 같은 버킷을 공유한다. 클라이언트는 호출하는 쪽이 넘긴다.
+    path가 None이면 프로세스 안에서만 공유한다 (테스트용).
+    """
+
+    def __init__(self, limit: Tuple[int, int] = (OPENAI_RPM, OPENAI_TPM), path: Optional[str] = DEFAULT_GATEWAY_PATH,
+                 burst: float = OPENAI_BURST_SECONDS, max_retries: int = OPENAI_MAX_RETRIES,
+                 retry_delay: float = OPENAI_RETRY_DELAY, max_retry_delay: float = OPENAI_MAX_RETRY_DELAY):
+        self.limit = limit
+        self.burst = burst
+        self.max_retries = max_retries
+        self.retry_delay = retry_delay
+        self.max_retry_delay = max_retry_delay
+        self.path = path or ':memory:'
+        if path:
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._db = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None, timeout=30)
+        self._db.execute('PRAGMA journal_mode=WAL')
+        self._db.execute(
+            'CREATE TABLE IF NOT EXISTS buckets (scope TEXT PRIMARY KEY, requests REAL NOT NULL, '
+            'tokens REAL NOT NULL, scale REAL NOT NULL, updated REAL NOT NULL, paused_until REAL NOT NULL)')
+        self._db.execute(
+            'CREATE TABLE IF NOT EXISTS waiters (id INTEGER PRIMARY KEY AUTOINCREMENT, scope TEXT NOT NULL, '
+            'priority INTEGER NOT NULL, expires REAL NOT NULL)')
+        self._db.execute('CREATE INDEX IF NOT EXISTS ix_waiters_order ON waiters (scope, priority, id)')
+        self._db_lock = threading.Lock()
+        # 비동기 요청의 차례 확인 (sqlite 접근을 이벤트 루프 밖에서, 기본 풀이 차도 밀리지 않도록 전용 스레드)
+        self._executor = concurrent.futures.ThreadPoolExecutor(max_workers=2, thread_name_prefix='openai-gateway')
+        self._inflight: Dict[str, concurrent.futures.Future] = {}
+        self._tasks = set()
+        self._lock = threading.Lock()
+        self._counts = {'requests': 0, 'tokens': 0, 'rate_limited': 0, 'retries': 0, 'coalesced': 0}
+
+    # 공유 상태 ----------------------------------------------------------------
+
+    @contextmanager
+    def _transaction(self):
+        """공유 파일의 쓰기 트랜잭션 (다른 프로세스의 쓰기와 직렬화)"""
+        with self._db_lock:
+            self._db.execute('BEGIN IMMEDIATE')
+            try:
+                yield self._db
+            except BaseException:
+                self._db.execute('ROLLBACK')
+                raise
+            self._db.execute('COMMIT')
+
+    def _buckets(self, db, scope: str) -> Tuple[TokenBucket, TokenBucket, float]:
+        """scope의 (요청 수 버킷, 토큰 수 버킷, 일시 정지 끝 시각)"""
+        rpm, tpm = self.limit
+        row = db.execute('SELECT requests, tokens, scale, updated, paused_until FROM buckets WHERE scope = ?',
+                         (scope,)).fetchone()
+        if row is None:
+            return TokenBucket(rpm, self.burst), TokenBucket(tpm, self.burst), 0.0
+        level_requests, level_tokens, scale, updated, paused_until = row
+        return (TokenBucket(rpm, self.burst, level_requests, updated, scale),
+                TokenBucket(tpm, self.burst, level_tokens, updated, scale), paused_until)
+
+    @staticmethod
+    def _save(db, scope: str, requests: TokenBucket, tokens: TokenBucket, paused_until: float):
+        db.execute('INSERT OR REPLACE INTO buckets (scope, requests, tokens, scale, updated, paused_until) '
+                   'VALUES (?, ?, ?, ?, ?, ?)',
+                   (scope, requests.level, tokens.level, requests.scale, max(requests.updated, tokens.updated),
+                    paused_until))
+
+    # 한도 ------------------------------------------------------------------
+
+    def _enter(self, scope: str, priority: int) -> Dict[str, Any]:
+        """대기 순서에 등록 (다른 프로세스의 요청과 같은 순서를 공유)"""
+        now = time.time()
+        with self._transaction() as db:
+            waiter_id = db.execute('INSERT INTO waiters (scope, priority, expires) VALUES (?, ?, ?)',
+                                   (scope, priority, now + WAITER_TTL)).lastrowid
+        return {'id': waiter_id, 'scope': scope, 'priority': priority, 'heartbeat': now}
+
+    def _leave(self, waiter: Dict[str, Any]):
+        with self._transaction() as db:
+            db.execute('DELETE FROM waiters WHERE id = ?', (waiter['id'],))
+
+    def _head(self, db, scope: str, now: float) -> Optional[int]:
+        row = db.execute('SELECT id FROM waiters WHERE scope = ? AND expires >= ? ORDER BY priority, id LIMIT 1',
+                         (scope, now)).fetchone()
+        return row[0] if row else None
+
+    def _try_acquire(self, waiter: Dict[str, Any], tokens: int) -> float:
+        """차례이고 한도 안이면 사용량을 차감하고 0, 아니면 다시 확인하기까지 기다릴 시간"""
+        scope = waiter['scope']
+        now = time.time()
+        if now - waiter['heartbeat'] > WAITER_TTL / 3:
+            # 살아 있음을 알림 (너무 오래 잠들어 순서에서 빠졌으면 다시 등록)
+            with self._transaction() as db:
+                if not db.execute('UPDATE waiters SET expires = ? WHERE id = ?',
+                                  (now + WAITER_TTL, waiter['id'])).rowcount:
+                    waiter['id'] = db.execute('INSERT INTO waiters (scope, priority, expires) VALUES (?, ?, ?)',
+                                              (scope, waiter['priority'], now + WAITER_TTL)).lastrowid
+            waiter['heartbeat'] = now
+
+        # 차례가 아니면 읽기만 하고 돌아감 (쓰기 잠금은 차례인 요청만 잡음)
+        with self._db_lock:
+            requests, token_bucket, paused_until = self._buckets(self._db, scope)
+            wait = max(paused_until - now, requests.wait_time(1, now), token_bucket.wait_time(tokens, now))
+            if self._head(self._db, scope, now) != waiter['id']:
+                return min(max(wait, POLL_INTERVAL), WAITER_TTL / 3)
+        if wait > 0:
+            return min(wait, WAITER_TTL / 3)
+
+        with self._transaction() as db:
+            now = time.time()
+            db.execute('DELETE FROM waiters WHERE expires < ?', (now,))
+            if self._head(db, scope, now) != waiter['id']:
+                return POLL_INTERVAL
+            requests, token_bucket, paused_until = self._buckets(db, scope)
+            wait = max(paused_until - now, requests.wait_time(1, now), token_bucket.wait_time(tokens, now))
+            if wait > 0:
+                return min(wait, WAITER_TTL / 3)
+            requests.take(1)
+            token_bucket.take(tokens)
+            self._save(db, scope, requests, token_bucket, paused_until)
+            db.execute('DELETE FROM waiters WHERE id = ?', (waiter['id'],))
+        with self._lock:
+            self._counts['requests'] += 1
+            self._counts['tokens'] += tokens
+        return 0
+
+    def _acquire(self, scope: str, tokens: int, priority: int):
+        waiter = self._enter(scope, priority)
+        try:
+            while True:
+                wait = self._try_acquire(waiter, tokens)
+                if not wait:
+                    return
+                time.sleep(wait)
+        finally:
+            self._leave(waiter)
+
+    async def _acquire_async(self, scope: str, tokens: int, priority: int):
+        loop = asyncio.get_running_loop()
+        waiter = await loop.run_in_executor(self._executor, self._enter, scope, priority)
+        try:
+            while True:
+                wait = await loop.run_in_executor(self._executor, self._try_acquire, waiter, tokens)
+                if not wait:
+                    return
+                await asyncio.sleep(wait)
+        finally:
+            await asyncio.shield(loop.run_in_executor(self._executor, self._leave, waiter))
+
+    def _succeeded(self, scope: str, tokens: int, response: Any):
+        used = getattr(getattr(response, 'usage', None), 'total_tokens', None)
+        with self._transaction() as db:
+            requests, token_bucket, paused_until = self._buckets(db, scope)
+            now = time.time()
+            if not isinstance(used, int) and requests.scale >= 1:
+                return  # 고칠 것이 없으면 쓰지 않음
+            if isinstance(used, int):
+                token_bucket.refund(tokens - used)
+            requests.speed_up(now)
+            token_bucket.speed_up(now)
+            self._save(db, scope, requests, token_bucket, paused_until)
+        if isinstance(used, int):
+            with self._lock:
+                self._counts['tokens'] += used - tokens
+
+    def _backoff(self, scope: str, error: BaseException, attempt: int) -> Optional[float]:
+        """재시도까지 기다릴 시간 (다시 보내지 않을 오류거나 시도를 다 쓰면 None)"""
+        if not is_retryable(error) or attempt >= self.max_retries:
+            return None
+        delay = min(self.max_retry_delay, self.retry_delay * 2 ** attempt) * random.uniform(0.5, 1.0)
+        with self._lock:
+            self._counts['retries'] += 1
+        if isinstance(error, openai.RateLimitError):
+            with self._lock:
+                self._counts['rate_limited'] += 1
+            retry_after = _retry_after(error)
+            with self._transaction() as db:
+                requests, token_bucket, paused_until = self._buckets(db, scope)
+                now = time.time()
+                requests.slow_down(now)
+                token_bucket.slow_down(now)
+                if retry_after is not None:
+                    paused_until = max(paused_until, now + retry_after)
+                self._save(db, scope, requests, token_bucket, paused_until)
+            if retry_after is not None:
+                delay = max(delay, retry_after)
+        print(f"⚠️ OpenAI 요청 실패 ({str(error)}, {attempt + 1}번째) -> {delay:.1f}초 뒤 재시도")
+        return delay
+
+    # 같은 요청 합치기 ------------------------------------------------------------
+
+    def _join(self, key: Optional[str]) -> Tuple[Optional[concurrent.futures.Future], bool]:
+        """(결과를 받을 future, 직접 보내야 하는지)"""
+        if key is None:
+            return None, True
+        with self._lock:
+            future = self._inflight.get(key)
+            if future is not None:
+                self._counts['coalesced'] += 1
+                return future, False
+            future = self._inflight[key] = concurrent.futures.Future()
+            return future, True
+
+    def _finish(self, key: Optional[str], future: Optional[concurrent.futures.Future],
+                result: Any = None, error: Optional[BaseException] = None):
+        if future is None:
+            return
+        with self._lock:
+            self._inflight.pop(key, None)
+        if error is not None:
+            future.set_exception(error)
+        else:
+            future.set_result(result)
+
+    # 호출 ----------------------------------------------------------------------
+
+    def request(self, send: Callable[[], Any], scope: str, tokens: int,
+                priority: int = BACKGROUND, key: Optional[str] = None) -> Any:
+        """send()를 scope의 한도 안에서 실행하고 응답 반환 (재시도를 다 쓰면 마지막 오류를 그대로 올림)"""
+        future, owner = self._join(key)
+        if not owner:
+            return future.result()
+        try:
+            for attempt in itertools.count():
+                self._acquire(scope, tokens, priority)
+                try:
+                    response = send()
+                except Exception as e:
+                    delay = self._backoff(scope, e, attempt)
+                    if delay is None:
+                        raise
+                    time.sleep(delay)
+                    continue
+                self._succeeded(scope, tokens, response)
+                break
+        except BaseException as e:
+            self._finish(key, future, error=e)
+            raise
+        self._finish(key, future, response)
+        return response
+
+    async def _send_async(self, send: Callable[[], Awaitable[Any]], scope: str, tokens: int, priority: int) -> Any:
+        for attempt in itertools.count():
+            await self._acquire_async(scope, tokens, priority)
+            try:
+                response = await send()
+            except Exception as e:
+                delay = self._backoff(scope, e, attempt)
+                if delay is None:
+                    raise
+                await asyncio.sleep(delay)
+                continue
+            self._succeeded(scope, tokens, response)
+            return response
+
+    async def request_async(self, send: Callable[[], Awaitable[Any]], scope: str, tokens: int,
+                            priority: int = INTERACTIVE, key: Optional[str] = None) -> Any:
+        """request의 비동기 버전 (send는 코루틴을 돌려주는 함수)"""
+        future, owner = self._join(key)
+        if future is None:
+            return await self._send_async(send, scope, tokens, priority)
+        if owner:
+            # 처음 요청한 쪽이 취소돼도(wait_for 시간 초과 등) 같이 기다리는 쪽을 위해 끝까지 보냄
+            task = asyncio.ensure_future(self._send_async(send, scope, tokens, priority))
+            self._tasks.add(task)
+
+            def done(task: asyncio.Task):
+                self._tasks.discard(task)
+                if task.cancelled():
+                    self._finish(key, future, error=asyncio.CancelledError())
+                elif task.exception() is not None:
+                    self._finish(key, future, error=task.exception())
+                else:
+                    self._finish(key, future, task.result())
+
+            task.add_done_callback(done)
+        # 누가 취소돼도 보내는 task와 다른 대기자에게는 영향이 없도록 shield
+        return await asyncio.shield(asyncio.wrap_future(future))
+
+    def embed(self, client, model: str, input, priority: int = BACKGROUND):
+        """client.embeddings.create(model, input)"""
+        texts = [input] if isinstance(input, str) else input
+        return self.request(lambda: client.embeddings.create(model=model, input=input), limit_scope(client),
+                            estimate_tokens(texts), priority, request_key('embeddings', model=model, input=input))
+
+    async def embed_async(self, client, model: str, input, priority: int = INTERACTIVE):
+        """embed의 비동기 버전 (client는 AsyncOpenAI)"""
+        texts = [input] if isinstance(input, str) else input
+        return await self.request_async(lambda: client.embeddings.create(model=model, input=input),
+                                        limit_scope(client), estimate_tokens(texts), priority,
+                                        request_key('embeddings', model=model, input=input))
+
+    def chat(self, client, priority: int = BACKGROUND, **params):
+        """client.chat.completions.create(**params) (토큰은 메시지 길이 + max_tokens로 추정)"""
+        tokens = estimate_tokens(str(m.get('content') or '') for m in params['messages']) + params.get('max_tokens', 0)
+        return self.request(lambda: client.chat.completions.create(**params), limit_scope(client), tokens,
+                            priority, request_key('chat', **params))
+
+    def stats(self) -> Dict[str, Any]:
+        """이 프로세스의 누적 요청/토큰/재시도 수와 scope별 (모든 프로세스의) 대기 요청 수, 현재 속도 비율"""
+        with self._lock:
+            counts = dict(self._counts)
+        with self._db_lock:
+            now = time.time()
+            waiting = dict(self._db.execute(
+                'SELECT scope, COUNT(*) FROM waiters WHERE expires >= ? GROUP BY scope', (now,)).fetchall())
+            scales = self._db.execute('SELECT scope, scale FROM buckets').fetchall()
+        return {**counts, 'scopes': {scope: {'waiting': waiting.get(scope, 0), 'scale': scale}
+                                     for scope, scale in scales}}
+
+
+_gateway: Optional[OpenAIGateway] = None
+_gateway_lock = threading.Lock()
+
+
+def get_openai_gateway() -> OpenAIGateway:
+    """프로세스 전역 OpenAI 게이트웨이 (검색 임베딩, 논문 분석, 프로필 임베딩이 프로세스를 넘어 같은 한도 공유)"""
+    global _gateway
+    with _gateway_lock:
+        if _gateway is None:
+            _gateway = OpenAIGateway()
+        return _gateway
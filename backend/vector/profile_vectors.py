@@ -0,0 +1,178 @@
+import os
+import threading
+import uuid
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from ..core.terms import paper_key
+from .store import VectorStore
+
+# 논문 가중치: 출판 연도가 half-life만큼 최근일수록 2배 (기준 연도는 값의 크기만 정함)
+PROFILE_HALF_LIFE_YEARS = float(os.getenv("PROFILE_HALF_LIFE_YEARS", "5"))
+PROFILE_DEFAULT_YEAR = int(os.getenv("PROFILE_DEFAULT_YEAR", "2015"))  # 연도를 모르는 논문
+_REFERENCE_YEAR = 2000
+
+# 프로필 벡터 id (users.vector_embedding_id에 그대로 넣을 수 있도록 user_id에서 만든 UUID)
+_PROFILE_NAMESPACE = uuid.UUID("6f1c2f5e-8d4b-4c1e-9a57-3f0e2b7d9c41")
+_PAPER_NAMESPACE = uuid.UUID("b3d84a6e-1f27-4c95-8e0a-52c7d91f6a38")
+
+_UPSERT_BATCH = 100
+
+
+def profile_index_name(paper_index_name: str) -> str:
+    """논문 인덱스에 대응하는 사용자 프로필 인덱스 이름 (같은 임베딩 모델 공간)"""
+    return f"{paper_index_name}-profiles"
+
+
+def profile_vector_id(user_id: str) -> str:
+    return str(uuid.uuid5(_PROFILE_NAMESPACE, user_id))
+
+
+def paper_vector_id(user_id: str, paper: Dict[str, Any]) -> str:
+    """사용자 논문의 벡터 id (같은 논문을 다시 수집해도 같은 id라 upsert가 덮어씀)"""
+    return str(uuid.uuid5(_PAPER_NAMESPACE, f"{user_id}\n{paper_key(paper)}"))
+
+
+def paper_weight(year: Any = None, half_life: float = PROFILE_HALF_LIFE_YEARS) -> float:
+    """논문 하나의 가중치 2^((연도 - 기준 연도) / half_life)
+
+    지수 감쇠라서 시간이 지나도 논문 사이의 가중치 비율이 그대로이므로, 한 번 더한 값을
+    나중에 같은 가중치로 빼서 정확히 되돌릴 수 있다.
+    """
+    if isinstance(year, str) and year.isdigit():
+        year = int(year)
+    if not isinstance(year, int) or isinstance(year, bool):
+        year = PROFILE_DEFAULT_YEAR
+    return 2.0 ** ((year - _REFERENCE_YEAR) / half_life)
+
+
+class ProfileVectors:
+    """사용자 프로필 벡터 (논문 임베딩의 최신순 가중 중심)
+
+    사용자마다 sum(가중치 * 논문 벡터)를 사용자 단위 인덱스에 벡터 하나로 저장한다.
+    cosine 검색에서는 방향만 쓰이므로 이 벡터가 곧 정규화한 가중 중심이고, 논문이 많은 주제일수록
+    중심이 그쪽으로 당겨진다. 저장소가 벡터를 정규화해 저장할 수 있으므로 합의 크기(norm),
+    가중치 합, 논문 수는 메타데이터에 두고, 논문을 더하거나 뺄 때 fetch로 합을 복원해 갱신한다.
+    /search와 /recommendations는 논문 단위 검색 후 사용자별로 묶을 필요 없이 이 인덱스를 바로 질의한다.
+    """
+
+    def __init__(self, store: VectorStore, half_life: float = PROFILE_HALF_LIFE_YEARS):
+        self.store = store
+        self.half_life = half_life
+        self._lock = threading.Lock()  # 같은 프로세스 안의 동시 갱신 (fetch-수정-upsert)을 직렬화
+
+    def _load(self, user_id: str) -> Tuple[Optional[np.ndarray], float, int]:
+        """저장된 (가중 합, 가중치 합, 논문 수) (없으면 (None, 0, 0))"""
+        match = self.store.fetch([profile_vector_id(user_id)]).get(profile_vector_id(user_id))
+        if match is None:
+            return None, 0.0, 0
+        values = np.asarray(match.values, dtype=np.float64)
+        norm = np.linalg.norm(values)
+        total = values / norm * match.metadata.get("norm", norm) if norm > 0 else values
+        return total, float(match.metadata.get("weight", 0.0)), int(match.metadata.get("paper_count", 0))
+
+    def _record(self, user_id: str, total: np.ndarray, weight: float, count: int) -> Dict[str, Any]:
+        return {
+            "id": profile_vector_id(user_id),
+            "values": total.astype(np.float32).tolist(),
+            "metadata": {"user_id": user_id, "paper_count": count, "weight": weight,
+                         "norm": float(np.linalg.norm(total))},
+        }
+
+    def _update(self, user_id: str, papers: Sequence[Tuple[Sequence[float], Any]], sign: int,
+                replace: bool = False) -> Optional[str]:
+        if not papers and not replace:
+            return None
+        with self._lock:
+            # 다른 프로세스가 배포한 세대를 먼저 읽어, 그쪽에서 갱신한 프로필 위에 더함
+            # (같은 사용자를 동시에 갱신하지 않는 것은 작업 큐의 key가 보장)
+            self.store.refresh()
+            total, weight, count = (None, 0.0, 0) if replace else self._load(user_id)
+            for vector, year in papers:
+                w = paper_weight(year, self.half_life)
+                contribution = w * np.asarray(vector, dtype=np.float64)
+                total = contribution * sign if total is None else total + sign * contribution
+                weight += sign * w
+                count += sign
+
+            if count <= 0 or total is None or np.linalg.norm(total) == 0:
+                self.store.delete([profile_vector_id(user_id)])
+                return None
+            self.store.upsert([self._record(user_id, total, weight, count)])
+            return profile_vector_id(user_id)
+
+    def set_papers(self, user_id: str, papers: Sequence[Tuple[Sequence[float], Any]]) -> Optional[str]:
+        """사용자 프로필을 [(논문 임베딩, 출판 연도)]만으로 다시 계산 (같은 목록으로 다시 불러도 결과가 같음)"""
+        return self._update(user_id, papers, +1, replace=True)
+
+    def fetch_papers(self, paper_store: VectorStore, ids: Sequence[str],
+                     batch_size: int = 1000) -> List[Tuple[Sequence[float], Any]]:
+        """논문 인덱스에 저장된 논문들의 [(임베딩, 출판 연도)] (없는 id는 건너뜀)"""
+        papers = []
+        for i in range(0, len(ids), batch_size):
+            for match in paper_store.fetch(list(ids[i:i + batch_size])).values():
+                if match.values is not None:
+                    papers.append((match.values, match.metadata.get("year")))
+        return papers
+
+    def add_papers(self, user_id: str, papers: Sequence[Tuple[Sequence[float], Any]]) -> Optional[str]:
+        """[(논문 임베딩, 출판 연도)]를 사용자 프로필에 더하고 프로필 벡터 id를 반환"""
+        return self._update(user_id, papers, +1)
+
+    def remove_papers(self, user_id: str, papers: Sequence[Tuple[Sequence[float], Any]]) -> Optional[str]:
+        """add_papers로 더했던 논문을 뺌 (논문이 남지 않으면 프로필 삭제 후 None)"""
+        return self._update(user_id, papers, -1)
+
+    def rebuild(self, paper_store: VectorStore, batch_size: int = 1000) -> int:
+        """논문 인덱스 전체(user_id 메타데이터가 있는 벡터)로 모든 프로필을 다시 계산"""
+        sums: Dict[str, List[Any]] = {}
+        ids = list(paper_store.list_ids())
+        for i in range(0, len(ids), batch_size):
+            for match in paper_store.fetch(ids[i:i + batch_size]).values():
+                user_id = match.metadata.get("user_id")
+                if not user_id or match.values is None:
+                    continue
+                w = paper_weight(match.metadata.get("year"), self.half_life)
+                entry = sums.setdefault(user_id, [0.0, 0.0, 0])
+                entry[0] = entry[0] + w * np.asarray(match.values, dtype=np.float64)
+                entry[1] += w
+                entry[2] += 1
+
+        records = [self._record(user_id, total, weight, count) for user_id, (total, weight, count) in sums.items()]
+        with self._lock:
+            for i in range(0, len(records), _UPSERT_BATCH):
+                self.store.upsert(records[i:i + _UPSERT_BATCH])
+        self.store.flush()
+        return len(records)
+
+    @staticmethod
+    def _users(result, exclude: Optional[str] = None) -> List[Tuple[str, float]]:
+        return [(m.metadata["user_id"], float(m.score)) for m in result.matches
+                if m.metadata.get("user_id") and m.metadata["user_id"] != exclude]
+
+    def search(self, vector: Sequence[float], top_k: int = 5,
+               filter: Optional[Dict[str, Any]] = None) -> List[Tuple[str, float]]:
+        """질의 벡터와 프로필이 가장 비슷한 사용자 [(user_id, 점수)]"""
+        return self._users(self.store.query(vector=vector, top_k=top_k, filter=filter, include_metadata=True))
+
+    def search_many(self, vectors: List[Sequence[float]], top_k: int = 5,
+                    filter: Optional[Dict[str, Any]] = None) -> List[List[Tuple[str, float]]]:
+        return [self._users(result) for result in
+                self.store.query_many(vectors, top_k=top_k, filter=filter, include_metadata=True)]
+
+    def similar(self, user_id: str, top_k: int = 5) -> List[Tuple[str, float]]:
+        """프로필이 가장 비슷한 다른 사용자 [(user_id, 점수)] (프로필이 없으면 빈 목록)"""
+        result = self.store.query(id=profile_vector_id(user_id), top_k=top_k + 1, include_metadata=True)
+        return self._users(result, exclude=user_id)[:top_k]
+
+
+if __name__ == "__main__":
+    # 논문 인덱스로 프로필 인덱스 재구성: python -m backend.vector.profile_vectors <논문 인덱스 이름>
+    import sys
+
+    from .clients import PAPER_INDEX, get_vector_store
+
+    paper_index = sys.argv[1] if len(sys.argv) > 1 else PAPER_INDEX
+    profiles = ProfileVectors(get_vector_store(profile_index_name(paper_index), create_if_missing=True))
+    print(f"✅ 프로필 {profiles.rebuild(get_vector_store(paper_index))}명 재구성")
@@ -0,0 +1,129 @@
+import os
+from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterator, List, Optional
+
+
+@dataclass
+class QueryMatch:
+    """검색 결과 한 건 (Pinecone의 match와 같은 속성)"""
+    id: str
+    score: float
+    metadata: Dict[str, Any] = field(default_factory=dict)
+    values: Optional[List[float]] = None
+
+
+@dataclass
+class QueryResult:
+    """검색 결과 (Pinecone의 query 응답처럼 .matches로 접근)"""
+    matches: List[QueryMatch] = field(default_factory=list)
+
+
+class VectorStore(ABC):
+    """벡터 저장소 공통 인터페이스
+
+    메서드 이름과 인자는 Pinecone Index와 같게 맞춰서, 기존 코드의
+    index.upsert(vectors=[...]) / index.query(vector=..., top_k=..., include_metadata=True)
+    호출을 그대로 쓸 수 있다.
+    """
+
+    @abstractmethod
+    def upsert(self, vectors: List[Dict[str, Any]]) -> int:
+        """[{"id", "values", "metadata"}] 형식의 벡터들을 추가/교체하고 처리한 개수를 반환"""
+
+    @abstractmethod
+    def delete(self, ids: List[str]) -> None:
+        """id 목록의 벡터 삭제"""
+
+    @abstractmethod
+    def query(self, vector: Optional[List[float]] = None, id: Optional[str] = None, top_k: int = 10,
+              filter: Optional[Dict[str, Any]] = None, include_metadata: bool = True,
+              include_values: bool = False) -> QueryResult:
+        """벡터 또는 저장된 id의 벡터와 가장 비슷한 top_k개 (filter는 Pinecone 메타데이터 필터 문법)"""
+
+    def query_many(self, vectors: List[List[float]], top_k: int = 10, filter: Optional[Dict[str, Any]] = None,
+                   include_metadata: bool = True, include_values: bool = False) -> List[QueryResult]:
+        """여러 벡터에 대해 같은 조건으로 query (기본 구현은 하나씩 질의)"""
+        return [self.query(vector=vector, top_k=top_k, filter=filter, include_metadata=include_metadata,
+                           include_values=include_values) for vector in vectors]
+
+    @abstractmethod
+    def fetch(self, ids: List[str]) -> Dict[str, QueryMatch]:
+        """id로 저장된 벡터와 메타데이터 조회"""
+
+    def flush(self) -> None:
+        """버퍼링된 변경을 영구 저장 (원격 저장소는 할 일 없음)"""
+
+    def refresh(self) -> None:
+        """다른 프로세스가 저장한 최신 상태를 지금 반영 (원격 저장소는 항상 최신이므로 할 일 없음)"""
+
+    def list_ids(self) -> Iterator[str]:
+        """저장된 모든 벡터 id (재색인용, 지원하지 않는 저장소는 NotImplementedError)"""
+        raise NotImplementedError
+
+
+class PineconeVectorStore(VectorStore):
+    """Pinecone Index를 VectorStore 인터페이스로 감싼 어댑터"""
+
+    def __init__(self, index):
+        self.index = index
+
+    def upsert(self, vectors: List[Dict[str, Any]]) -> int:
+        response = self.index.upsert(vectors=vectors)
+        return getattr(response, 'upserted_count', len(vectors))
+
+    def delete(self, ids: List[str]) -> None:
+        self.index.delete(ids=ids)
+
+    def query(self, vector=None, id=None, top_k=10, filter=None, include_metadata=True, include_values=False):
+        kwargs = {'top_k': top_k, 'include_metadata': include_metadata, 'include_values': include_values}
+        if vector is not None:
+            kwargs['vector'] = list(vector)
+        if id is not None:
+            kwargs['id'] = id
+        if filter:
+            kwargs['filter'] = filter
+        return self.index.query(**kwargs)
+
+    def query_many(self, vectors, top_k=10, filter=None, include_metadata=True, include_values=False):
+        # Pinecone은 한 요청에 벡터 하나만 받으므로 연결 풀 위에서 동시에 보냄
+        with ThreadPoolExecutor(max_workers=min(len(vectors), 16) or 1) as executor:
+            return list(executor.map(
+                lambda vector: self.query(vector=vector, top_k=top_k, filter=filter,
+                                          include_metadata=include_metadata, include_values=include_values),
+                vectors))
+
+    def fetch(self, ids: List[str]) -> Dict[str, QueryMatch]:
+        response = self.index.fetch(ids=ids)
+        return {
+            vector_id: QueryMatch(id=vector_id, score=0.0, metadata=dict(vector.metadata or {}),
+                                  values=list(vector.values))
+            for vector_id, vector in response.vectors.items()
+        }
+
+    def list_ids(self):
+        # serverless 인덱스만 지원 (id를 페이지 단위로 돌려줌)
+        for ids in self.index.list():
+            yield from ids
+
+    def describe_index_stats(self):
+        return self.index.describe_index_stats()
+
+
+VECTOR_STORE_BACKEND = os.getenv('VECTOR_STORE_BACKEND', 'pinecone')  # 'pinecone' 또는 'local'
+LOCAL_VECTOR_STORE_DIR = os.getenv(
+    'LOCAL_VECTOR_STORE_DIR',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), '../data/vector_store'),
+)
+
+
+def local_store_path(index_name: str) -> str:
+    """로컬 백엔드에서 인덱스 이름별 저장 경로"""
+    return os.path.join(LOCAL_VECTOR_STORE_DIR, index_name)
+
+
+def open_local_store(index_name: str, dim: int = 1536) -> VectorStore:
+    """인덱스 이름에 해당하는 로컬 벡터 저장소를 열기 (없으면 빈 저장소)"""
+    from .local_store import LocalVectorStore
+    return LocalVectorStore.open(local_store_path(index_name), dim=dim)
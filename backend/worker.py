@@ -0,0 +1,122 @@
+"""프로필 생성 작업 워커
+
+웹 서버와 별도 프로세스로 실행해 작업 큐(backend.service.job_queue)에 쌓인 프로필 생성 작업을
+처리합니다. 워커 하나가 --concurrency개 작업을 동시에 실행하고, 작업마다 자기 DB 세션을 엽니다.
+노드의 처리량은 워커 프로세스 수 x concurrency로 조절합니다.
+
+워커 프로세스를 여러 개 띄워도 되는 이유 (공유 저장소마다 동시 쓰기를 처리함):
+- 로컬 벡터 저장소와 Recommender 스냅샷: 파일 잠금 안에서 최신 세대를 다시 읽고 자기 변경을 그 위에
+  적용해 배포하므로 다른 워커의 변경을 덮어쓰지 않음
+- 사용자 프로필 벡터(읽고-고쳐-쓰기): 같은 사용자의 작업은 큐의 key로 한 번에 하나만 실행되고,
+  갱신 전에 저장소의 최신 세대를 읽음
+- 작업 큐와 분석 캐시: sqlite 트랜잭션
+
+실행: python -m backend.worker --concurrency 4
+"""
+import argparse
+import asyncio
+import os
+import signal
+import socket
+
+from fastapi import HTTPException
+
+from backend.db.session import async_session
+from backend.service.job_queue import JOB_LEASE_SECONDS, JobQueue, get_job_queue
+from backend.service.profile_service import PROFILE_JOB, ProfileService
+
+WORKER_CONCURRENCY = int(os.getenv("WORKER_CONCURRENCY", "2"))
+JOB_POLL_INTERVAL = float(os.getenv("JOB_POLL_INTERVAL", "1"))  # 대기 중인 작업이 없을 때 다시 확인하는 간격 (초)
+
+
+async def run_profile_job(job, queue: JobQueue, service: ProfileService):
+    """프로필 생성 작업 하나 실행 (진행 단계 기록, 실패 시 재시도 예약)"""
+    job_id, worker_id = job["id"], job["locked_by"]
+    state = {"stage": "started", "progress": 0.0}
+
+    def progress(stage: str, fraction: float):
+        state.update(stage=stage, progress=fraction)
+        queue.progress(job_id, worker_id, stage, fraction)
+
+    async def heartbeat():
+        # 한 단계가 오래 걸려도 lease가 끝나 다른 워커가 가져가지 않도록 주기적으로 연장
+        while True:
+            await asyncio.sleep(JOB_LEASE_SECONDS / 3)
+            queue.progress(job_id, worker_id, state["stage"], state["progress"])
+
+    keepalive = asyncio.create_task(heartbeat())
+    try:
+        async with async_session() as db:
+            result = await service.create_profile(job["payload"]["user_id"], job["payload"]["max_papers"], db,
+                                                  progress=progress)
+    except HTTPException as e:
+        # 사용자 없음/Scholar ID 없음 등은 다시 해도 같으므로 재시도하지 않음
+        if queue.fail(job_id, worker_id, str(e.detail), retry=False):
+            print(f"❌ 작업 실패 {job_id}: {e.detail}")
+        else:
+            print(f"⚠️ 작업 {job_id}의 lease를 잃어 결과를 기록하지 않음: {e.detail}")
+        return
+    except Exception as e:
+        if queue.fail(job_id, worker_id, str(e)):
+            print(f"❌ 작업 실패 {job_id} (시도 {job['attempts']}/{job['max_attempts']}): {str(e)}")
+        else:
+            print(f"⚠️ 작업 {job_id}의 lease를 잃어 결과를 기록하지 않음: {str(e)}")
+        return
+    finally:
+        keepalive.cancel()
+
+    if result.get("status") == "success":
+        recorded = queue.complete(job_id, worker_id, result)
+        message = f"✅ 작업 완료 {job_id}: 논문 {result.get('paper_count')}편"
+    else:
+        recorded = queue.fail(job_id, worker_id, result.get("message", "unknown error"))
+        message = f"⚠️ 작업 실패 {job_id} (시도 {job['attempts']}/{job['max_attempts']}): {result.get('message')}"
+    # lease가 끝나 다른 워커가 이어받았으면 그 워커의 결과가 남도록 기록하지 않음
+    print(message if recorded else f"⚠️ 작업 {job_id}의 lease를 잃어 결과를 기록하지 않음")
+
+
+HANDLERS = {PROFILE_JOB: run_profile_job}
+
+
+async def worker_slot(worker_id: str, queue: JobQueue, service: ProfileService, stop: asyncio.Event):
+    """작업을 하나씩 가져와 실행하는 루프 (stop이 설정되면 현재 작업을 마치고 종료)"""
+    while not stop.is_set():
+        job = queue.claim(worker_id)
+        if job is None:
+            try:
+                await asyncio.wait_for(stop.wait(), JOB_POLL_INTERVAL)
+            except asyncio.TimeoutError:
+                pass
+            continue
+
+        print(f"🚀 작업 시작 {job['id']} ({job['kind']}, 시도 {job['attempts']}/{job['max_attempts']})")
+        handler = HANDLERS.get(job["kind"])
+        if handler is None:
+            queue.fail(job["id"], worker_id, f"Unknown job kind: {job['kind']}", retry=False)
+            continue
+        await handler(job, queue, service)
+
+
+async def run(concurrency: int):
+    queue = get_job_queue()
+    service = ProfileService()
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stop.set)
+
+    worker_id = f"{socket.gethostname()}-{os.getpid()}"
+    print(f"👷 워커 {worker_id} 시작 (동시 작업 {concurrency}개, 대기열 {queue.counts()})")
+    await asyncio.gather(*(worker_slot(f"{worker_id}-{i}", queue, service, stop) for i in range(concurrency)))
+    print(f"👋 워커 {worker_id} 종료")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--concurrency', type=int, default=WORKER_CONCURRENCY)
+    args = parser.parse_args()
+    asyncio.run(run(args.concurrency))
+
+
+if __name__ == '__main__':
+    main()